@@ -1,159 +1,882 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import gzip
+import hashlib
+import json
+import math
 import os
 import re
+import time
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use("Agg")  # figures are only saved to files
+from matplotlib.figure import Figure
+
+from logger import BINARY_HEADER, BINARY_MAGIC, BINARY_RECORD, BINARY_VERSION, COMPRESSED_SUFFIX, EVENT_CLOCK_TYPE, \
+    EVENT_FORMATS, INDEX_SUFFIX, LOG_EXTENSIONS
+from logical_clocks import CLOCK_CODES, CLOCK_HYBRID, HYBRID_COUNTER_BITS
+from clock_probe import estimate_offsets
+import results_store
 
 LOG_DIR = "logs"
+CACHE_DIR = ".cache/parsed_logs"
+FIGURE_DIR = "figures"
+
+# Bump when the figures change, to render figures of unchanged statistics again
+FIGURE_VERSION = 1
+# File in each figure folder holding the hash of the statistics its figures were drawn from
+HASH_FILE = ".statistics_hash"
+
+# Bump when the parsed DataFrame changes, to invalidate cached results
+CACHE_VERSION = 2
+# Minimum total size of unparsed log files before parsing on a process pool, in bytes
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
 
 # Regular expression pattern for parsing log files
+# (older logs only have second-resolution system times and no nanosecond timestamps)
 LOG_PATTERN = re.compile(
-    r"(\d+)> Event: (.+?) \| System Time: ([\d-]+ [\d:]+) \| Logical Clock: (\d+) \| Queue Length: (\d+)"
+    r"(\d+)> Event: (.+?) \| System Time: ([\d-]+ [\d:.]+) \| Logical Clock: (\d+) \| Queue Length: (\d+)(?: \| Time NS: (\d+) \| Monotonic NS: (\d+))?"
 )
 
 
-def plot_statistics(summary_df, drift_df):
-    """
-    Plots the statistics for each process.
-
-    :param summary_df: DataFrame containing the computed statistics
-    :param drift_df: DataFrame containing the drift data
-    :param folder: Name of the experiment
-    """
-    # Create figure folder if it doesn't exist
-    os.makedirs(f"figures", exist_ok=True)
-
-    # Plot min, mean, and max drift for each process and show the plot
+def plot_drift_by_clock_rate(ax, summary_df, drift_df):
+    # Plot min, mean, and max drift for each process
     summary_df[["Min Drift", "Mean Drift", "Max Drift"]].plot(
-        kind="line", title=f"Drift vs. Clock Rate", xlabel="Clock Rate", ylabel="Drift")
-    # Save the plot to a file
-    plt.savefig(f"figures/drift_by_clock_rate.png")
+        ax=ax, kind="line", title=f"Drift vs. Clock Rate", xlabel="Clock Rate", ylabel="Drift")
 
-    plt.figure()
-    # Plot max drift over time and show the plot
+
+def plot_drift_over_time(ax, summary_df, drift_df):
+    # Plot max drift over time
     for clock_rate, group in drift_df.groupby("Clock Rate"):
-        plt.plot(group["Elapsed Seconds"], group["Drift"], label=clock_rate)
-    plt.legend(title="Clock Rate")
-    plt.title("Max Drift Over Time by Clock Rate")
-    plt.xlabel("Elapsed Time (s)")
-    plt.ylabel("Drift")
+        ax.plot(group["Elapsed Seconds"], group["Drift"], label=clock_rate)
+    ax.legend(title="Clock Rate")
+    ax.set_title("Max Drift Over Time by Clock Rate")
+    ax.set_xlabel("Elapsed Time (s)")
+    ax.set_ylabel("Drift")
     # Make sure x axis and y axis start at 0
-    plt.xlim(left=0)
-    plt.ylim(bottom=0)
-    # Save the plot to a file
-    plt.savefig(f"figures/drift_over_time.png")
+    ax.set_xlim(left=0)
+    ax.set_ylim(bottom=0)
+
 
-    # Plot mean, max logical clock jump for each process and show the plot
+def plot_logical_clock_jump(ax, summary_df, drift_df):
+    # Plot mean, max logical clock jump for each process
     summary_df[["Mean Logical Clock Jump", "Max Logical Clock Jump"]].plot(
-        kind="line", title=f"Logical Clock Jump vs. Clock Rate", xlabel="Clock Rate", ylabel="Logical Clock Jump")
-    # Save the plot to a file
-    plt.savefig(f"figures/logical_clock_jump.png")
+        ax=ax, kind="line", title=f"Logical Clock Jump vs. Clock Rate", xlabel="Clock Rate", ylabel="Logical Clock Jump")
 
-    # Plot mean, max queue length for each process and show the plot
+
+def plot_queue_length(ax, summary_df, drift_df):
+    # Plot mean, max queue length for each process
     summary_df[["Mean Queue Length", "Max Queue Length"]].plot(
-        kind="line", title=f"Queue Length vs. Clock Rate", xlabel="Clock Rate", ylabel="Queue Length")
-    # Save the plot to a file
-    plt.savefig(f"figures/queue_length.png")
+        ax=ax, kind="line", title=f"Queue Length vs. Clock Rate", xlabel="Clock Rate", ylabel="Queue Length")
+
 
-    # Plot mean, max queue length change for each process and show the plot
+def plot_queue_length_change(ax, summary_df, drift_df):
+    # Plot mean, max queue length change for each process
     summary_df[["Mean Queue Length Change", "Max Queue Length Change"]].plot(
-        kind="line", title=f"Queue Length Change vs. Clock Rate", xlabel="Clock Rate", ylabel="Queue Length Change")
-    # Save the plot to a file
-    plt.savefig(f"figures/queue_length_change.png")
+        ax=ax, kind="line", title=f"Queue Length Change vs. Clock Rate", xlabel="Clock Rate", ylabel="Queue Length Change")
 
-    # Plot sent, processed, and internal events as a percentage of total events for each process and show the plot
+
+def plot_events(ax, summary_df, drift_df):
+    # Plot sent, processed, and internal events as a percentage of total events for each process
     summary_df[["Sent Events", "Processed Events", "Internal Events"]].div(summary_df["Total Events"], axis=0).plot(
-        kind="bar", stacked=True, title=f"Event Distribution vs. Clock Rate", xlabel="Clock Rate", ylabel="% of Events")
-    # Save the plot to a file
-    plt.savefig(f"figures/events.png")
+        ax=ax, kind="bar", stacked=True, title=f"Event Distribution vs. Clock Rate", xlabel="Clock Rate", ylabel="% of Events")
+
+
+# Figures of each experiment: file name -> function that draws it
+FIGURES = {
+    "drift_by_clock_rate.png": plot_drift_by_clock_rate,
+    "drift_over_time.png": plot_drift_over_time,
+    "logical_clock_jump.png": plot_logical_clock_jump,
+    "queue_length.png": plot_queue_length,
+    "queue_length_change.png": plot_queue_length_change,
+    "events.png": plot_events,
+}
+
+
+def render_figure(name, summary_df, drift_df, figure_path):
+    """
+    Renders one figure to a file.
+
+    The figure is created without pyplot, so it isn't kept in pyplot's list of open figures,
+    and is cleared once it has been saved.
+
+    :param name: File name of the figure, a key of FIGURES
+    :param summary_df: DataFrame containing the computed statistics
+    :param drift_df: DataFrame containing the drift data
+    :param figure_path: Path to save the figure to
+    """
+    figure = Figure()
+    try:
+        FIGURES[name](figure.add_subplot(), summary_df, drift_df)
+        figure.savefig(figure_path)
+    finally:
+        figure.clear()
+
+
+def statistics_hash(summary_df, drift_df):
+    """
+    Returns a hash of the statistics a set of figures is drawn from.
+
+    :param summary_df: DataFrame containing the computed statistics
+    :param drift_df: DataFrame containing the drift data
+    :return: Hex digest of the statistics' contents
+    """
+    digest = hashlib.sha1(f"{FIGURE_VERSION}|{list(FIGURES)}".encode())
+    for df in (summary_df, drift_df):
+        digest.update(str(list(df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def plot_statistics(summary_df, drift_df, figure_dir=FIGURE_DIR, workers=1):
+    """
+    Plots the statistics of an experiment, unless the same statistics have already been plotted.
+
+    :param summary_df: DataFrame containing the computed statistics
+    :param drift_df: DataFrame containing the drift data
+    :param figure_dir: Folder to save the figures to (default: FIGURE_DIR)
+    :param workers: Number of rendering processes, or None for one per CPU (default: 1)
+    :return: Whether the figures were rendered
+    """
+    os.makedirs(figure_dir, exist_ok=True)
+
+    # Skip rendering if every figure exists and was drawn from the same statistics
+    digest = statistics_hash(summary_df, drift_df)
+    hash_path = os.path.join(figure_dir, HASH_FILE)
+    if os.path.exists(hash_path) and all(os.path.exists(os.path.join(figure_dir, name)) for name in FIGURES):
+        with open(hash_path) as f:
+            if f.read() == digest:
+                return False
+
+    figures = [(name, summary_df, drift_df, os.path.join(figure_dir, name)) for name in FIGURES]
+    if (workers or os.cpu_count()) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(render_figure, *zip(*figures)))
+    else:
+        for figure in figures:
+            render_figure(*figure)
+
+    # Only record the hash once every figure has been saved
+    with open(hash_path, "w") as f:
+        f.write(digest)
+    return True
+
+
+def plot_experiment(folder_path, figure_dir=FIGURE_DIR):
+    """
+    Analyzes an experiment and plots its statistics to its own figure folder.
+
+    :param folder_path: Path to the experiment folder
+    :param figure_dir: Folder containing each experiment's figure folder (default: FIGURE_DIR)
+    :return: Whether the figures were rendered
+    """
+    summary_df, drift_df = compute_statistics(parse_log_files(folder_path, workers=1))
+    return plot_statistics(summary_df, drift_df, experiment_figure_dir(folder_path, figure_dir))
+
+
+def plot_experiments(folder_paths, figure_dir=FIGURE_DIR, workers=None):
+    """
+    Plots the statistics of several experiments, one experiment per worker process.
+
+    :param folder_paths: Paths to the experiment folders
+    :param figure_dir: Folder containing each experiment's figure folder (default: FIGURE_DIR)
+    :param workers: Number of worker processes (default: one per CPU)
+    :return: Number of experiments whose figures were rendered
+    """
+    if len(folder_paths) == 1 or (workers or os.cpu_count()) == 1:
+        return sum(plot_experiment(folder_path, figure_dir) for folder_path in folder_paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(plot_experiment, folder_paths, [figure_dir] * len(folder_paths)))
+
+
+def experiment_figure_dir(folder_path, figure_dir=FIGURE_DIR):
+    """
+    Returns the figure folder of an experiment, named after its log folder (e.g. figures/exp_2).
+
+    :param folder_path: Path to the experiment folder
+    :param figure_dir: Folder containing each experiment's figure folder (default: FIGURE_DIR)
+    :return: Path to the experiment's figure folder
+    """
+    return os.path.join(figure_dir, os.path.basename(os.path.normpath(folder_path)))
 
 
 def compute_statistics(df):
     """
     Computes statistics from the log data.
 
+    Every summary column is computed in one named-aggregation pass over the clock rate groups.
+    Sent, processed and internal events are told apart by matching each distinct event once and
+    looking the result up by category code, instead of scanning every event's text.
+
     :param df: DataFrame containing the log data
     :return: DataFrame containing the computed statistics and DataFrame containing drift data
     """
-    # Group by process ID
-    group = df.groupby(["Clock Rate"])
+    # Find the kind of each distinct event once
+    event = df["Event"].astype("category")
+    codes = event.cat.codes.to_numpy()
+    categories = event.cat.categories
+
+    # Only the columns that are aggregated, plus one flag column per kind of event
+    columns = df[["Clock Rate", "Drift", "Logical Clock Jump", "Queue Length", "Queue Length Change"]]
+    columns = columns.assign(**{
+        column: np.asarray(categories.str.contains(kind), dtype=bool)[codes]
+        for kind, column in COUNTED_EVENTS.items()
+    })
+
+    # Calculate every statistic of each clock rate in one pass
+    summary_df = columns.groupby("Clock Rate").agg(**{
+        "Min Drift": ("Drift", "min"),
+        "Mean Drift": ("Drift", "mean"),
+        "Max Drift": ("Drift", "max"),
+        "Mean Logical Clock Jump": ("Logical Clock Jump", "mean"),
+        "Max Logical Clock Jump": ("Logical Clock Jump", "max"),
+        "Mean Queue Length": ("Queue Length", "mean"),
+        "Max Queue Length": ("Queue Length", "max"),
+        "Mean Queue Length Change": ("Queue Length Change", "mean"),
+        "Max Queue Length Change": ("Queue Length Change", "max"),
+        **{column: (column, "sum") for column in COUNTED_EVENTS.values()},
+        "Total Events": ("Drift", "size")
+    })
+
+    # Calculate max drift over time for each process, by whole elapsed seconds
+    drift_df = df.groupby(["Clock Rate", df["Elapsed Seconds"].floordiv(1)])["Drift"].max().reset_index()
+
+    # Report counts and integer statistics as int64, however compactly the log data is stored
+    integers = summary_df.select_dtypes("integer").columns
+    summary_df[integers] = summary_df[integers].astype("int64")
+    summary_df.index = summary_df.index.astype("int64")
+    drift_df["Clock Rate"] = drift_df["Clock Rate"].astype("int64")
+
+    return summary_df, drift_df
+
+
+def compute_cluster_statistics(df):
+    """
+    Computes drift and queue length statistics by the number of machines in each run.
 
-    # Group by elapsed seconds
-    group_elapsed = df.groupby(["Clock Rate", "Elapsed Seconds"])
+    :param df: DataFrame containing the log data
+    :return: DataFrame containing the statistics, indexed by number of machines
+    """
+    # Count the machines in each run
+    machines = df.groupby("Run")["Process ID"].transform("nunique").rename("Machines")
+    group = df.groupby(machines)
 
-    # Calculate min drift for each process
-    min_drift = group["Drift"].min()
+    # Queue length of each process when it stopped, to see how far behind it fell
+    final_queue_length = df.groupby(["Run", "Process ID"])["Queue Length"].last()
+    final_machines = machines.groupby([df["Run"], df["Process ID"]]).first()
 
-    # Calculate mean drift for each process
-    mean_drift = group["Drift"].mean()
+    return pd.DataFrame({
+        "Runs": group["Run"].nunique(),
+        "Mean Drift": group["Drift"].mean(),
+        "Max Drift": group["Drift"].max(),
+        "Mean Queue Length": group["Queue Length"].mean(),
+        "Max Queue Length": group["Queue Length"].max(),
+        "Mean Final Queue Length": final_queue_length.groupby(final_machines).mean(),
+        "Max Final Queue Length": final_queue_length.groupby(final_machines).max(),
+    })
 
-    # Calculate max drift for each process
-    max_drift = group["Drift"].max()
 
-    # Calculate max drift over time for each process
-    drift_df = group_elapsed["Drift"].max().reset_index()
+def compare_cluster_sizes(folder_paths):
+    """
+    Compares drift and queue growth across experiments with different numbers of machines.
 
-    # Calculate mean logical clock jump for each process
-    mean_logical_clock_jump = group["Logical Clock Jump"].mean()
+    :param folder_paths: Paths to the experiment folders
+    :return: DataFrame containing the statistics, indexed by number of machines
+    """
+    # Number runs consecutively across experiments, so each run keeps its own machine count
+    frames = []
+    last_run = 0
+    for folder_path in folder_paths:
+        df = parse_log_files(folder_path)
+        df["Run"] += last_run
+        last_run = df["Run"].max()
+        frames.append(df)
+    cluster_df = compute_cluster_statistics(concat_log_frames(frames))
 
-    # Calculate mean queue length for each process
-    mean_queue_length = group["Queue Length"].mean()
+    # Plot drift and final queue length against the number of machines
+    os.makedirs(FIGURE_DIR, exist_ok=True)
+    figure = Figure()
+    try:
+        cluster_df[["Mean Drift", "Max Drift", "Mean Final Queue Length", "Max Final Queue Length"]].plot(
+            ax=figure.add_subplot(), kind="line", marker="o", logx=True,
+            title=f"Drift and Queue Length vs. Number of Machines", xlabel="Machines",
+            ylabel="Logical Clock Ticks / Messages")
+        figure.savefig(os.path.join(FIGURE_DIR, "cluster_size.png"))
+    finally:
+        figure.clear()
 
-    # Calculate max queue length for each process
-    max_queue_length = group["Queue Length"].max()
+    return cluster_df
 
-    # Calculate max logical clock jump for each process
-    max_logical_clock_jump = group["Logical Clock Jump"].max()
 
-    # Calculate mean queue length change for each process
-    mean_queue_length_change = group["Queue Length Change"].mean()
+# Layout of a binary log record, matching logger.BINARY_RECORD
+RECORD_DTYPE = np.dtype([
+    ("time_ns", "<i8"),
+    ("monotonic_ns", "<i8"),
+    ("logical_clock", "<i8"),
+    ("queue_length", "<u4"),
+    ("arg1", "<i4"),
+    ("arg2", "<i4"),
+    ("process_id", "<u2"),
+    ("event_type", "u1"),
+    ("padding", "u1")
+])
+assert RECORD_DTYPE.itemsize == BINARY_RECORD.size
 
-    # Calculate max queue length change for each process
-    max_queue_length_change = group["Queue Length Change"].max()
+# Columns of the parsed log DataFrame (before drift is computed)
+LOG_COLUMNS = ["Run", "Process ID", "Event", "System Time", "Time NS", "Elapsed Seconds", "Logical Clock",
+               "Logical Clock Jump", "Queue Length", "Queue Length Change", "Clock Rate"]
 
-    # Calculate total number of Sent events
-    sent_events = group.apply(lambda x: x["Event"].str.contains(
-        "Sent").sum(), include_groups=False)
+# Compact types of the parsed log columns; events are drawn from a handful of distinct
+# messages, so they are stored as categories rather than one string per event
+LOG_DTYPES = {"Run": "int32", "Process ID": "int32", "Event": "category", "System Time": "datetime64[ns]",
+              "Time NS": "int64",
+              "Elapsed Seconds": "float64", "Logical Clock": "int64", "Logical Clock Jump": "int64",
+              "Queue Length": "int32", "Queue Length Change": "int32", "Clock Rate": "int32"}
 
-    # Calculate total number of processed events
-    processed_events = group.apply(lambda x: x["Event"].str.contains(
-        "Processed").sum(), include_groups=False)
+# Events that describe machine setup/teardown rather than clock cycles
+SKIPPED_EVENTS = ("Initialized", "Connected", "Stopped", "Dropped", "Merged", "Clock type")
+# Event logged by machines with hybrid logical clocks, whose clocks are compared by their physical milliseconds
+HYBRID_CLOCK_EVENT = EVENT_FORMATS[EVENT_CLOCK_TYPE].format(CLOCK_CODES[CLOCK_HYBRID])
 
-    # Calculate total number of Internal events
-    internal_events = group.apply(lambda x: x["Event"].str.contains(
-        "Internal").sum(), include_groups=False)
+# Kinds of events counted in the statistics, by a word of their message
+COUNTED_EVENTS = {"Sent": "Sent Events", "Processed": "Processed Events", "Internal": "Internal Events"}
 
-    # Calculate total number of events for each process
-    total_events = group.size()
+# Labels that start each field of a log line, after the process ID
+EVENT_LABEL = "> Event: "
+FIELD_LABELS = ["| System Time: ", "| Logical Clock: ",
+                "| Queue Length: ", "| Time NS: ", "| Monotonic NS: "]
 
-    # Create a summary DataFrame
-    summary_df = pd.DataFrame({
-        "Min Drift": min_drift,
-        "Mean Drift": mean_drift,
-        "Max Drift": max_drift,
-        "Mean Logical Clock Jump": mean_logical_clock_jump,
-        "Max Logical Clock Jump": max_logical_clock_jump,
-        "Mean Queue Length": mean_queue_length,
-        "Max Queue Length": max_queue_length,
-        "Mean Queue Length Change": mean_queue_length_change,
-        "Max Queue Length Change": max_queue_length_change,
-        "Sent Events": sent_events,
-        "Processed Events": processed_events,
-        "Internal Events": internal_events,
-        "Total Events": total_events
-    })
 
-    return summary_df, drift_df
+def _windows(buffer, starts, width):
+    """
+    Copies a fixed-width window of bytes starting at each position of a buffer.
+
+    :param buffer: Log file contents as a uint8 array
+    :param starts: Array of window start positions
+    :param width: Width of each window
+    :return: uint8 matrix with one row per window
+    """
+    if len(buffer) < width:
+        buffer = np.concatenate((buffer, np.zeros(width - len(buffer), dtype=np.uint8)))
+    windows = np.lib.stride_tricks.sliding_window_view(buffer, width)
+    return windows[np.clip(starts, 0, len(windows) - 1)]
 
 
-def parse_log_files(folder_path):
+def _gather(buffer, starts, ends):
     """
-    Parses all log files in a folder and returns a DataFrame.
+    Gathers variable-width byte ranges into a left-aligned, zero-padded matrix.
 
-    :param folder_path: Path to the log files
-    :return: DataFrame containing the log data
+    :param buffer: Log file contents as a uint8 array
+    :param starts: Array of range start positions
+    :param ends: Array of range end positions (exclusive)
+    :return: uint8 matrix with one row per range
+    """
+    widths = ends - starts
+    matrix = _windows(buffer, starts, int(widths.max()))
+    matrix[np.arange(matrix.shape[1]) >= widths[:, None]] = 0
+    return matrix
+
+
+def _parse_integers(buffer, starts, ends):
+    """
+    Parses non-negative decimal integers from byte ranges without a per-line loop.
+
+    :param buffer: Log file contents as a uint8 array
+    :param starts: Array of range start positions
+    :param ends: Array of range end positions (exclusive)
+    :return: int64 array of parsed values, or None if a range is empty or not all digits
+    """
+    widths = ends - starts
+    if (widths <= 0).any() or widths.max() > 19:
+        return None
+    width = int(widths.max())
+
+    # right-align the digits so each column has the same place value
+    digits = _windows(buffer, ends - width, width) - np.uint8(ord("0"))
+    padding = np.arange(width) < (width - widths)[:, None]
+    if padding.any():
+        digits[padding] = 0
+    if (digits > 9).any():
+        return None
+    return digits.astype(np.int64) @ (10 ** np.arange(width - 1, -1, -1, dtype=np.int64))
+
+
+def _split_log_fields(buffer):
+    """
+    Splits a log file into field columns using the fixed " | " layout of its lines.
+
+    :param buffer: Log file contents as a uint8 array (ending in a newline)
+    :return: Dictionary of field arrays, or None if the file doesn't have a regular layout
+    """
+    line_ends = np.flatnonzero(buffer == ord("\n"))
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+    num_lines = len(line_ends)
+
+    # every line needs one "> " after the process ID and the same number of field separators
+    arrows = np.flatnonzero(buffer == ord(">"))
+    bars = np.flatnonzero(buffer == ord("|"))
+    num_fields = len(bars) // num_lines if num_lines else 0
+    if len(arrows) != num_lines or num_fields not in (3, 5) or len(bars) != num_lines * num_fields:
+        return None
+    bars = bars.reshape(num_lines, num_fields)
+    if (arrows < line_starts).any() or (arrows > bars[:, 0]).any():
+        return None
+
+    # check the first letter of every label, so misplaced separators fall back to LOG_PATTERN
+    field_starts = bars + np.array([len(label) for label in FIELD_LABELS[:num_fields]])
+    field_ends = np.column_stack((bars[:, 1:] - 1, line_ends))
+    if (buffer[arrows + 2] != ord(EVENT_LABEL[2])).any():
+        return None
+    for i in range(num_fields):
+        if (buffer[bars[:, i] + 2] != ord(FIELD_LABELS[i][2])).any():
+            return None
+
+    fields = {
+        "Process ID": _parse_integers(buffer, line_starts, arrows),
+        "Logical Clock": _parse_integers(buffer, field_starts[:, 1], field_ends[:, 1]),
+        "Queue Length": _parse_integers(buffer, field_starts[:, 2], field_ends[:, 2]),
+        "Time NS": None,
+        "Monotonic NS": None
+    }
+    if num_fields == 5:
+        fields["Time NS"] = _parse_integers(
+            buffer, field_starts[:, 3], field_ends[:, 3])
+        fields["Monotonic NS"] = _parse_integers(
+            buffer, field_starts[:, 4], field_ends[:, 4])
+        if fields["Time NS"] is None or fields["Monotonic NS"] is None:
+            return None
+    if any(fields[column] is None for column in ["Process ID", "Logical Clock", "Queue Length"]):
+        return None
+
+    # events are drawn from a handful of distinct strings, so only the unique values are decoded
+    event_bytes = _gather(buffer, arrows + len(EVENT_LABEL), bars[:, 0] - 1)
+    event_codes, event_names = pd.factorize(
+        event_bytes.view(f"S{event_bytes.shape[1]}").ravel())
+    fields["Event Codes"] = event_codes
+    fields["Event Names"] = np.array(
+        [name.decode() for name in event_names], dtype=object)
+
+    # system time has a fixed "%Y-%m-%d %H:%M:%S[.%f]" layout, and many lines share each second
+    time_starts = field_starts[:, 0]
+    time_widths = field_ends[:, 0] - time_starts
+    if not (time_widths == time_widths[0]).all() or time_widths[0] not in (19, 26):
+        return None
+    window = _windows(buffer, time_starts, int(time_widths[0]))
+    second_codes, second_names = pd.factorize(
+        np.ascontiguousarray(window[:, :19]).view("S19").ravel())
+    try:
+        seconds = pd.to_datetime([name.decode() for name in second_names],
+                                 format="%Y-%m-%d %H:%M:%S").to_numpy()
+    except ValueError:
+        return None
+    fields["System Time"] = seconds[second_codes]
+    if time_widths[0] == 26:
+        microseconds = _parse_integers(buffer, time_starts + 20, time_starts + 26)
+        if microseconds is None or (window[:, 19] != ord(".")).any():
+            return None
+        fields["System Time"] = fields["System Time"] + \
+            microseconds.astype("timedelta64[us]")
+    return fields
+
+
+def _match_log_fields(text):
+    """
+    Extracts field columns from a log file with LOG_PATTERN, for files without a regular layout.
+
+    :param text: Log file contents
+    :return: Dictionary of field arrays
+    """
+    raw = pd.DataFrame(LOG_PATTERN.findall(text), dtype=str, columns=[
+        "Process ID", "Event", "System Time", "Logical Clock", "Queue Length", "Time NS", "Monotonic NS"])
+    has_ns = (raw["Time NS"] != "").all()
+    event_codes, event_names = pd.factorize(raw["Event"])
+    return {
+        "Process ID": raw["Process ID"].to_numpy(dtype=np.int64),
+        "Event Codes": event_codes,
+        "Event Names": np.asarray(event_names, dtype=object),
+        "System Time": pd.to_datetime(raw["System Time"], format="ISO8601").to_numpy(),
+        "Logical Clock": raw["Logical Clock"].to_numpy(dtype=np.int64),
+        "Queue Length": raw["Queue Length"].to_numpy(dtype=np.int64),
+        "Time NS": raw["Time NS"].to_numpy(dtype=np.int64) if has_ns else None,
+        "Monotonic NS": raw["Monotonic NS"].to_numpy(dtype=np.int64) if has_ns else None
+    }
+
+
+def is_binary_log(log_path):
+    """
+    Checks whether a log file or log segment is in the binary log format.
+
+    :param log_path: Path to the log file, e.g. process_1.bin or process_1.bin.00002.gz
+    :return: Whether the file holds binary records
+    """
+    name = str(log_path).removesuffix(COMPRESSED_SUFFIX)
+    return re.search(rf"\.{LOG_EXTENSIONS['binary']}(\.\d+)?$", name) is not None
+
+
+def _read_compressed(log_path):
+    """
+    Reads and decompresses a compressed log segment.
+
+    :param log_path: Path to the compressed segment
+    :return: Writable uint8 array of the segment's bytes
+    """
+    with gzip.open(log_path, "rb") as f:
+        return np.frombuffer(bytearray(f.read()), dtype=np.uint8)
+
+
+def read_log_fields(log_path):
+    """
+    Reads the fields of every line of a text log file (or compressed segment) as columns.
+
+    The whole file is read at once and split with NumPy; files without the regular
+    " | " layout fall back to LOG_PATTERN.
+
+    :param log_path: Path to the log file
+    :return: Dictionary of field arrays ("Event Names" holds each distinct event, indexed by "Event Codes")
+    """
+    if str(log_path).endswith(COMPRESSED_SUFFIX):
+        buffer = _read_compressed(log_path)
+    else:
+        buffer = np.fromfile(log_path, dtype=np.uint8)
+    if len(buffer) == 0:
+        return _match_log_fields("")
+    if buffer[-1] != ord("\n"):
+        buffer = np.append(buffer, np.uint8(ord("\n")))
+
+    fields = _split_log_fields(buffer)
+    if fields is None:
+        fields = _match_log_fields(buffer.tobytes().decode())
+
+    # fall back to the system time for logs without nanosecond timestamps
+    if fields["Time NS"] is None:
+        unique_times, inverse = np.unique(
+            fields["System Time"], return_inverse=True)
+        unique_ns = np.array([int(pd.Timestamp(t).to_pydatetime().timestamp()) * 1_000_000_000
+                              for t in unique_times], dtype=np.int64)
+        fields["Time NS"] = fields["Monotonic NS"] = unique_ns[inverse]
+    return fields
+
+
+def _local_times(time_ns):
+    """
+    Converts wall clock times to local system times, as written in text logs.
+
+    :param time_ns: int64 array of wall clock times in nanoseconds
+    :return: datetime64[ns] array of local times, truncated to microseconds
+    """
+    # UTC offsets only change on minute boundaries, so look them up once per distinct minute
+    minute_codes, minutes = pd.factorize(time_ns // 60_000_000_000)
+    offsets = np.array([time.localtime(minute * 60).tm_gmtoff for minute in minutes.tolist()],
+                       dtype=np.int64) * 1_000_000_000
+    return (time_ns // 1000 * 1000 + offsets[minute_codes]).astype("datetime64[ns]")
+
+
+def read_binary_log_fields(log_path):
+    """
+    Reads the fields of every record of a binary log file (or compressed segment) as columns.
+
+    Records are memory-mapped, so numeric fields are used as they are stored without parsing;
+    compressed segments are decompressed into memory first.
+
+    :param log_path: Path to the binary log file
+    :return: Dictionary of field arrays, in the same layout as read_log_fields
+    """
+    compressed = str(log_path).endswith(COMPRESSED_SUFFIX)
+    if compressed:
+        data = _read_compressed(log_path)
+        header = data[:BINARY_HEADER.size].tobytes()
+    else:
+        with open(log_path, "rb") as file:
+            header = file.read(BINARY_HEADER.size)
+    if len(header) < BINARY_HEADER.size:
+        raise ValueError(f"Binary log file is missing its header: {log_path}")
+    magic, version, record_size = BINARY_HEADER.unpack(header)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Unsupported binary log file: {log_path}")
+
+    size = len(data) if compressed else os.path.getsize(log_path)
+    num_records = (size - BINARY_HEADER.size) // RECORD_DTYPE.itemsize
+    if num_records == 0:
+        records = np.empty(0, dtype=RECORD_DTYPE)
+    elif compressed:
+        records = np.frombuffer(data, dtype=RECORD_DTYPE, count=num_records, offset=BINARY_HEADER.size)
+    else:
+        records = np.memmap(log_path, dtype=RECORD_DTYPE, mode="r",
+                            offset=BINARY_HEADER.size, shape=(num_records,))
+
+    # render each distinct (event type, arguments) combination once; hashing (event type, arg1)
+    # and then (that pair, arg2) as packed 64-bit keys avoids sorting every record
+    pair_codes, pairs = pd.factorize(
+        records["event_type"].astype(np.int64) << 32 | records["arg1"].astype(np.uint32))
+    event_codes, events = pd.factorize(
+        pair_codes.astype(np.int64) << 32 | records["arg2"].astype(np.uint32))
+    event_pairs = np.asarray(pairs, dtype=np.int64)[
+        np.asarray(events, dtype=np.int64) >> 32]
+    event_types = event_pairs >> 32
+    event_args1 = (event_pairs & 0xFFFFFFFF).astype(np.uint32).view(np.int32)
+    event_args2 = (np.asarray(events, dtype=np.int64) &
+                   0xFFFFFFFF).astype(np.uint32).view(np.int32)
+    event_names = np.array([EVENT_FORMATS[event_type].format(arg1, arg2) for event_type, arg1, arg2 in zip(
+        event_types.tolist(), event_args1.tolist(), event_args2.tolist())], dtype=object)
+
+    time_ns = records["time_ns"].astype(np.int64)
+    return {
+        "Process ID": records["process_id"].astype(np.int64),
+        "Event Codes": event_codes,
+        "Event Names": event_names,
+        "System Time": _local_times(time_ns),
+        "Logical Clock": records["logical_clock"].astype(np.int64),
+        "Queue Length": records["queue_length"].astype(np.int64),
+        "Time NS": time_ns,
+        "Monotonic NS": records["monotonic_ns"].astype(np.int64)
+    }
+
+
+def build_log_frame(fields, run_number, initial=None):
+    """
+    Builds the parsed log DataFrame of one process from its field columns.
+
+    :param fields: Dictionary of field arrays, from read_log_fields or read_binary_log_fields
+    :param run_number: Number of the run the log file belongs to
+    :param initial: State the log continues from, for log segments after the first: the "state" of the
+        previous segment's index entry (default: the start of the log)
+    :return: DataFrame containing the log data (without drift)
+    """
+    initial = initial or {}
+    event_codes = fields["Event Codes"]
+    if len(event_codes) == 0:
+        return pd.DataFrame(columns=LOG_COLUMNS).astype(LOG_DTYPES)
+    event_names = pd.Series(fields["Event Names"], dtype=object)
+    monotonic_ns = pd.Series(fields["Monotonic NS"])
+
+    # extract clock rate and start time from the most recent initialization
+    initialized = event_names.str.startswith("Initialized").to_numpy()[event_codes]
+    name_clock_rates = event_names.str.rsplit(n=1).str[-1]
+    clock_rate = pd.Series(np.where(initialized, pd.to_numeric(
+        name_clock_rates, errors="coerce").to_numpy()[event_codes], np.nan)).ffill()
+    start_monotonic_ns = monotonic_ns.where(initialized).ffill()
+    # a segment continues from the initialization in an earlier segment
+    if initial.get("clock_rate") is not None:
+        clock_rate = clock_rate.fillna(initial["clock_rate"])
+        start_monotonic_ns = start_monotonic_ns.fillna(initial["start_monotonic_ns"])
+    last_clock = initial.get("last_clock") or 0
+    last_queue_length = initial.get("last_queue_length") or 0
+
+    # skip initialization, connection, stop and queue policy events (and anything logged before initialization)
+    skipped = event_names.str.startswith(SKIPPED_EVENTS).to_numpy()[event_codes]
+    keep = ~skipped & clock_rate.notna().to_numpy()
+
+    # hybrid timestamps pack a counter below the physical time, so drift and jumps are measured in milliseconds
+    logical_clock = fields["Logical Clock"][keep]
+    hybrid_codes = np.flatnonzero(fields["Event Names"] == HYBRID_CLOCK_EVENT)
+    if len(hybrid_codes) or initial.get("clock_type") == CLOCK_CODES[CLOCK_HYBRID]:
+        if len(hybrid_codes) and not initial.get("last_clock"):
+            # the first event's jump is measured from the hybrid clock's start, logged with its type
+            last_clock = int(fields["Logical Clock"][np.argmax(event_codes == hybrid_codes[0])])
+        logical_clock = logical_clock >> HYBRID_COUNTER_BITS
+        last_clock >>= HYBRID_COUNTER_BITS
+
+    logical_clock = pd.Series(logical_clock)
+    queue_length = pd.Series(fields["Queue Length"][keep])
+
+    # the event codes already index the distinct events, so they become the categories as they are
+    events = pd.Categorical.from_codes(
+        event_codes[keep], categories=pd.Index(fields["Event Names"])).remove_unused_categories()
+    events = events.reorder_categories(sorted(events.categories))
+
+    return pd.DataFrame({
+        "Run": run_number,
+        "Process ID": fields["Process ID"][keep],
+        "Event": events,
+        "System Time": fields["System Time"][keep],
+        "Time NS": fields["Time NS"][keep],
+        # calculate elapsed time in seconds (monotonic, so unaffected by wall clock changes)
+        "Elapsed Seconds": (monotonic_ns[keep] - start_monotonic_ns[keep]).to_numpy() / 1_000_000_000,
+        "Logical Clock": logical_clock,
+        # calculate jump in logical clock
+        "Logical Clock Jump": logical_clock.diff().fillna(logical_clock - last_clock).astype("int64"),
+        "Queue Length": queue_length,
+        # calculate change in queue length
+        "Queue Length Change": queue_length.diff().fillna(queue_length - last_queue_length).astype("int64"),
+        "Clock Rate": clock_rate[keep].to_numpy()
+    }).astype(LOG_DTYPES)
+
+
+def read_log_index(index_path):
+    """
+    Reads the index of a process's log segments.
+
+    :param index_path: Path to the index (process_x.index.jsonl)
+    :return: List of dictionaries describing each segment, in order (see EventLogger.close_segment)
+    """
+    with open(index_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def parse_segmented_log(index_path, run_number, segments=None):
+    """
+    Parses some or all of the segments of a segmented log and returns a DataFrame.
+
+    Each segment is parsed on its own, continuing from the state its index entry's predecessor
+    ended with, so the result is the same as parsing those events in a single log file.
+
+    :param index_path: Path to the index of the log segments
+    :param run_number: Number of the run the log belongs to
+    :param segments: Positions of the segments in the index to parse (default: all of them)
+    :return: DataFrame containing the log data (without drift)
+    """
+    entries = read_log_index(index_path)
+    folder = os.path.dirname(index_path)
+    frames = []
+    for i in range(len(entries)) if segments is None else segments:
+        segment_path = os.path.join(folder, entries[i]["segment"])
+        fields = read_binary_log_fields(segment_path) if is_binary_log(segment_path) else read_log_fields(segment_path)
+        frames.append(build_log_frame(fields, run_number, entries[i - 1]["state"] if i > 0 else None))
+    if not frames:
+        return pd.DataFrame(columns=LOG_COLUMNS).astype(LOG_DTYPES)
+    return concat_log_frames(frames)
+
+
+def parse_log_file(log_path, run_number):
+    """
+    Parses a single log file (text, binary or the index of a segmented log) and returns a DataFrame.
+
+    All fields are extracted, converted and diffed as column operations rather than one
+    line at a time.
+
+    :param log_path: Path to the log file
+    :param run_number: Number of the run the log file belongs to
+    :return: DataFrame containing the log data (without drift)
+    """
+    if str(log_path).endswith(INDEX_SUFFIX):
+        return parse_segmented_log(log_path, run_number)
+    if is_binary_log(log_path):
+        return build_log_frame(read_binary_log_fields(log_path), run_number)
+    return build_log_frame(read_log_fields(log_path), run_number)
+
+
+def log_size(log_path):
+    """
+    Returns the number of bytes a log file holds, including every segment of a segmented log.
+
+    :param log_path: Path to the log file or segment index
+    :return: Size in bytes
+    """
+    if str(log_path).endswith(INDEX_SUFFIX):
+        return sum(entry["bytes"] for entry in read_log_index(log_path))
+    return os.path.getsize(log_path)
+
+
+def parse_log_file_by_line(log_path, run_number):
+    """
+    Parses a single log file one line at a time and returns a DataFrame.
+
+    This is the reference implementation for parse_log_file, kept for tests and benchmarks.
+
+    :param log_path: Path to the log file
+    :param run_number: Number of the run the log file belongs to
+    :return: DataFrame containing the log data (without drift)
     """
     data = []
+    with open(log_path, "r") as file:
+        last_logical_clock = 0
+        last_queue_length = 0
+        hybrid = False
+        for line in file:
+            match = LOG_PATTERN.match(line)
+            if match:
+                process_id, event, system_time_str, logical_clock, queue_length, time_ns, monotonic_ns = match.groups()
+
+                # convert system time to timestamp
+                system_time = datetime.strptime(
+                    system_time_str, "%Y-%m-%d %H:%M:%S.%f" if "." in system_time_str else "%Y-%m-%d %H:%M:%S")
+
+                # fall back to the system time for logs without nanosecond timestamps
+                if time_ns is None:
+                    time_ns = monotonic_ns = int(
+                        system_time.timestamp()) * 1_000_000_000
+                time_ns = int(time_ns)
+                monotonic_ns = int(monotonic_ns)
+
+                if "Initialized" in event:
+                    # extract clock rate
+                    clock_rate = int(event.split()[-1])
+                    start_monotonic_ns = monotonic_ns
+                    continue
+                if event == HYBRID_CLOCK_EVENT:
+                    # the first event's jump is measured from the hybrid clock's start
+                    hybrid = True
+                    last_logical_clock = int(logical_clock) >> HYBRID_COUNTER_BITS
+                if event.startswith(SKIPPED_EVENTS):
+                    # skip connection, stop and queue policy events
+                    continue
+
+                # calculate elapsed time in seconds (monotonic, so unaffected by wall clock changes)
+                elapsed_time = (
+                    monotonic_ns - start_monotonic_ns) / 1_000_000_000
+
+                # calculate jump in logical clock
+                logical_clock = int(logical_clock)
+                if hybrid:
+                    # compare hybrid clocks by their physical milliseconds
+                    logical_clock >>= HYBRID_COUNTER_BITS
+                logical_clock_jump = logical_clock - last_logical_clock
+                last_logical_clock = logical_clock
+
+                # calculate change in queue length
+                queue_length = int(queue_length)
+                queue_length_change = queue_length - last_queue_length
+                last_queue_length = queue_length
+
+                data.append({
+                    "Run": run_number,
+                    "Process ID": int(process_id),
+                    "Event": event,
+                    "System Time": system_time,
+                    "Time NS": time_ns,
+                    "Elapsed Seconds": elapsed_time,
+                    "Logical Clock": logical_clock,
+                    "Logical Clock Jump": logical_clock_jump,
+                    "Queue Length": queue_length,
+                    "Queue Length Change": queue_length_change,
+                    "Clock Rate": clock_rate
+                })
+    return pd.DataFrame(data, columns=LOG_COLUMNS).astype(LOG_DTYPES)
+
+
+def exp_folders():
+    """
+    Returns every experiment folder in the logs directory, in order of their numbers.
+
+    :return: List of paths to the experiment folders
+    """
+    exp_ids = [int(name.split("_")[-1]) for name in os.listdir(LOG_DIR)
+               if re.fullmatch(r"exp_\d+", name)]
+    return [os.path.join(LOG_DIR, f"exp_{exp_id}") for exp_id in sorted(exp_ids)]
+
+
+def latest_exp_folder():
+    """
+    Returns the experiment folder with the highest number in the logs directory.
+
+    :return: Path to the experiment folder
+    """
+    folder_paths = exp_folders()
+    if not folder_paths:
+        raise FileNotFoundError(f"No experiment folders in {LOG_DIR}")
+    return folder_paths[-1]
+
+
+def find_log_files(folder_path):
+    """
+    Finds the log file of every process in every run of an experiment folder.
+
+    :param folder_path: Path to the experiment folder
+    :return: List of (log file path, run number) tuples
+    """
+    log_paths = []
 
     # Loop through each run_x folder inside the experiment folder
     for run_folder in sorted(os.listdir(f"{folder_path}")):
@@ -165,75 +888,297 @@ def parse_log_files(folder_path):
 
         print(f"Processing {run_path}...")
         run_number = int(run_folder.split("_")[-1])
+        for log_path in find_run_log_files(run_path).values():
+            log_paths.append((log_path, run_number))
 
-        # Loop through log files inside the run folder
-        for log_file in sorted(os.listdir(run_path)):
-            if log_file.endswith(".log"):
-                log_path = os.path.join(run_path, log_file)
-
-                with open(log_path, "r") as file:
-                    last_logical_clock = 0
-                    last_queue_length = 0
-                    for line in file:
-                        match = LOG_PATTERN.match(line)
-                        if match:
-                            process_id, event, system_time_str, logical_clock, queue_length = match.groups()
-
-                            # convert system time to timestamp
-                            system_time = datetime.strptime(
-                                system_time_str, "%Y-%m-%d %H:%M:%S")
-
-                            if "Initialized" in event:
-                                # extract clock rate
-                                clock_rate = int(event.split()[-1])
-                                start_time = system_time
-                                continue
-                            if "Connected" in event or "Stopped" in event:
-                                # skip connection and stop events
-                                continue
-
-                            # calculate elapsed time in seconds
-                            elapsed_time = (
-                                system_time - start_time).total_seconds()
-
-                            # calculate jump in logical clock
-                            logical_clock = int(logical_clock)
-                            logical_clock_jump = logical_clock - last_logical_clock
-                            last_logical_clock = logical_clock
-
-                            # calculate change in queue length
-                            queue_length = int(queue_length)
-                            queue_length_change = queue_length - last_queue_length
-                            last_queue_length = queue_length
-
-                            data.append({
-                                "Run": run_number,
-                                "Process ID": int(process_id),
-                                "Event": event,
-                                "System Time": system_time,
-                                "Elapsed Seconds": elapsed_time,
-                                "Logical Clock": logical_clock,
-                                "Logical Clock Jump": logical_clock_jump,
-                                "Queue Length": queue_length,
-                                "Queue Length Change": queue_length_change,
-                                "Clock Rate": clock_rate
-                            })
-
-    # Calculate drift
-    df = pd.DataFrame(data)
-    df["Max Clock"] = df.groupby(["Run", "System Time"])[
-        "Logical Clock"].transform('max')
+    return log_paths
+
+
+def find_run_log_files(run_path):
+    """
+    Finds the log file of every process in a run folder.
+
+    A segmented log is represented by its index. If a process has more than one log, the index
+    is used over the binary log, and the binary log over the text log.
+
+    :param run_path: Path to the run folder
+    :return: Dictionary of log file paths, by process name (e.g. "process_1")
+    """
+    priorities = {f".{LOG_EXTENSIONS['text']}": 0, f".{LOG_EXTENSIONS['binary']}": 1, f".{INDEX_SUFFIX}": 2}
+    log_files = {}
+    for log_file in sorted(os.listdir(run_path)):
+        name, extension = log_file.split(".", 1) if "." in log_file else (log_file, "")
+        priority = priorities.get(f".{extension}")
+        if priority is not None and priority >= log_files.get(name, (-1, None))[0]:
+            log_files[name] = (priority, log_file)
+    return {name: os.path.join(run_path, log_file) for name, (_, log_file) in log_files.items()}
+
+
+def cache_path(cache_dir, log_path, run_number, parse_file):
+    """
+    Returns the cache file for a parsed log file.
+
+    The key covers the log file's path, size and modification time, so a log file that is
+    appended to or replaced gets parsed again.
+
+    :param cache_dir: Path to the cache folder
+    :param log_path: Path to the log file
+    :param run_number: Number of the run the log file belongs to
+    :param parse_file: Function used to parse the log file
+    :return: Path to the cache file
+    """
+    stat = os.stat(log_path)
+    key = f"{os.path.abspath(log_path)}|{stat.st_size}|{stat.st_mtime_ns}|{run_number}|{parse_file.__name__}|{CACHE_VERSION}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".pkl")
+
+
+def parse_log_files(folder_path, parse_file=parse_log_file, cache_dir=CACHE_DIR, workers=None):
+    """
+    Parses all log files in a folder and returns a DataFrame.
+
+    Log files that have not been parsed before are parsed on a process pool, and each file's
+    result is cached on disk so that later calls only parse new or changed files.
+
+    :param folder_path: Path to the log files
+    :param parse_file: Function used to parse each log file (default: parse_log_file)
+    :param cache_dir: Path to the parsed log cache, or None to disable caching (default: CACHE_DIR)
+    :param workers: Number of parsing processes (default: one per CPU)
+    :return: DataFrame containing the log data
+    """
+    log_paths = find_log_files(folder_path)
+    frames = [None] * len(log_paths)
+
+    # load cached results
+    cache_paths = [None] * len(log_paths)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        for i, (log_path, run_number) in enumerate(log_paths):
+            cache_paths[i] = cache_path(
+                cache_dir, log_path, run_number, parse_file)
+            if os.path.exists(cache_paths[i]):
+                frames[i] = pd.read_pickle(cache_paths[i])
+
+    # parse everything else, in parallel if there is enough to be worth starting a pool
+    missing = [i for i, frame in enumerate(frames) if frame is None]
+    missing_bytes = sum(log_size(log_paths[i][0]) for i in missing)
+    if len(missing) > 1 and missing_bytes >= PARALLEL_MIN_BYTES and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(parse_file, *zip(*[log_paths[i] for i in missing]))
+            for i, frame in zip(missing, results):
+                frames[i] = frame
+    else:
+        for i in missing:
+            frames[i] = parse_file(*log_paths[i])
+
+    # save newly parsed results (via a temporary file, so a partial write is never loaded)
+    for i in missing:
+        if cache_paths[i] is not None:
+            frames[i].to_pickle(cache_paths[i] + ".tmp")
+            os.replace(cache_paths[i] + ".tmp", cache_paths[i])
+
+    return compute_drift(correct_clock_offsets(concat_log_frames(frames), folder_path))
+
+
+def concat_log_frames(frames):
+    """
+    Concatenates parsed log DataFrames, keeping their events categorical.
+
+    Each log file has its own event categories, which are combined into one sorted set first;
+    otherwise pandas would fall back to one string per event.
+
+    :param frames: List of DataFrames containing log data
+    :return: DataFrame containing the log data of every frame
+    """
+    events = [frame["Event"].astype("category") for frame in frames]
+    categories = sorted(set().union(*(event.cat.categories for event in events)))
+    return pd.concat([frame.assign(Event=event.cat.set_categories(categories))
+                      for frame, event in zip(frames, events)], ignore_index=True)
+
+
+def read_clock_offsets(run_path):
+    """
+    Estimates the offset of each process's wall clock in a run from the clock probes its
+    machines measured (written to process_<id>.stats.json).
+
+    :param run_path: Path to the run folder
+    :return: Dictionary of each process's offset from the clock of the process with the lowest ID, in ns, by process
+        ID (empty if the run has no clock probes)
+    """
+    probes = {}
+    for stats_file in sorted(os.listdir(run_path)) if os.path.isdir(run_path) else []:
+        if stats_file.startswith("process_") and stats_file.endswith(".stats.json"):
+            with open(os.path.join(run_path, stats_file)) as f:
+                stats = json.load(f)
+            if "clock_probes" in stats:
+                probes[stats_file.split(".")[0].split("_")[-1]] = stats["clock_probes"]
+    return estimate_offsets(probes)
+
+
+def correct_clock_offsets(df, folder_path):
+    """
+    Moves the "Time NS" of each event onto the wall clock of its run's lowest-ID process, using
+    the clock offsets the run's machines measured, so events on hosts with different clocks are
+    ordered by when they really happened. Runs without clock probes are left as they are, and
+    "System Time" always keeps the time that was logged.
+
+    :param df: DataFrame containing the log data (with "Run", "Process ID" and "Time NS")
+    :param folder_path: Path to the experiment folder, with a run_<x> folder per run
+    :return: DataFrame with corrected "Time NS"
+    """
+    for run_number in df["Run"].unique():
+        offsets = read_clock_offsets(os.path.join(folder_path, f"run_{run_number}"))
+        if offsets:
+            in_run = df["Run"] == run_number
+            df.loc[in_run, "Time NS"] -= df.loc[in_run, "Process ID"].map(offsets).fillna(0).astype("int64")
+    return df
+
+
+def compute_drift(df):
+    """
+    Computes the drift of each event from the highest logical clock in its run at that time.
+
+    Logical clocks never decrease within a process, so the highest clock of any process as of
+    time t is the running maximum over all of the run's events sorted by time. Events with the
+    same timestamp see each other's clocks.
+
+    :param df: DataFrame containing the log data (with "Run", "Time NS" and "Logical Clock")
+    :return: DataFrame with added "Max Clock" and "Drift" columns
+    """
+    # Sort-merge all processes of a run on time (stable, so ties keep file order)
+    ordered = df.sort_values(["Run", "Time NS"], kind="stable")
+    max_clock = ordered.groupby("Run")["Logical Clock"].cummax().to_numpy()
+
+    # Events at the same time share the highest clock seen by any of them, which is the
+    # running max at the last event of their tie
+    run = ordered["Run"].to_numpy()
+    time_ns = ordered["Time NS"].to_numpy()
+    tie_ends = np.append((run[1:] != run[:-1]) |
+                         (time_ns[1:] != time_ns[:-1]), True)
+    tie_ids = np.concatenate(([0], np.cumsum(tie_ends[:-1])))
+    max_clock = max_clock[np.flatnonzero(tie_ends)[tie_ids]]
+
+    df["Max Clock"] = pd.Series(
+        max_clock, index=ordered.index).reindex(df.index)
     df["Drift"] = df["Max Clock"] - df["Logical Clock"]
     return df
 
 
+def load_time_range(folder_path, run_number, start_seconds, end_seconds):
+    """
+    Loads the events of one run from a window of elapsed time, with drift, reading only the log
+    segments that overlap the window.
+
+    The window in elapsed seconds is turned into a window of wall clock time covering every
+    process, and each segmented log is read from its first segment overlapping that window.
+    Every process's clock before the segments read is the clock its previous segment ended with,
+    so the highest clock of the run (and so the drift) is the same as when analyzing the whole
+    run. Logs that aren't segmented are read in full.
+
+    :param folder_path: Path to the experiment folder
+    :param run_number: Number of the run
+    :param start_seconds: Start of the window, in seconds since each process was initialized
+    :param end_seconds: End of the window (exclusive), in seconds since each process was initialized
+    :return: DataFrame containing the log data of the window, in the layout of parse_log_files
+    """
+    log_paths = list(find_run_log_files(os.path.join(folder_path, f"run_{run_number}")).values())
+    indexes = {log_path: read_log_index(log_path) for log_path in log_paths if log_path.endswith(INDEX_SUFFIX)}
+
+    # wall clock times of the window's start and end in every segmented log
+    window_times = []
+    for entries in indexes.values():
+        start_monotonic_ns = entries[0]["state"]["start_monotonic_ns"] if entries else None
+        if start_monotonic_ns is not None:
+            wall_offset = entries[0]["first_time_ns"] - entries[0]["first_monotonic_ns"]
+            window_times += [start_monotonic_ns + wall_offset + int(seconds * 1_000_000_000)
+                             if math.isfinite(seconds) else seconds for seconds in (start_seconds, end_seconds)]
+
+    frames = []
+    prior_max_clock = 0  # highest clock of the run before the segments read
+    for log_path in log_paths:
+        if log_path not in indexes:
+            frames.append(parse_log_file(log_path, run_number))
+            continue
+        entries = indexes[log_path]
+        if window_times:
+            first = next((i for i, entry in enumerate(entries) if entry["last_time_ns"] >= min(window_times)),
+                         len(entries))
+            last = max((i for i, entry in enumerate(entries) if entry["first_time_ns"] <= max(window_times)),
+                       default=-1)
+        else:
+            first, last = 0, len(entries) - 1
+        if first > 0:
+            state = entries[first - 1]["state"]
+            last_clock = state["last_clock"] or 0
+            if state.get("clock_type") == CLOCK_CODES[CLOCK_HYBRID]:
+                # parsed hybrid clocks are in milliseconds
+                last_clock >>= HYBRID_COUNTER_BITS
+            prior_max_clock = max(prior_max_clock, last_clock)
+        frames.append(parse_segmented_log(log_path, run_number, range(first, last + 1)))
+
+    df = compute_drift(correct_clock_offsets(concat_log_frames(frames), folder_path))
+    df["Max Clock"] = np.maximum(df["Max Clock"], prior_max_clock)
+    df["Drift"] = df["Max Clock"] - df["Logical Clock"]
+    in_window = (df["Elapsed Seconds"] >= start_seconds) & (df["Elapsed Seconds"] < end_seconds)
+    return df[in_window].reset_index(drop=True)
+
+
 def main():
-    # Process all log files in the logs directory
-    df = parse_log_files(LOG_DIR)
-    summary_df, drift_df = compute_statistics(df)
-    plot_statistics(summary_df, drift_df)
+    parser = argparse.ArgumentParser(
+        description="Computes and plots statistics from experiment logs.")
+    parser.add_argument("folders", nargs="*", metavar="folder",
+                        help="Experiment folders to analyze (default: the latest logs/exp_x folder)")
+    parser.add_argument("--all", action="store_true",
+                        help="Analyze every logs/exp_x folder")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of processes rendering figures (default: one per CPU)")
+    parser.add_argument("--compare", nargs="+", metavar="FOLDER",
+                        help="Compare drift and queue growth across experiment folders with different numbers of machines")
+    parser.add_argument("--run", type=int, default=None,
+                        help="Print statistics of one run of the experiment folder instead of plotting (with --seconds)")
+    parser.add_argument("--seconds", type=float, nargs=2, metavar=("START", "END"), default=None,
+                        help="Window of elapsed seconds of --run to print statistics of, e.g. 20 40")
+    parser.add_argument("--ingest", action="store_true",
+                        help="Also ingest the analyzed experiments into the results database (see results_store.py)")
+    parser.add_argument("--db", default=results_store.RESULTS_DB,
+                        help=f"Path to the results database of --ingest (default: {results_store.RESULTS_DB})")
+    args = parser.parse_args()
+
+    if args.run is not None:
+        folder_path = args.folders[0] if args.folders else latest_exp_folder()
+        start_seconds, end_seconds = args.seconds if args.seconds is not None else (0, float("inf"))
+        summary_df, _ = compute_statistics(load_time_range(folder_path, args.run, start_seconds, end_seconds))
+        print(summary_df.to_string())
+        print("Analysis complete.")
+        return
+
+    if args.compare:
+        print(compare_cluster_sizes(args.compare).to_string())
+        print("Analysis complete.")
+        return
+
+    # Process all log files in each experiment folder, and plot them to figures/<experiment>
+    folder_paths = exp_folders() if args.all else args.folders or [latest_exp_folder()]
+    df = None
+    if len(folder_paths) == 1:
+        df = parse_log_files(folder_paths[0])
+        summary_df, drift_df = compute_statistics(df)
+        rendered = int(plot_statistics(summary_df, drift_df, experiment_figure_dir(folder_paths[0]),
+                                       workers=args.workers))
+    else:
+        rendered = plot_experiments(folder_paths, workers=args.workers)
+
+    if args.ingest:
+        # experiments analyzed on the process pool are read back from the parsed log cache
+        store = results_store.ResultsStore(args.db)
+        try:
+            for folder_path in folder_paths:
+                ingested = store.ingest_experiment(folder_path, df=df)
+                print(f"{'Ingested' if ingested else 'Skipped (unchanged)'} {folder_path}")
+        finally:
+            store.close()
 
-    print("Analysis complete.")
+    print(f"Analysis complete. Rendered figures of {rendered} of {len(folder_paths)} experiments "
+          f"(the rest were unchanged).")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import sys
+import time
+
+from machine import Machine, machine_seed
+from scheduler import TickScheduler, OVERRUN_CATCH_UP
+from topology import DEFAULT_HOST, build_host_map, build_port_map, build_topology
+from logger import LogWriter, build_log_options
+from logical_clocks import CLOCK_LAMPORT
+from message_queue import build_queue_options
+from barrier import StartSignal
+from metrics import MetricsServer, build_metrics_address
+
+
+class MachineProtocol(asyncio.DatagramProtocol):
+    def __init__(self, machine):
+        """
+        Initializes the datagram protocol that receives messages for a machine.
+
+        :param machine: AsyncMachine receiving the messages
+        """
+        self.machine = machine
+
+    def datagram_received(self, data, addr):
+        try:
+            self.machine.receive(data)
+        except Exception as e:
+            print(f"ERROR: Can't receive message: {e}")
+
+    def error_received(self, exc):
+        if self.machine.running:
+            print(f"ERROR: Can't receive message: {exc}")
+
+
+class DatagramConnection:
+    def __init__(self, machine, address):
+        """
+        Initializes a connection that sends messages from a machine's datagram endpoint.
+
+        :param machine: AsyncMachine sending the messages
+        :param address: (host, port) of the other machine
+        """
+        self.machine = machine
+        self.address = address
+
+    def sendall(self, data):
+        """
+        Sends a message to the other machine.
+
+        :param data: Message bytes
+        """
+        self.machine.endpoint.sendto(data, self.address)
+
+    def close(self):
+        pass
+
+
+class AsyncMachine(Machine):
+    def __init__(self, *args, **kwargs):
+        """
+        Initializes a virtual machine that runs as asyncio tasks on an event loop, so many
+        machines can share one process.
+
+        The machine receives and sends on a single datagram endpoint, which is opened by
+        open(). Takes the same arguments as Machine.
+        """
+        self.endpoint = None
+        super().__init__(*args, **kwargs)
+
+    def open_socket(self):
+        # the datagram endpoint is opened by open(), on the event loop
+        self.socket = None
+        self.transport = None
+
+    def open_connection(self, machine_id, port):
+        return DatagramConnection(self, (self.host_map.get(machine_id, self.host), port))
+
+    async def open(self):
+        """
+        Opens this machine's datagram endpoint and starts receiving messages.
+        """
+        loop = asyncio.get_running_loop()
+        self.endpoint, _ = await loop.create_datagram_endpoint(
+            lambda: MachineProtocol(self), local_addr=(self.host, self.port))
+
+    async def start(self):
+        """
+        Runs the clock loop on the event loop until the timeout, then stops the machine.
+        """
+        loop = asyncio.get_running_loop()
+        stop_handle = loop.call_later(self.timeout, self.shutdown)
+
+        # simulate clock rate, with ticks due at fixed intervals from the start
+        self.scheduler = TickScheduler(self.clock_rate, self.overrun_policy)
+        probe_task = loop.create_task(self.probe_clocks()) if self.probe_interval else None
+        while self.running:
+            await asyncio.sleep(self.scheduler.due())
+            if not self.running:
+                break
+            self.metrics.tick(self.scheduler.start_tick(), self.queue.qsize())
+            self.run()
+        stop_handle.cancel()
+        if probe_task is not None:
+            probe_task.cancel()
+
+    async def probe_clocks(self):
+        """
+        Probes the peers' wall clocks every probe_interval seconds while the machine runs.
+        """
+        while self.running:
+            self.send_probes()
+            await asyncio.sleep(self.probe_interval)
+
+    def shutdown(self):
+        """
+        Stops the virtual machine, closes its datagram endpoint and flushes its log.
+        """
+        if not self.running:
+            return
+        if self.endpoint is not None:
+            self.endpoint.close()
+        super().shutdown()
+
+
+async def run_machines(log_file_path, host, port_map, max_clock_rate, max_event_num, timeout, log_format="text",
+                       topology=None, overrun_policy=OVERRUN_CATCH_UP, queue_options=None, start_signal=None,
+                       metrics_address=None, seed=None, trace=False, log_options=None,
+                       clock_type=CLOCK_LAMPORT, host_map=None, probe_interval=0):
+    """
+    Runs every machine in the port map on the current event loop.
+
+    All endpoints are opened before any machine starts ticking, so no machine sends messages
+    to a machine that isn't listening yet. With a start signal, the process then also waits
+    for the launcher to release it.
+
+    :param log_file_path: Path to log folder for this experiment run
+    :param host: Hostname of the machines that aren't in the host map
+    :param port_map: Dictionary of port numbers for each machine
+    :param max_clock_rate: Maximum clock rate in operations/second
+    :param max_event_num: Maximum number for determining what event to perform on each clock cycle
+    :param timeout: How long to run the machines before stopping, in seconds
+    :param log_format: Format of the log files, "text" or "binary" (default: "text")
+    :param topology: Topology deciding which machines to send messages to (default: a ring of all machines)
+    :param overrun_policy: How the tick schedulers handle overruns (default: "catch-up")
+    :param queue_options: MessageQueue keyword arguments for every machine (default: an unbounded queue)
+    :param start_signal: StartSignal to wait on once every endpoint is open (default: don't wait)
+    :param metrics_address: (host, port) or UNIX socket path to serve every machine's live metrics on (default: don't
+        serve them)
+    :param seed: Seed of the run, from which each machine's seed is derived (default: unseeded)
+    :param trace: Whether to record each machine's event draws and message arrivals for replay.py (default: False)
+    :param log_options: EventLogger keyword arguments for every machine (default: one log file per machine)
+    :param clock_type: Type of logical clock of every machine (default: "lamport")
+    :param host_map: Dictionary of hostnames for each machine, each of which must be an address of this computer
+        (default: every machine is on `host`)
+    :param probe_interval: Seconds between probes of each machine's peers' wall clocks, or 0 to not probe (default: 0)
+    :return: List of the stopped machines
+    """
+    host_map = host_map or {}
+    # one thread writes the logs of every machine in the process
+    writer = LogWriter()
+    log_options = dict(log_options or {}, writer=writer)
+    machines = [AsyncMachine(int(machine_id), log_file_path, host_map.get(machine_id, host), port_map, max_clock_rate,
+                             max_event_num, timeout, log_format, topology=topology, overrun_policy=overrun_policy,
+                             queue_options=queue_options, seed=machine_seed(seed, machine_id), trace=trace,
+                             log_options=log_options, clock_type=clock_type, host_map=host_map,
+                             probe_interval=probe_interval)
+                for machine_id in port_map]
+    # one endpoint serves the metrics of every machine in the process
+    metrics_server = MetricsServer([machine.metrics for machine in machines],
+                                   metrics_address) if metrics_address is not None else None
+    try:
+        await asyncio.gather(*(machine.open() for machine in machines))
+        for machine in machines:
+            machine.ready_ns = time.monotonic_ns()
+        if start_signal is not None:
+            await asyncio.get_running_loop().run_in_executor(None, start_signal.wait, machines[0].id)
+        for machine in machines:
+            machine.released_ns = time.monotonic_ns()
+        await asyncio.gather(*(machine.start() for machine in machines))
+    finally:
+        for machine in machines:
+            machine.shutdown()
+        if metrics_server is not None:
+            metrics_server.close()
+        writer.close()
+    return machines
+
+
+# Takes 1 command line argument, plus an optional second:
+# Log file path
+# Config file path (default: ../config.json)
+if __name__ == '__main__':
+    config_path = sys.argv[2] if len(sys.argv) > 2 else "../config.json"
+    with open(config_path) as f:
+        config = json.load(f)
+    ports = build_port_map(config)
+    hosts = build_host_map(config)
+
+    start = time.perf_counter()
+    machines = asyncio.run(run_machines(sys.argv[1], config.get("HOST", DEFAULT_HOST), ports, config["MAX_CLOCK_RATE"],
+                                        config["MAX_EVENT_NUM"], config["EXPERIMENT_DURATION"],
+                                        config.get("LOG_FORMAT", "text"), build_topology(config, list(ports)),
+                                        config.get("OVERRUN_POLICY", OVERRUN_CATCH_UP), build_queue_options(config),
+                                        StartSignal.from_environment(),
+                                        build_metrics_address(config, ports[min(ports, key=int)],
+                                                              hosts[min(ports, key=int)]),
+                                        config.get("SEED"), config.get("TRACE", False),
+                                        build_log_options(config), config.get("CLOCK_TYPE", CLOCK_LAMPORT), hosts,
+                                        config.get("CLOCK_PROBE_INTERVAL", 0)))
+
+    # Report how closely the machines kept their clock rates
+    stats = [machine.scheduler.stats() for machine in machines]
+    print(f"Stopped {len(machines)} machines after {time.perf_counter() - start:.1f} s: "
+          f"{sum(s['ticks'] for s in stats)} ticks, {sum(s['overruns'] for s in stats)} overruns, "
+          f"max lateness {max(s['max_lateness_ns'] for s in stats) / 1000:.1f} us")
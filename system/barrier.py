@@ -0,0 +1,130 @@
+import os
+import select
+import subprocess
+import sys
+import time
+
+# Environment variable holding the file descriptor machines announce their readiness on
+READY_FD_ENV = "MACHINE_READY_FD"
+# Default number of seconds the launcher waits for every machine to be ready
+DEFAULT_READY_TIMEOUT = 30
+
+
+class StartBarrier:
+    def __init__(self):
+        """
+        Initializes the launcher side of a startup barrier between machine processes.
+
+        Each machine process inherits the write end of a pipe, writes its ID to it once its
+        endpoint is open, then waits for a line on its standard input. Once every machine is
+        ready, the launcher writes that line to all of them, so they start ticking together.
+        """
+        self.read_fd, self.write_fd = os.pipe()
+        self.procs = []
+        self.launch_ns = None  # when the first process was launched
+        self.ready_ns = {}  # when each machine was ready, by machine ID
+        self.release_ns = None  # when the machines were told to start
+
+    def spawn(self, args):
+        """
+        Launches a machine process that takes part in the barrier.
+
+        :param args: Command line of the process
+        :return: Popen of the process
+        """
+        if self.launch_ns is None:
+            self.launch_ns = time.monotonic_ns()
+        proc = subprocess.Popen(args, stdin=subprocess.PIPE, pass_fds=(self.write_fd,),
+                                env=dict(os.environ, **{READY_FD_ENV: str(self.write_fd)}))
+        self.procs.append(proc)
+        return proc
+
+    def wait(self, count, timeout=DEFAULT_READY_TIMEOUT):
+        """
+        Waits until `count` machines are ready, or one of the processes has exited.
+
+        :param count: Number of machines taking part
+        :param timeout: Maximum number of seconds to wait (default: DEFAULT_READY_TIMEOUT)
+        :return: Whether every machine is ready
+        """
+        # only the machine processes may hold the write end now
+        os.close(self.write_fd)
+        deadline = time.monotonic() + timeout
+        buffer = b""
+        while len(self.ready_ns) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or any(proc.poll() is not None for proc in self.procs):
+                return False
+            if not select.select([self.read_fd], [], [], min(remaining, 0.1))[0]:
+                continue
+            data = os.read(self.read_fd, 4096)
+            if not data:
+                return False
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                self.ready_ns[int(line)] = time.monotonic_ns()
+        return True
+
+    def release(self):
+        """
+        Tells every machine to start (also called if waiting failed, so no machine waits forever).
+        """
+        self.release_ns = time.monotonic_ns()
+        for proc in self.procs:
+            try:
+                proc.stdin.write(b"start\n")
+                proc.stdin.close()
+            except (BrokenPipeError, ValueError):
+                pass  # the process has already exited
+        os.close(self.read_fd)
+
+    def stats(self, first_ticks_ns=None):
+        """
+        Returns how long the machines took to start, measured from the first launch.
+
+        :param first_ticks_ns: Monotonic time of each machine's first tick, by machine ID (default: unknown)
+        :return: Dictionary of the time each machine was ready, the time they were released and the time of each
+            machine's first tick, in nanoseconds
+        """
+        return {
+            "ready_ns": {str(machine_id): ready - self.launch_ns
+                         for machine_id, ready in sorted(self.ready_ns.items())},
+            "release_ns": self.release_ns - self.launch_ns,
+            "first_tick_ns": {machine_id: first_tick - self.launch_ns
+                              for machine_id, first_tick in (first_ticks_ns or {}).items()},
+        }
+
+
+class StartSignal:
+    def __init__(self, ready_fd, start_file):
+        """
+        Initializes the machine side of a startup barrier.
+
+        :param ready_fd: File descriptor to announce readiness on
+        :param start_file: File the launcher writes a line to once every machine is ready
+        """
+        self.ready_fd = ready_fd
+        self.start_file = start_file
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Returns the start signal of a machine launched by a StartBarrier.
+
+        :return: StartSignal, or None if the machine wasn't launched by a StartBarrier
+        """
+        if READY_FD_ENV not in os.environ:
+            return None
+        return cls(int(os.environ[READY_FD_ENV]), sys.stdin)
+
+    def wait(self, machine_id):
+        """
+        Announces that a machine is ready, then waits until every machine is.
+
+        :param machine_id: ID of the machine (or of one machine, for a process running several)
+        """
+        os.write(self.ready_fd, f"{machine_id}\n".encode())
+        os.close(self.ready_fd)
+        # the launcher closes standard input if it fails, so a machine never waits forever
+        self.start_file.readline()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from logical_clocks import CLOCK_TYPES, build_logical_clock
+from wire import decode_message, encode_message
+
+
+def build_clocks(clock_type, num_machines, seed):
+    """
+    Creates a sending and a receiving clock that have already exchanged messages with every
+    machine, so vector timestamps have no zero entries.
+
+    :param clock_type: Type of logical clock
+    :param num_machines: Number of machines of the run
+    :param seed: Random seed of the clocks' history
+    :return: Tuple of (sending clock, receiving clock)
+    """
+    rng = random.Random(seed)
+    machine_ids = [str(machine_id) for machine_id in range(1, num_machines + 1)]
+    sender, receiver = (build_logical_clock(clock_type, machine_id, machine_ids) for machine_id in machine_ids[:2])
+    for clock in (sender, receiver):
+        for _ in range(rng.randint(100, 1000)):
+            clock.tick()
+        if clock_type == "vector":
+            clock.receive(tuple(rng.randint(1, 100_000) for _ in machine_ids))
+    return sender, receiver
+
+
+def benchmark(clock_type, num_machines, messages):
+    """
+    Measures the CPU time of sending and receiving messages with one type of logical clock.
+
+    :param clock_type: Type of logical clock
+    :param num_machines: Number of machines of the run
+    :param messages: Number of messages to send
+    :return: Dictionary of nanoseconds per message to encode, decode and receive, and bytes per datagram
+    """
+    sender, receiver = build_clocks(clock_type, num_machines, seed=num_machines)
+    datagrams = []
+    start = time.process_time_ns()
+    for sequence in range(messages):
+        sender.tick()
+        datagrams.append(encode_message(1, sequence, [sender.timestamp()], sender))
+    encoded = time.process_time_ns()
+    timestamps = [decode_message(data, receiver)[2][0] for data in datagrams]
+    decoded = time.process_time_ns()
+    for timestamp in timestamps:
+        receiver.receive(timestamp)
+    received = time.process_time_ns()
+    return {"encode_ns": (encoded - start) / messages, "decode_ns": (decoded - encoded) / messages,
+            "receive_ns": (received - decoded) / messages,
+            "bytes": sum(map(len, datagrams)) / messages}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compares the per-message cost and datagram size of the logical clock types.")
+    parser.add_argument("--clock-types", nargs="+", choices=CLOCK_TYPES, default=CLOCK_TYPES,
+                        help="Clock types to compare (default: all)")
+    parser.add_argument("--machines", type=int, nargs="+", default=[3, 10, 100, 300],
+                        help="Numbers of machines (default: 3 10 100 300)")
+    parser.add_argument("--messages", type=int, default=20_000,
+                        help="Number of messages sent per measurement (default: 20,000)")
+    args = parser.parse_args()
+
+    print(f"{'Clock':<8} {'Machines':>8} {'encode':>10} {'decode':>10} {'receive':>10} {'datagram':>10}")
+    for clock_type in args.clock_types:
+        for num_machines in args.machines:
+            result = benchmark(clock_type, num_machines, args.messages)
+            print(f"{clock_type:<8} {num_machines:>8} {result['encode_ns']:>7,.0f} ns {result['decode_ns']:>7,.0f} ns "
+                  f"{result['receive_ns']:>7,.0f} ns {result['bytes']:>8,.0f} B")
+
+
+if __name__ == "__main__":
+    main()
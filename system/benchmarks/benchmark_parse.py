@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from analyze_logs import parse_log_files, parse_log_file, parse_log_file_by_line
+from synthetic_logs import write_synthetic_run
+
+
+def time_parse(folder_path, parse_file):
+    """
+    Times parse_log_files on a folder with the given per-file parser.
+
+    :param folder_path: Path to the experiment folder
+    :param parse_file: Function used to parse each log file
+    :return: Tuple of (parsed DataFrame, seconds taken)
+    """
+    start = time.perf_counter()
+    df = parse_log_files(folder_path, parse_file, cache_dir=None)
+    return df, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compares the vectorized, line-by-line and binary log parsers on synthetic logs.")
+    parser.add_argument("--lines", type=int, default=3_000_000,
+                        help="Total number of log lines to generate (default: 3,000,000)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder_path:
+        print(f"Writing {args.lines:,} synthetic log lines...")
+        write_synthetic_run(os.path.join(folder_path, "run_1"), args.lines)
+
+        vectorized_df, vectorized_seconds = time_parse(
+            folder_path, parse_log_file)
+        by_line_df, by_line_seconds = time_parse(
+            folder_path, parse_log_file_by_line)
+
+    with tempfile.TemporaryDirectory() as folder_path:
+        write_synthetic_run(os.path.join(folder_path, "run_1"),
+                            args.lines, log_format="binary")
+        binary_df, binary_seconds = time_parse(folder_path, parse_log_file)
+
+    pd.testing.assert_frame_equal(vectorized_df, by_line_df)
+    pd.testing.assert_frame_equal(vectorized_df, binary_df)
+    print(f"Line-by-line: {by_line_seconds:.2f} s ({args.lines / by_line_seconds:,.0f} lines/s)")
+    print(f"Vectorized:   {vectorized_seconds:.2f} s ({args.lines / vectorized_seconds:,.0f} lines/s)")
+    print(f"Binary:       {binary_seconds:.2f} s ({args.lines / binary_seconds:,.0f} lines/s)")
+    print(f"Speedup:      {by_line_seconds / vectorized_seconds:.1f}x (text), {by_line_seconds / binary_seconds:.1f}x (binary)")
+
+
+if __name__ == "__main__":
+    main()
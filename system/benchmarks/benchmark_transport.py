@@ -0,0 +1,146 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from transport import TRANSPORTS, TRANSPORT_INPROCESS, build_transport
+from wire import decode_message, encode_message
+
+# Ports of the benchmark's receiving and sending endpoints
+RECEIVER_PORT = 43001
+SENDER_PORT = 43002
+# Seconds without a datagram after which the receiver stops waiting for lost ones
+IDLE_TIMEOUT = 1.0
+
+
+def receive_messages(transport, count, ready, results):
+    """
+    Receives up to `count` messages, recording how long each one took to arrive.
+
+    Each message carries its send time (time.monotonic_ns) in place of a logical clock value.
+
+    :param transport: Opened Transport to receive on
+    :param count: Number of messages sent
+    :param ready: Event set once the transport is receiving
+    :param results: Queue the (latencies in ns, last arrival time in ns) tuple is put on
+    """
+    latencies = []
+    last_arrival_ns = None
+    ready.set()
+    while len(latencies) < count:
+        datagrams = transport.receive(IDLE_TIMEOUT)
+        if not datagrams:
+            break
+        arrival_ns = time.monotonic_ns()
+        for data in datagrams:
+            latencies += [arrival_ns - sent_ns for sent_ns in decode_message(data)[2]]
+        last_arrival_ns = arrival_ns
+    transport.close()
+    results.put((latencies, last_arrival_ns))
+
+
+def run_receiver(name, host, count, ready, results):
+    """
+    Opens the receiving endpoint of a transport and receives messages (run in a child process).
+
+    :param name: Name of the transport
+    :param host: Hostname of the endpoints
+    :param count: Number of messages sent
+    :param ready: Event set once the transport is receiving
+    :param results: Queue the results are put on
+    """
+    transport = build_transport(name, host, RECEIVER_PORT)
+    transport.open([SENDER_PORT])
+    receive_messages(transport, count, ready, results)
+
+
+def send_messages(name, host, count, interval, ready, results):
+    """
+    Sends messages over a transport once the receiver is ready.
+
+    :param name: Name of the transport
+    :param host: Hostname of the endpoints
+    :param count: Number of messages to send
+    :param interval: Seconds between messages, or 0 to send them as fast as possible
+    :param ready: Event set once the receiver is receiving
+    :param results: Queue the time of the first send, in ns, is put on
+    """
+    ready.wait()
+    connection = build_transport(name, host, SENDER_PORT).connect(RECEIVER_PORT)
+    results.put(time.monotonic_ns())
+    for sequence in range(count):
+        connection.sendall(encode_message(1, sequence, [time.monotonic_ns()]))
+        if interval:
+            time.sleep(interval)
+    connection.close()
+
+
+def benchmark(name, host, count, interval):
+    """
+    Sends messages over a transport between two processes (or threads, for the in-process
+    transport).
+
+    :param name: Name of the transport
+    :param host: Hostname of the endpoints
+    :param count: Number of messages to send
+    :param interval: Seconds between messages, or 0 to send them as fast as possible
+    :return: Tuple of (latencies in ns, seconds from the first send to the last arrival)
+    """
+    if name == TRANSPORT_INPROCESS:
+        # in-process machines share memory, so they must be threads
+        ready, start_times, results = threading.Event(), queue.Queue(), queue.Queue()
+        receiver = build_transport(name, host, RECEIVER_PORT)
+        receiver.open([SENDER_PORT])
+        workers = [threading.Thread(target=receive_messages, args=(receiver, count, ready, results)),
+                   threading.Thread(target=send_messages, args=(name, host, count, interval, ready, start_times))]
+    else:
+        ready, start_times, results = multiprocessing.Event(
+        ), multiprocessing.Queue(), multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=run_receiver, args=(name, host, count, ready, results)),
+                   multiprocessing.Process(target=send_messages, args=(name, host, count, interval, ready, start_times))]
+    for worker in workers:
+        worker.start()
+    start_ns = start_times.get()
+    latencies, last_arrival_ns = results.get()
+    for worker in workers:
+        worker.join()
+    return latencies, ((last_arrival_ns or start_ns) - start_ns) / 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compares the per-message latency and throughput of the machine transports.")
+    parser.add_argument("--transports", nargs="+", choices=list(TRANSPORTS), default=list(TRANSPORTS),
+                        help="Transports to compare (default: all)")
+    parser.add_argument("--host", default="localhost",
+                        help="Hostname of the UDP endpoints (default: localhost)")
+    parser.add_argument("--latency-messages", type=int, default=2000,
+                        help="Number of spaced-out messages used to measure latency (default: 2,000)")
+    parser.add_argument("--interval", type=float, default=0.0002,
+                        help="Seconds between latency messages (default: 0.0002)")
+    parser.add_argument("--throughput-messages", type=int, default=50_000,
+                        help="Number of back-to-back messages used to measure throughput (default: 50,000)")
+    args = parser.parse_args()
+
+    print(f"{'Transport':<10} {'p50 latency':>12} {'p99 latency':>12} {'throughput':>16} {'lost':>7}")
+    for name in args.transports:
+        latencies, _ = benchmark(
+            name, args.host, args.latency_messages, args.interval)
+        received, seconds = benchmark(
+            name, args.host, args.throughput_messages, 0)
+        p50, p99 = np.percentile(latencies, [50, 99]) / 1000
+        lost = 1 - len(received) / args.throughput_messages
+        print(f"{name:<10} {p50:>9.1f} us {p99:>9.1f} us {len(received) / seconds:>10,.0f} msg/s {lost:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from analyze_logs import compute_statistics, parse_log_files
+from logger import EventLogger, EVENT_INTERNAL
+from machine import Machine
+from synthetic_logs import write_synthetic_run
+from topology import FullMeshTopology
+from transport import TRANSPORT_INPROCESS, TRANSPORT_UDP
+
+# Stored results that new results are compared against
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Results of the latest benchmark run (ignored by git)
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "benchmark_results.json")
+# Shortest analysis time that is gated; shorter times vary too much between runs
+MIN_GATED_SECONDS = 0.1
+# Benchmark groups, in the order they run
+GROUPS = ["saturation", "logger", "udp", "analysis"]
+# Ports of the UDP latency benchmark's machines
+UDP_PORTS = {"1": 43301, "2": 43302}
+# Ports (only used as names) of the saturation benchmark's in-process machines
+SATURATION_PORTS = {"1": 43201, "2": 43202, "3": 43203}
+
+
+class ThreadStartSignal:
+    def __init__(self, parties):
+        """
+        Initializes a start signal for machines running as threads of one process, with the
+        same wait() as barrier.StartSignal.
+
+        :param parties: Number of machines
+        """
+        self.barrier = threading.Barrier(parties)
+
+    def wait(self, machine_id):
+        self.barrier.wait()
+
+
+def metric(value, unit, higher_is_better, gated=True):
+    """
+    Returns a benchmark result.
+
+    :param value: Measured value
+    :param unit: Unit of the value
+    :param higher_is_better: Whether higher values are better (e.g. throughput) or worse (e.g. latency)
+    :param gated: Whether a worse result counts as a regression; tail latencies vary too much between runs to be
+        (default: True)
+    :return: Dictionary of the result
+    """
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better, "gated": gated}
+
+
+def run_at_clock_rate(clock_rate, duration):
+    """
+    Runs three fully connected in-process machines at a fixed clock rate.
+
+    :param clock_rate: Clock rate of every machine, in ticks/second
+    :param duration: Seconds to run for
+    :return: List of the machines' scheduler statistics
+    """
+    os.makedirs("logs/saturation", exist_ok=True)
+    signal = ThreadStartSignal(len(SATURATION_PORTS))
+    machines = []
+
+    def run_machine(machine_id):
+        machine = Machine(int(machine_id), "saturation", "localhost", SATURATION_PORTS, 1, 10, duration,
+                          topology=FullMeshTopology(list(SATURATION_PORTS)), transport=TRANSPORT_INPROCESS,
+                          start_signal=signal, clock_rate=clock_rate)
+        machines.append(machine)
+        machine.start()
+
+    threads = [threading.Thread(target=run_machine, args=(machine_id,))
+               for machine_id in SATURATION_PORTS]
+    # machines print their stats when they stop
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # wait for the timers that stop the machines to finish printing
+        for thread in threading.enumerate():
+            if isinstance(thread, threading.Timer):
+                thread.join()
+    return [machine.scheduler.stats() for machine in machines]
+
+
+def benchmark_saturation(clock_rates, duration, repeats):
+    """
+    Ramps up the clock rate of three machines in one process until their ticks overrun.
+
+    A rate is sustained if every machine ran at least 95% of its ticks and fewer than 5% of its
+    ticks overran. A rate that isn't sustained is tried again, up to `repeats` times, so a
+    burst of load from other processes doesn't end the ramp.
+
+    :param clock_rates: Clock rates to try, in increasing order
+    :param duration: Seconds to run at each rate
+    :param repeats: Number of tries at each rate
+    :return: Dictionary of results
+    """
+    results = {}
+    saturation_rate = 0
+    for clock_rate in clock_rates:
+        for _ in range(repeats):
+            stats = run_at_clock_rate(clock_rate, duration)
+            actual_rate = min(s["actual_rate"] for s in stats)
+            overruns = max(s["overruns"] / max(s["ticks"], 1) for s in stats)
+            print(f"\tClock rate {clock_rate}: {actual_rate:,.0f} ticks/s, {overruns:.1%} overruns")
+            sustained = actual_rate >= 0.95 * clock_rate and overruns < 0.05
+            if sustained:
+                break
+        if not sustained:
+            break
+        saturation_rate = clock_rate
+        results[f"saturation.p99_lateness_us.{clock_rate}"] = metric(
+            max(s["p99_lateness_ns"] for s in stats) / 1000, "us", False, gated=False)
+    results["saturation.clock_rate"] = metric(saturation_rate, "ticks/s", True)
+    return results
+
+
+def benchmark_logger(calls, repeats):
+    """
+    Measures the time log_event takes in the caller's thread, for each log format.
+
+    :param calls: Number of events to log
+    :param repeats: Number of measurements, of which the fastest is kept
+    :return: Dictionary of results
+    """
+    results = {}
+    os.makedirs("logs/logger", exist_ok=True)
+    for log_format in ("text", "binary"):
+        elapsed = float("inf")
+        for _ in range(repeats):
+            logger = EventLogger("logger", 1, log_format=log_format)
+            start = time.perf_counter_ns()
+            for i in range(calls):
+                logger.log_event(EVENT_INTERNAL, 0, i)
+            elapsed = min(elapsed, time.perf_counter_ns() - start)
+            logger.close()
+        results[f"logger.{log_format}.ns_per_call"] = metric(
+            elapsed / calls, "ns", False)
+        print(f"\t{log_format}: {elapsed / calls:,.0f} ns per log_event call")
+    return results
+
+
+def benchmark_udp(messages, interval, repeats):
+    """
+    Measures the latency of messages sent over UDP between two machines, from send_message to
+    the receiving machine's queue.
+
+    :param messages: Number of messages to send
+    :param interval: Seconds between messages
+    :param repeats: Number of measurements, of which the lowest latencies are kept
+    :return: Dictionary of results
+    """
+    os.makedirs("logs/udp", exist_ok=True)
+    sender, receiver = [Machine(int(machine_id), "udp", "localhost", UDP_PORTS, 1, 10, 60, transport=TRANSPORT_UDP)
+                        for machine_id in UDP_PORTS]
+
+    # each message carries its send time in place of a logical clock value
+    latencies = []
+    put_many = receiver.queue.put_many
+
+    def timed_put_many(clocks):
+        arrival_ns = time.monotonic_ns()
+        latencies.extend(arrival_ns - sent_ns for sent_ns in clocks)
+        put_many(clocks)
+    receiver.queue.put_many = timed_put_many
+
+    percentiles = []
+    for _ in range(repeats):
+        latencies.clear()
+        for _ in range(messages):
+            sender.send_message("2", [time.monotonic_ns()])
+            time.sleep(interval)
+        time.sleep(0.1)
+        percentiles.append(np.percentile(latencies, [50, 99]) / 1000)
+        print(f"\tp50 {percentiles[-1][0]:.1f} us, p99 {percentiles[-1][1]:.1f} us, "
+              f"{len(latencies)} of {messages} received")
+    for machine in (sender, receiver):
+        machine.shutdown()
+
+    p50, p99 = np.min(percentiles, axis=0)
+    return {"udp.p50_latency_us": metric(p50, "us", False),
+            "udp.p99_latency_us": metric(p99, "us", False, gated=False)}
+
+
+def benchmark_analysis(sizes, repeats):
+    """
+    Measures the throughput of parse_log_files and compute_statistics on synthetic logs.
+
+    :param sizes: Numbers of log lines
+    :param repeats: Number of measurements, of which the fastest is kept
+    :return: Dictionary of results
+    """
+    results = {}
+    for lines in sizes:
+        parse_seconds = compute_seconds = float("inf")
+        with tempfile.TemporaryDirectory() as folder_path:
+            write_synthetic_run(os.path.join(folder_path, "run_1"), lines)
+            for _ in range(repeats):
+                start = time.perf_counter()
+                df = parse_log_files(folder_path, cache_dir=None)
+                parse_seconds = min(parse_seconds, time.perf_counter() - start)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            compute_statistics(df)
+            compute_seconds = min(compute_seconds, time.perf_counter() - start)
+        results[f"analysis.parse_lines_per_s.{lines}"] = metric(
+            lines / parse_seconds, "lines/s", True, gated=parse_seconds >= MIN_GATED_SECONDS)
+        results[f"analysis.compute_lines_per_s.{lines}"] = metric(
+            lines / compute_seconds, "lines/s", True, gated=compute_seconds >= MIN_GATED_SECONDS)
+        print(f"\t{lines:,} lines: parse {lines / parse_seconds:,.0f} lines/s, "
+              f"compute {lines / compute_seconds:,.0f} lines/s")
+    return results
+
+
+def run_groups(groups, args):
+    """
+    Runs benchmark groups.
+
+    :param groups: Names of the groups to run, from GROUPS
+    :param args: Parsed command line arguments
+    :return: Dictionary of results
+    """
+    benchmarks = {}
+    # machines and loggers write their logs to logs/ in the current folder
+    with tempfile.TemporaryDirectory() as folder_path:
+        cwd = os.getcwd()
+        os.chdir(folder_path)
+        try:
+            for group in groups:
+                print(f"Running {group} benchmarks...")
+                if group == "saturation":
+                    benchmarks.update(
+                        benchmark_saturation(args.clock_rates, args.duration, args.repeats))
+                elif group == "logger":
+                    benchmarks.update(benchmark_logger(args.log_calls, args.repeats))
+                elif group == "udp":
+                    benchmarks.update(
+                        benchmark_udp(args.udp_messages, 0.0005, args.repeats))
+                elif group == "analysis":
+                    benchmarks.update(benchmark_analysis(args.sizes, args.repeats))
+        finally:
+            os.chdir(cwd)
+    return benchmarks
+
+
+def merge_best(benchmarks, new_benchmarks):
+    """
+    Keeps the better of two measurements of each benchmark.
+
+    :param benchmarks: Dictionary of results, updated in place
+    :param new_benchmarks: Dictionary of new results of some of the benchmarks
+    """
+    for name, result in new_benchmarks.items():
+        old = benchmarks.get(name)
+        if old is None or (result["value"] > old["value"] if result["higher_is_better"]
+                           else result["value"] < old["value"]):
+            benchmarks[name] = result
+
+
+def write_results(results, path):
+    """
+    Writes benchmark results to a JSON file.
+
+    :param results: Benchmark results
+    :param path: Path of the file
+    """
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results are stored in {path}.")
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares benchmark results against a baseline.
+
+    :param results: Benchmark results
+    :param baseline: Baseline benchmark results
+    :param tolerance: Largest relative change in the worse direction that isn't a regression
+    :return: List of the names of regressed benchmarks
+    """
+    regressions = []
+    print(f"\n{'Benchmark':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        base = baseline["benchmarks"][name]["value"]
+        change = result["value"] / base - 1 if base else 0.0
+        worse = -change if result["higher_is_better"] else change
+        flag = ""
+        if not result["gated"]:
+            flag = "  (not gated)"
+        elif worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40} {base:>12,.1f} {result['value']:>12,.1f} {change:>+8.1%}{flag}")
+    if baseline.get("settings") != results["settings"]:
+        print("WARNING: The baseline was measured with different settings")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measures machine, logger, UDP and analysis performance, and compares it against a baseline.")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=GROUPS,
+                        help="Benchmark groups to run (default: all)")
+    parser.add_argument("--clock-rates", type=int, nargs="+", default=[100, 200, 500, 1000, 2000, 5000, 10000],
+                        help="Clock rates to ramp through (default: 100 to 10,000)")
+    parser.add_argument("--duration", type=float, default=1.0,
+                        help="Seconds to run at each clock rate (default: 1)")
+    parser.add_argument("--log-calls", type=int, default=100_000,
+                        help="Number of log_event calls to time (default: 100,000)")
+    parser.add_argument("--udp-messages", type=int, default=1000,
+                        help="Number of messages sent between the UDP machines (default: 1,000)")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Number of times each benchmark is measured, keeping the best result, so that one slow run "
+                             "isn't reported as a regression (default: 5)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Numbers of synthetic log lines to analyze, up to 10,000,000 (default: 10^4 to 10^6)")
+    parser.add_argument("--output", default=RESULTS_PATH,
+                        help="Path to write the results to (default: benchmarks/benchmark_results.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH,
+                        help="Path of the baseline to compare against (default: baseline.json next to this script)")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative change in the worse direction counted as a regression (default: 0.2)")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="Number of times regressed benchmarks are measured again before they are reported, "
+                             "keeping the best results (default: 2)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store the results as the new baseline instead of comparing against it")
+    args = parser.parse_args()
+
+    settings = {name: getattr(args, name) for name in
+                ("clock_rates", "duration", "log_calls", "udp_messages", "repeats", "sizes")}
+    results = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "settings": settings,
+        "benchmarks": run_groups(args.only, args),
+    }
+    output_path = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+
+    if args.save_baseline:
+        write_results(results, output_path)
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline is stored in {baseline_path}.")
+        return
+    if not os.path.exists(baseline_path):
+        write_results(results, output_path)
+        print(f"No baseline at {baseline_path}; run with --save-baseline to store one.")
+        return
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for _ in range(args.confirm):
+        if not regressions:
+            break
+        # measure the groups of the regressed benchmarks again, keeping the best results
+        groups = [group for group in GROUPS if any(name.split(".")[0] == group for name in regressions)]
+        print(f"\nMeasuring {len(regressions)} regressed benchmarks again...")
+        merge_best(results["benchmarks"], run_groups(groups, args))
+        regressions = compare(results, baseline, args.tolerance)
+    write_results(results, output_path)
+    if regressions:
+        print(f"ERROR: {len(regressions)} benchmarks regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
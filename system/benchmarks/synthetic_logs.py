@@ -0,0 +1,72 @@
+import os
+import random
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from logger import format_line, pack_record, write_binary_header, EVENT_FORMATS, LOG_EXTENSIONS, EVENT_INITIALIZED, EVENT_SENT, EVENT_PROCESSED, EVENT_INTERNAL
+
+# Wall clock start time of synthetic runs, in nanoseconds
+START_NS = 1_740_000_000 * 1_000_000_000
+
+
+def write_synthetic_run(run_path, num_lines, num_machines=3, max_clock_rate=6, max_event_num=10, seed=0, log_format="text"):
+    """
+    Writes log files for a synthetic run in the current log format.
+
+    Events are drawn the same way Machine.run draws them, without any real sockets or sleeping.
+
+    :param run_path: Path to the run folder (created if needed)
+    :param num_lines: Total number of log lines to write across all machines
+    :param num_machines: Number of machines in the run (default: 3)
+    :param max_clock_rate: Maximum clock rate (default: 6)
+    :param max_event_num: Maximum number for determining events (default: 10)
+    :param seed: Random seed (default: 0)
+    :param log_format: Format of the log files, "text" or "binary" (default: "text")
+    """
+    os.makedirs(run_path, exist_ok=True)
+    rng = random.Random(seed)
+    lines_per_machine = num_lines // num_machines
+
+    def format_record(process_id, time_ns, monotonic_ns, event_type, args, queue_length, logical_clock):
+        if log_format == "binary":
+            return pack_record(process_id, time_ns, monotonic_ns, event_type, args, queue_length, logical_clock)
+        return format_line(process_id, time_ns, monotonic_ns, EVENT_FORMATS[event_type].format(*args),
+                           queue_length, logical_clock)
+
+    for process_id in range(1, num_machines + 1):
+        clock_rate = rng.randint(1, max_clock_rate)
+        period_ns = 1_000_000_000 // clock_rate
+        logical_clock = 0
+        queue_length = 0
+        records = [format_record(process_id, START_NS, 0, EVENT_INITIALIZED,
+                                 (process_id, clock_rate), 0, 0)]
+        for tick in range(1, lines_per_machine):
+            monotonic_ns = tick * period_ns
+            if queue_length and rng.random() < 0.5:
+                logical_clock += rng.randint(1, 5)
+                event_type, args = EVENT_PROCESSED, ()
+                queue_length -= 1
+            else:
+                logical_clock += 1
+                n = rng.randint(1, max_event_num)
+                if n <= 3:
+                    event_type, args = EVENT_SENT, (process_id % num_machines + 1,)
+                else:
+                    event_type, args = EVENT_INTERNAL, ()
+                if rng.random() < 0.3:
+                    queue_length += 1
+            records.append(format_record(process_id, START_NS + monotonic_ns, monotonic_ns,
+                                         event_type, args, queue_length, logical_clock))
+
+        log_path = os.path.join(
+            run_path, f"process_{process_id}.{LOG_EXTENSIONS[log_format]}")
+        if log_format == "binary":
+            with open(log_path, "wb") as f:
+                write_binary_header(f)
+                f.write(b"".join(records))
+        else:
+            with open(log_path, "w") as f:
+                f.write("".join(records))
@@ -0,0 +1,118 @@
+import heapq
+import threading
+import time
+
+from wire import PROBE_REPLY, PROBE_REQUEST, decode_probe, encode_probe
+
+# Most probes awaiting a reply; the oldest are forgotten first, since their replies were most likely lost
+MAX_PENDING_PROBES = 256
+
+
+class ClockProber:
+    def __init__(self, machine_id, clock=time):
+        """
+        Initializes the clock probes of a machine, which estimate the offset of each peer's wall
+        clock from this machine's, as NTP does.
+
+        A request carries the time it was sent (t1); the peer replies with the times it received
+        the request (t2) and sent the reply (t3), and the reply arrives at t4. The peer's clock is
+        then ((t2 - t1) + (t3 - t4)) / 2 ahead, give or take half the round trip time
+        (t4 - t1) - (t3 - t2), so the sample with the shortest round trip is kept for each peer.
+
+        :param machine_id: ID of the machine
+        :param clock: Source of wall clock time, with time_ns(), as used for log timestamps (default: the time module)
+        """
+        self.machine_id = int(machine_id)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.probe_number = 0  # number of the last probe sent
+        self.pending = {}  # (peer ID, send time in ns) of each probe awaiting a reply, by probe number
+        self.samples = {}  # number of replies from each peer, by peer ID
+        self.best = {}  # (round trip time, offset) in ns of the reply with the shortest round trip, by peer ID
+
+    def request(self, peer_id):
+        """
+        Creates a probe request for a peer.
+
+        :param peer_id: ID of the peer
+        :return: Datagram bytes
+        """
+        with self.lock:
+            self.probe_number += 1
+            if len(self.pending) >= MAX_PENDING_PROBES:
+                del self.pending[next(iter(self.pending))]
+            sent_ns = self.clock.time_ns()
+            self.pending[self.probe_number] = (str(peer_id), sent_ns)
+            return encode_probe(PROBE_REQUEST, self.machine_id, self.probe_number, sent_ns)
+
+    def receive(self, data):
+        """
+        Handles a received probe: answers requests, and records the offset measured by replies.
+
+        :param data: Datagram bytes
+        :return: Tuple of (ID of the requesting peer, reply datagram bytes) for requests, or None for replies
+        """
+        received_ns = self.clock.time_ns()
+        kind, sender_id, probe_number, sent_ns, peer_received_ns, peer_replied_ns = decode_probe(data)
+        if kind == PROBE_REQUEST:
+            return str(sender_id), encode_probe(PROBE_REPLY, self.machine_id, probe_number, sent_ns, received_ns,
+                                                self.clock.time_ns())
+        if kind != PROBE_REPLY:
+            raise ValueError(f"Unknown clock probe kind: {kind}")
+
+        with self.lock:
+            peer_id, pending_sent_ns = self.pending.pop(probe_number, (None, None))
+            # ignore replies to forgotten probes, and replies that don't match their request
+            if peer_id != str(sender_id) or pending_sent_ns != sent_ns:
+                return None
+            offset_ns = ((peer_received_ns - sent_ns) + (peer_replied_ns - received_ns)) // 2
+            round_trip_ns = (received_ns - sent_ns) - (peer_replied_ns - peer_received_ns)
+            self.samples[peer_id] = self.samples.get(peer_id, 0) + 1
+            if peer_id not in self.best or round_trip_ns < self.best[peer_id][0]:
+                self.best[peer_id] = (round_trip_ns, offset_ns)
+        return None
+
+    def stats(self):
+        """
+        Returns the measured offset of each peer's clock.
+
+        :return: Dictionary of the offset and round trip time in ns of the best sample, and the number of samples, by
+            peer ID
+        """
+        with self.lock:
+            return {peer_id: {"offset_ns": offset_ns, "rtt_ns": round_trip_ns, "samples": self.samples[peer_id]}
+                    for peer_id, (round_trip_ns, offset_ns) in sorted(self.best.items(), key=lambda item: int(item[0]))}
+
+
+def estimate_offsets(probes):
+    """
+    Estimates the offset of every machine's wall clock from the clock of the machine with the
+    lowest ID, from the probes each machine measured.
+
+    Machines are linked to the reference machine through the probes with the shortest round
+    trip times (a minimum spanning tree), since those have the smallest errors; each machine's
+    offset is the sum of the offsets along its path.
+
+    :param probes: Dictionary of ClockProber.stats() of each machine, by machine ID
+    :return: Dictionary of the offset in ns of each machine reached by probes, by machine ID (as integers; empty if
+        there were no probes)
+    """
+    links = {}  # (round trip time, peer ID, offset of the peer's clock) of each machine's probes, in both directions
+    for machine_id, peers in probes.items():
+        for peer_id, probe in peers.items():
+            links.setdefault(int(machine_id), []).append((probe["rtt_ns"], int(peer_id), probe["offset_ns"]))
+            links.setdefault(int(peer_id), []).append((probe["rtt_ns"], int(machine_id), -probe["offset_ns"]))
+    if not links:
+        return {}
+
+    offsets = {}
+    reachable = [(0, min(links), 0)]
+    while reachable:
+        _, machine_id, offset_ns = heapq.heappop(reachable)
+        if machine_id in offsets:
+            continue
+        offsets[machine_id] = offset_ns
+        for round_trip_ns, peer_id, peer_offset_ns in links[machine_id]:
+            if peer_id not in offsets:
+                heapq.heappush(reachable, (round_trip_ns, peer_id, offset_ns + peer_offset_ns))
+    return offsets
@@ -0,0 +1,169 @@
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+from analyze_logs import RECORD_DTYPE, is_binary_log, read_log_fields, read_log_index, read_binary_log_fields
+from logger import COMPRESSED_SUFFIX, EVENT_FORMATS, INDEX_SUFFIX, LOG_EXTENSIONS, format_line, segment_name, \
+    write_binary_header
+
+# Regular expression for each event message, capturing the event's arguments
+EVENT_PATTERNS = {
+    event_type: re.compile("^" + re.sub(r"\\\{\d\\\}", r"(-?\\d+)",
+                           re.escape(event_format)) + "$")
+    for event_type, event_format in EVENT_FORMATS.items()
+}
+
+
+def parse_event(event):
+    """
+    Finds the event type and arguments of a logged event message.
+
+    :param event: Event message
+    :return: Tuple of (event type, (arg1, arg2))
+    """
+    for event_type, pattern in EVENT_PATTERNS.items():
+        match = pattern.match(event)
+        if match:
+            args = tuple(int(arg) for arg in match.groups()) + (0, 0)
+            return event_type, args[:2]
+    raise ValueError(f"Unknown event: {event}")
+
+
+def text_to_binary(text_path, binary_path):
+    """
+    Converts a text log file to the binary log format.
+
+    :param text_path: Path to the text log file
+    :param binary_path: Path to write the binary log file to
+    """
+    fields = read_log_fields(text_path)
+    event_codes = fields["Event Codes"]
+
+    # parse each distinct event message once
+    events = np.array([(event_type, arg1, arg2) for event_type, (arg1, arg2) in
+                       map(parse_event, fields["Event Names"])], dtype=np.int64).reshape(-1, 3)
+
+    records = np.zeros(len(event_codes), dtype=RECORD_DTYPE)
+    records["time_ns"] = fields["Time NS"]
+    records["monotonic_ns"] = fields["Monotonic NS"]
+    records["logical_clock"] = fields["Logical Clock"]
+    records["queue_length"] = fields["Queue Length"]
+    records["process_id"] = fields["Process ID"]
+    if len(event_codes):
+        records["event_type"] = events[event_codes, 0]
+        records["arg1"] = events[event_codes, 1]
+        records["arg2"] = events[event_codes, 2]
+
+    with open(binary_path, "wb") as f:
+        write_binary_header(f)
+        f.write(records.tobytes())
+
+
+def binary_to_text(binary_path, text_path):
+    """
+    Converts a binary log file to the text log format.
+
+    :param binary_path: Path to the binary log file
+    :param text_path: Path to write the text log file to
+    """
+    fields = read_binary_log_fields(binary_path)
+    events = fields["Event Names"][fields["Event Codes"]]
+    columns = zip(fields["Process ID"].tolist(), fields["Time NS"].tolist(), fields["Monotonic NS"].tolist(),
+                  events, fields["Queue Length"].tolist(), fields["Logical Clock"].tolist())
+
+    with open(text_path, "w") as f:
+        f.writelines(format_line(*column) for column in columns)
+
+
+def convert_segmented_log(index_path, output_root, to_format, convert):
+    """
+    Converts every segment of a segmented log to another log format, and writes the index of
+    the converted segments. Compressed segments stay compressed, and segments already in the
+    format are copied.
+
+    :param index_path: Path to the index of the log segments (process_x.index.jsonl)
+    :param output_root: Folder to write the converted segments and index to
+    :param to_format: Format to convert to, "text" or "binary"
+    :param convert: Function converting one segment, text_to_binary or binary_to_text
+    """
+    folder = os.path.dirname(index_path)
+    index_name = os.path.basename(index_path)
+    process_id = index_name.removesuffix(f".{INDEX_SUFFIX}").removeprefix("process_")
+    entries = []
+    for entry in read_log_index(index_path):
+        if is_binary_log(entry["segment"]) == (to_format == "binary"):
+            shutil.copy(os.path.join(folder, entry["segment"]), output_root)
+            entries.append(entry)
+            continue
+        compressed = entry["segment"].endswith(COMPRESSED_SUFFIX)
+        number = int(entry["segment"].removesuffix(COMPRESSED_SUFFIX).rsplit(".", 1)[1])
+        name = segment_name(process_id, to_format, number)
+        path = os.path.join(output_root, name)
+        print(f"Converting {os.path.join(folder, entry['segment'])}...")
+        convert(os.path.join(folder, entry["segment"]), path)
+        # the index holds the uncompressed size of each segment
+        entry = dict(entry, segment=name, bytes=os.path.getsize(path))
+        if compressed:
+            with open(path, "rb") as source, gzip.open(path + COMPRESSED_SUFFIX, "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+            entry["segment"] += COMPRESSED_SUFFIX
+        entries.append(entry)
+
+    with open(os.path.join(output_root, index_name), "w") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+
+def convert_folder(folder_path, output_path, to_format):
+    """
+    Converts every log file in an experiment folder to another log format, including the
+    segments of segmented logs.
+
+    The folder structure (run_x folders, README files, and the configuration and stats files)
+    is copied to the output folder.
+
+    :param folder_path: Path to the experiment folder
+    :param output_path: Path to write the converted experiment folder to
+    :param to_format: Format to convert to, "text" or "binary"
+    """
+    from_format = "text" if to_format == "binary" else "binary"
+    convert = text_to_binary if to_format == "binary" else binary_to_text
+    from_extension = f".{LOG_EXTENSIONS[from_format]}"
+
+    for root, _, files in os.walk(folder_path):
+        output_root = os.path.join(
+            output_path, os.path.relpath(root, folder_path))
+        os.makedirs(output_root, exist_ok=True)
+        for file in sorted(files):
+            name, extension = os.path.splitext(file)
+            if extension == from_extension:
+                print(f"Converting {os.path.join(root, file)}...")
+                convert(os.path.join(root, file), os.path.join(
+                    output_root, f"{name}.{LOG_EXTENSIONS[to_format]}"))
+            elif file.endswith(INDEX_SUFFIX):
+                # segments are converted through their index
+                convert_segmented_log(os.path.join(root, file), output_root, to_format, convert)
+            elif extension in (".md", ".json"):
+                shutil.copy(os.path.join(root, file), output_root)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converts experiment logs between the text and binary log formats.")
+    parser.add_argument("folder", help="Experiment folder to convert (e.g. logs/exp_1)")
+    parser.add_argument("output", help="Folder to write the converted logs to")
+    parser.add_argument("--to", choices=list(LOG_EXTENSIONS), default="binary",
+                        help="Log format to convert to (default: binary)")
+    args = parser.parse_args()
+
+    convert_folder(args.folder, args.output, args.to)
+    print("Conversion complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import base64
+import json
+import threading
+
+# Extension of trace files, written next to each machine's log file
+TRACE_EXTENSION = "trace.json"
+# Bump when the trace layout changes
+TRACE_VERSION = 1
+
+
+class RecordingRandom:
+    def __init__(self, rng, draws):
+        """
+        Initializes a random number generator that records every value it draws.
+
+        Only the methods machines draw with (randint and choice) are provided.
+
+        :param rng: Random number generator drawing the values
+        :param draws: List to append the drawn values to (indexes, for choice)
+        """
+        self.rng = rng
+        self.draws = draws
+
+    def randint(self, a, b):
+        value = self.rng.randint(a, b)
+        self.draws.append(value)
+        return value
+
+    def choice(self, seq):
+        index = self.rng.randrange(len(seq))
+        self.draws.append(index)
+        return seq[index]
+
+
+class ReplayedRandom:
+    def __init__(self, draws):
+        """
+        Initializes a random number generator that returns recorded values in order, with the
+        same methods as RecordingRandom.
+
+        :param draws: Values recorded by RecordingRandom
+        """
+        self.draws = iter(draws)
+
+    def randint(self, a, b):
+        return next(self.draws)
+
+    def choice(self, seq):
+        return seq[next(self.draws)]
+
+
+class TraceRecorder:
+    def __init__(self):
+        """
+        Initializes a recorder of the inputs of a machine's run: its clock rate, the peers it
+        connected to, the values its random number generator draws, and which datagrams arrived
+        before each tick.
+
+        A tick and a received batch never overlap while recording, so replaying the batches
+        between the same ticks reproduces the queue every tick saw.
+        """
+        self.lock = threading.Lock()
+        self.ticks = 0  # number of ticks run
+        self.connected = []  # IDs of the peers the machine connected to
+        self.draws = []  # values drawn by the machine's random number generator
+        self.arrivals = []  # (number of ticks run before the batch arrived, datagrams) of each received batch
+
+    def instrument(self, machine):
+        """
+        Records a machine's connections, draws, ticks and received batches.
+
+        :param machine: Machine to record, before it opens its endpoint
+        """
+        machine.rng = RecordingRandom(machine.rng, self.draws)
+        run = machine.run
+        receive_batch = machine.receive_batch
+        open_connection = machine.open_connection
+
+        def traced_open_connection(machine_id, port):
+            connection = open_connection(machine_id, port)
+            self.connected.append(machine_id)
+            return connection
+
+        def traced_run():
+            with self.lock:
+                run()
+                self.ticks += 1
+
+        def traced_receive_batch(datagrams):
+            with self.lock:
+                self.arrivals.append((self.ticks, list(datagrams)))
+                receive_batch(datagrams)
+
+        machine.run = traced_run
+        machine.receive_batch = traced_receive_batch
+        machine.open_connection = traced_open_connection
+
+    def trace(self, machine):
+        """
+        Returns the recorded trace.
+
+        :param machine: Machine that was recorded
+        :return: Dictionary of the trace, as written to trace files
+        """
+        with self.lock:
+            return {
+                "version": TRACE_VERSION,
+                "machine_id": machine.id,
+                "seed": machine.seed,
+                "clock_rate": machine.clock_rate,
+                "connected": list(self.connected),
+                "ticks": self.ticks,
+                "draws": list(self.draws),
+                "arrivals": [[tick, [base64.b64encode(data).decode() for data in datagrams]]
+                             for tick, datagrams in self.arrivals],
+            }
+
+    def write(self, machine, path):
+        """
+        Writes the recorded trace to a file.
+
+        :param machine: Machine that was recorded
+        :param path: Path of the trace file
+        """
+        with open(path, "w") as f:
+            json.dump(self.trace(machine), f)
+
+
+def load_trace(path):
+    """
+    Reads a trace file.
+
+    :param path: Path of the trace file
+    :return: Dictionary of the trace, with each arrival's datagrams decoded to bytes
+    """
+    with open(path) as f:
+        trace = json.load(f)
+    if trace.get("version") != TRACE_VERSION:
+        raise ValueError(f"Unsupported trace file: {path}")
+    trace["arrivals"] = [(tick, [base64.b64decode(data) for data in datagrams])
+                         for tick, datagrams in trace["arrivals"]]
+    return trace
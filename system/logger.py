@@ -1,17 +1,442 @@
+import gzip
+import heapq
+import itertools
+import json
+import os
+import queue
+import shutil
+import struct
+import threading
 import time
 
+# Event types, shared by the text and binary log formats
+EVENT_INITIALIZED = 0
+EVENT_CONNECTED = 1
+EVENT_SENT = 2
+EVENT_PROCESSED = 3
+EVENT_INTERNAL = 4
+EVENT_STOPPED = 5
+EVENT_DROPPED = 6
+EVENT_MERGED = 7
+EVENT_CLOCK_TYPE = 8
 
-def log_event(log_file_path, process_id, event, msg_queue_length, logical_clock_time):
+# Message logged for each event type, filled in with the event's arguments
+EVENT_FORMATS = {
+    EVENT_INITIALIZED: "Initialized on {0} with clock rate {1}",
+    EVENT_CONNECTED: "Connected to machine {0} on port {1}",
+    EVENT_SENT: "Sent message to machine {0}",
+    EVENT_PROCESSED: "Processed message",
+    EVENT_INTERNAL: "Internal event",
+    EVENT_STOPPED: "Stopped",
+    EVENT_DROPPED: "Dropped {0} messages",
+    EVENT_MERGED: "Merged {0} messages",
+    EVENT_CLOCK_TYPE: "Clock type {0}"  # code of a logical clock type other than Lamport (see logical_clocks.CLOCK_CODES)
+}
+
+# Binary log files start with a header: magic bytes, format version and record size
+BINARY_MAGIC = b"LCLOGBIN"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<8sHH4x")
+# Fixed-width binary record: wall clock ns, monotonic ns, logical clock, queue length,
+# two event arguments, process ID and event type (40 bytes, little-endian)
+BINARY_RECORD = struct.Struct("<qqqIiiHBx")
+
+# File extension for each log format
+LOG_EXTENSIONS = {"text": "log", "binary": "bin"}
+
+# Events logged on clock cycles, which the analysis diffs clocks and queue lengths across
+CYCLE_EVENTS = (EVENT_SENT, EVENT_PROCESSED, EVENT_INTERNAL)
+
+# Suffix of the index listing each process's closed log segments, one JSON line per segment
+INDEX_SUFFIX = "index.jsonl"
+# Suffix of compressed log segments
+COMPRESSED_SUFFIX = ".gz"
+
+# Default number of records written to disk in one batch
+DEFAULT_BATCH_SIZE = 256
+# Default number of seconds to wait before flushing a partial batch
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+# Sentinel pushed onto the record queue to stop the writer thread
+_CLOSE = object()
+
+
+def format_line(process_id, time_ns, monotonic_ns, event, msg_queue_length, logical_clock_time):
     """
-    Logs event to file for a specific process.
+    Formats an event as a text log line.
 
-    :param log_file_path: Path to the log file
     :param process_id: ID of the process
-    :param event: Event to log
+    :param time_ns: Wall clock time in nanoseconds
+    :param monotonic_ns: Monotonic clock time in nanoseconds
+    :param event: Event message (see EVENT_FORMATS)
     :param msg_queue_length: Length of the message queue
     :param logical_clock_time: Logical clock time
+    :return: Log line
     """
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    with open(f"logs/{log_file_path}/process_{process_id}.log", "a") as f:
-        f.write(
-            f"{process_id}> Event: {event} | System Time: {timestamp} | Logical Clock: {logical_clock_time} | Queue Length: {msg_queue_length}\n")
+    seconds, nanoseconds = divmod(time_ns, 1_000_000_000)
+    system_time = time.strftime(
+        "%Y-%m-%d %H:%M:%S", time.localtime(seconds)) + f".{nanoseconds // 1000:06d}"
+    return f"{process_id}> Event: {event} | System Time: {system_time} | Logical Clock: {logical_clock_time} | Queue Length: {msg_queue_length} | Time NS: {time_ns} | Monotonic NS: {monotonic_ns}\n"
+
+
+def pack_record(process_id, time_ns, monotonic_ns, event_type, args, msg_queue_length, logical_clock_time):
+    """
+    Packs an event as a fixed-width binary log record.
+
+    :param process_id: ID of the process
+    :param time_ns: Wall clock time in nanoseconds
+    :param monotonic_ns: Monotonic clock time in nanoseconds
+    :param event_type: Type of event (one of the EVENT_* constants)
+    :param args: Integer arguments of the event (at most two)
+    :param msg_queue_length: Length of the message queue
+    :param logical_clock_time: Logical clock time
+    :return: Packed record bytes
+    """
+    arg1, arg2 = (tuple(args) + (0, 0))[:2]
+    return BINARY_RECORD.pack(time_ns, monotonic_ns, logical_clock_time, msg_queue_length,
+                              arg1, arg2, process_id, event_type)
+
+
+def segment_name(process_id, log_format, number):
+    """
+    Returns the file name of a log segment, e.g. process_1.log.00002 (before compression).
+
+    :param process_id: ID of the process
+    :param log_format: Format of the log, "text" or "binary"
+    :param number: Number of the segment, counting from 1
+    :return: File name of the segment
+    """
+    return f"process_{process_id}.{LOG_EXTENSIONS[log_format]}.{number:05d}"
+
+
+def build_log_options(config):
+    """
+    Returns the EventLogger keyword arguments set in a config.
+
+    :param config: Configuration dictionary
+    :return: Dictionary of EventLogger keyword arguments
+    """
+    return {
+        "segment_bytes": config.get("LOG_SEGMENT_BYTES", 0),
+        "segment_seconds": config.get("LOG_SEGMENT_SECONDS", 0),
+        "compress": config.get("LOG_COMPRESS", False),
+    }
+
+
+def write_binary_header(file):
+    """
+    Writes the header of a binary log file.
+
+    :param file: Binary file object, positioned at the start of the file
+    """
+    file.write(BINARY_HEADER.pack(
+        BINARY_MAGIC, BINARY_VERSION, BINARY_RECORD.size))
+
+
+class LogWriter:
+    def __init__(self):
+        """
+        Initializes a background thread that writes the records of one or more event loggers, so
+        machines sharing a process (e.g. asyncio machines) share one writer thread.
+        """
+        # records waiting to be written, each starting with its logger's key; records refer to their logger by key,
+        # since queued tuples holding only numbers are untracked by the garbage collector, which would otherwise
+        # traverse the whole queue on every collection
+        self.records = queue.SimpleQueue()
+        self.loggers = {}  # loggers writing through this writer, by key
+        self.keys = itertools.count(1)
+        self.thread = threading.Thread(target=self.write_records, daemon=True)
+        self.thread.start()
+
+    def register(self, logger):
+        """
+        Adds a logger to the writer.
+
+        :param logger: EventLogger
+        :return: Key of the logger, which its records are queued with
+        """
+        key = next(self.keys)
+        self.loggers[key] = logger
+        return key
+
+    def write_records(self):
+        """
+        Drains the record queue and writes each logger's records to its log file in batches.
+
+        A logger's batch is flushed once it holds the logger's batch_size records or its
+        flush_interval seconds have passed since the batch's first record was queued, whichever
+        comes first.
+
+        Records queued by a logger after it was closed (e.g. by a clock loop still finishing its
+        last cycle when the machine is stopped) are dropped.
+        """
+        batches = {}  # formatted records waiting to be written, by logger key
+        deadlines = []  # heap of (flush deadline, logger key) of the loggers with a batch
+        while True:
+            timeout = None if not deadlines else max(deadlines[0][0] - time.monotonic(), 0)
+            try:
+                record = self.records.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            if record is None:
+                pass  # a batch's deadline has passed
+            elif record[1] is _CLOSE:
+                key = record[0]
+                if key is None:
+                    return
+                logger = self.loggers.pop(key)
+                logger.flush(batches.pop(key, []))
+                logger.written.set()
+            elif record[0] in self.loggers:
+                key = record[0]
+                logger = self.loggers[key]
+                batch = batches.get(key)
+                if batch is None:
+                    batch = batches[key] = []
+                    heapq.heappush(deadlines, (time.monotonic() + logger.flush_interval, key))
+                logger.append(batch, record)
+                if len(batch) >= logger.batch_size:
+                    logger.flush(batch)
+                    batch.clear()
+
+            # flush the batches whose deadline has passed; deadlines of batches that were already
+            # flushed are skipped
+            while deadlines and deadlines[0][0] <= time.monotonic():
+                _, key = heapq.heappop(deadlines)
+                batch = batches.pop(key, None)
+                if batch:
+                    self.loggers[key].flush(batch)
+
+    def close(self):
+        """
+        Stops the writer thread, once the records queued before it are written.
+        """
+        self.records.put((None, _CLOSE))
+        self.thread.join()
+
+
+class EventLogger:
+    def __init__(self, log_file_path, process_id, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, log_format="text", clock=time, segment_bytes=0,
+                 segment_seconds=0, compress=False, writer=None):
+        """
+        Initializes a buffered event logger for a specific process.
+
+        The log file is held open for the lifetime of the logger. Records are pushed onto an
+        in-memory queue and written by a background thread, so the machine's clock loop never
+        blocks on file I/O.
+
+        With a segment size or length, the log is split into numbered segment files instead. When
+        a segment is closed it is optionally compressed, and a line describing it is appended to
+        the process's index: its time, monotonic time and logical clock ranges, and the clock
+        rate, start time, clock and queue length it ended with, so a segment can be analyzed
+        without reading the segments before it.
+
+        :param log_file_path: Path to the log folder for this experiment run
+        :param process_id: ID of the process
+        :param batch_size: Number of records to write at once (default: 256)
+        :param flush_interval: Maximum seconds a record waits before being flushed (default: 0.5)
+        :param log_format: "text" for human-readable lines or "binary" for fixed-width records (default: "text")
+        :param clock: Source of time_ns() and monotonic_ns() timestamps (default: the time module)
+        :param segment_bytes: Size in bytes after which a new segment is started (default: 0, no limit)
+        :param segment_seconds: Seconds of events after which a new segment is started (default: 0, no limit)
+        :param compress: Whether to gzip closed segments (default: False)
+        :param writer: LogWriter shared with other loggers (default: a writer thread of this logger's own)
+        """
+        if log_format not in LOG_EXTENSIONS:
+            raise ValueError(f"Unknown log format: {log_format}")
+        self.process_id = process_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.log_format = log_format
+        self.clock = clock
+        self.binary = log_format == "binary"
+        self.log_dir = f"logs/{log_file_path}"
+        self.segment_bytes = segment_bytes
+        self.segment_ns = int(segment_seconds * 1_000_000_000)
+        self.compress = compress
+        self.segmented = bool(segment_bytes or segment_seconds)
+        if self.segmented:
+            self.index_path = os.path.join(self.log_dir, f"process_{process_id}.{INDEX_SUFFIX}")
+            # continue after the segments of an earlier logger, as the unsegmented log is appended to
+            self.segment_number = 0
+            if os.path.exists(self.index_path):
+                with open(self.index_path) as f:
+                    self.segment_number = sum(1 for _ in f)
+            self.segment = None  # ranges of the open segment, opened at its first record
+            # state at the end of the records written so far
+            self.state = {"clock_rate": None, "start_monotonic_ns": None, "clock_type": None, "last_clock": None,
+                          "last_queue_length": None}
+            self.file = None
+        else:
+            self.file = open(os.path.join(
+                self.log_dir, f"process_{process_id}.{LOG_EXTENSIONS[log_format]}"), "ab" if self.binary else "a")
+            if self.binary and self.file.tell() == 0:
+                write_binary_header(self.file)
+        self.own_writer = writer is None  # whether the writer is closed with this logger
+        self.writer = LogWriter() if writer is None else writer
+        self.key = self.writer.register(self)  # key of this logger's records in the writer's queue
+        self.records = self.writer.records  # records waiting to be written
+        self.written = threading.Event()  # set once the writer has written this logger's last record
+        self.closed = False
+
+        # Time spent inside log_event (i.e. in the caller's hot loop), in nanoseconds
+        self.log_calls = 0
+        self.log_time_ns = 0
+        self.max_log_time_ns = 0
+
+    def log_event(self, event_type, msg_queue_length, logical_clock_time, *args):
+        """
+        Queues an event to be written to the log file.
+
+        :param event_type: Type of event to log (one of the EVENT_* constants)
+        :param msg_queue_length: Length of the message queue
+        :param logical_clock_time: Logical clock time
+        :param args: Integer arguments of the event (e.g. recipient ID), as used in EVENT_FORMATS
+        """
+        start = time.perf_counter_ns()
+        self.records.put((self.key, self.clock.time_ns(), self.clock.monotonic_ns(),
+                          event_type, args, msg_queue_length, logical_clock_time))
+        elapsed = time.perf_counter_ns() - start
+
+        # track how long the caller spent logging
+        self.log_calls += 1
+        self.log_time_ns += elapsed
+        if elapsed > self.max_log_time_ns:
+            self.max_log_time_ns = elapsed
+
+    def format_record(self, record):
+        """
+        Formats a queued record in the logger's log format.
+
+        :param record: Tuple of (logger key, wall clock ns, monotonic ns, event type, event arguments, queue length,
+            logical clock)
+        :return: Log line, or packed record bytes for the binary format
+        """
+        _, time_ns, monotonic_ns, event_type, args, msg_queue_length, logical_clock_time = record
+        if self.binary:
+            return pack_record(self.process_id, time_ns, monotonic_ns, event_type, args,
+                               msg_queue_length, logical_clock_time)
+        return format_line(self.process_id, time_ns, monotonic_ns, EVENT_FORMATS[event_type].format(*args),
+                           msg_queue_length, logical_clock_time)
+
+    def append(self, batch, record):
+        """
+        Formats a queued record and adds it to a batch, first closing the open segment if the
+        record doesn't fit in it.
+
+        :param batch: List of formatted records not yet written, which is written and emptied if the segment is closed
+        :param record: Tuple of (logger key, wall clock ns, monotonic ns, event type, event arguments, queue length,
+            logical clock)
+        """
+        line = self.format_record(record)
+        if self.segmented:
+            if self.segment is not None and self.segment_full(record, len(line)):
+                self.flush(batch)
+                batch.clear()
+                self.close_segment()
+            self.track_record(record, len(line))
+        batch.append(line)
+
+    def segment_full(self, record, size):
+        """
+        Checks whether a record should start a new segment.
+
+        :param record: Queued record about to be written
+        :param size: Size of the formatted record in bytes
+        :return: Whether the open segment has reached its size or length
+        """
+        return (self.segment_bytes and self.segment["bytes"] + size > self.segment_bytes) or (
+            self.segment_ns and record[2] - self.segment["first_monotonic_ns"] >= self.segment_ns)
+
+    def track_record(self, record, size):
+        """
+        Adds a record to the ranges of the open segment, opening a new segment if there is none.
+
+        :param record: Queued record about to be written
+        :param size: Size of the formatted record in bytes
+        """
+        _, time_ns, monotonic_ns, event_type, args, msg_queue_length, logical_clock_time = record
+        if self.segment is None:
+            self.segment_number += 1
+            name = segment_name(self.process_id, self.log_format, self.segment_number)
+            self.file = open(os.path.join(self.log_dir, name), "wb" if self.binary else "w")
+            if self.binary:
+                write_binary_header(self.file)
+            self.segment = {"segment": name, "records": 0, "bytes": self.file.tell(),
+                            "first_time_ns": time_ns, "first_monotonic_ns": monotonic_ns,
+                            "min_clock": logical_clock_time, "max_clock": logical_clock_time}
+        segment = self.segment
+        segment["records"] += 1
+        segment["bytes"] += size
+        segment["last_time_ns"] = time_ns
+        segment["last_monotonic_ns"] = monotonic_ns
+        segment["min_clock"] = min(segment["min_clock"], logical_clock_time)
+        segment["max_clock"] = max(segment["max_clock"], logical_clock_time)
+        if event_type == EVENT_INITIALIZED:
+            self.state["clock_rate"] = args[1]
+            self.state["start_monotonic_ns"] = monotonic_ns
+        elif event_type == EVENT_CLOCK_TYPE:
+            self.state["clock_type"] = args[0]
+        elif event_type in CYCLE_EVENTS:
+            self.state["last_clock"] = logical_clock_time
+            self.state["last_queue_length"] = msg_queue_length
+
+    def close_segment(self):
+        """
+        Closes the open segment, compresses it if configured, and appends it to the index.
+        """
+        self.file.close()
+        self.file = None
+        segment = dict(self.segment, state=dict(self.state))
+        self.segment = None
+        if self.compress:
+            path = os.path.join(self.log_dir, segment["segment"])
+            with open(path, "rb") as source, gzip.open(path + COMPRESSED_SUFFIX, "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+            segment["segment"] += COMPRESSED_SUFFIX
+        # the index only lists complete segments, so it never points at a file still being written
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(segment) + "\n")
+
+    def flush(self, batch):
+        """
+        Writes a batch of log lines to the log file.
+
+        :param batch: List of formatted log lines (or packed records)
+        """
+        if batch:
+            self.file.write((b"" if self.binary else "").join(batch))
+            self.file.flush()
+
+    def stats(self):
+        """
+        Returns how much time the caller has spent inside log_event.
+
+        :return: Dictionary with the number of calls and the mean/max/total time in nanoseconds
+        """
+        return {
+            "calls": self.log_calls,
+            "total_ns": self.log_time_ns,
+            "mean_ns": self.log_time_ns / self.log_calls if self.log_calls else 0,
+            "max_ns": self.max_log_time_ns
+        }
+
+    def close(self):
+        """
+        Flushes all queued records and closes the log file.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.records.put((self.key, _CLOSE))
+        self.written.wait()
+        if self.own_writer:
+            self.writer.close()
+        if self.segmented:
+            if self.segment is not None:
+                self.close_segment()
+        else:
+            self.file.close()
@@ -0,0 +1,274 @@
+import struct
+import time
+
+# Logical clock types, selectable with CLOCK_TYPE in config.json
+CLOCK_LAMPORT = "lamport"  # one 64-bit counter
+CLOCK_VECTOR = "vector"  # one counter per machine
+CLOCK_HYBRID = "hybrid"  # hybrid logical clock: physical milliseconds and a counter, in 64 bits
+CLOCK_TYPES = [CLOCK_LAMPORT, CLOCK_VECTOR, CLOCK_HYBRID]
+# Code of each clock type, in datagrams and in logs
+CLOCK_CODES = {CLOCK_LAMPORT: 0, CLOCK_VECTOR: 1, CLOCK_HYBRID: 2}
+
+# A hybrid timestamp is the physical time in milliseconds, shifted left by the counter's bits
+HYBRID_COUNTER_BITS = 16
+HYBRID_COUNTER_MASK = (1 << HYBRID_COUNTER_BITS) - 1
+
+
+def encode_varint(value, out):
+    """
+    Appends a non-negative integer to a buffer as a LEB128 varint (7 bits per byte).
+
+    :param value: Integer to encode
+    :param out: bytearray to append to
+    """
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, offset):
+    """
+    Reads a LEB128 varint.
+
+    :param data: Bytes to read from
+    :param offset: Position of the varint's first byte
+    :return: Tuple of (integer, position after the varint)
+    """
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class LamportClock:
+    type = CLOCK_LAMPORT
+
+    def __init__(self, machine_id, machine_ids, clock=time):
+        """
+        Initializes a Lamport clock, a single 64-bit counter.
+
+        :param machine_id: ID of the machine the clock belongs to
+        :param machine_ids: IDs of every machine of the run
+        :param clock: Source of physical time (unused)
+        """
+        self.time = 0
+
+    @property
+    def value(self):
+        """
+        Scalar logged as the machine's logical clock, which never decreases.
+        """
+        return self.time
+
+    def tick(self):
+        """
+        Advances the clock for a local event or a send.
+        """
+        self.time += 1
+
+    def timestamp(self):
+        """
+        Returns the timestamp sent with a message.
+        """
+        return self.time
+
+    def receive(self, timestamp):
+        """
+        Advances the clock past a received timestamp.
+
+        :param timestamp: Timestamp of the received message
+        """
+        self.time = max(self.time, timestamp) + 1
+
+    @staticmethod
+    def merge(timestamps):
+        """
+        Returns a single timestamp that advances a clock as far as all of the given ones.
+
+        :param timestamps: Timestamps of pending messages
+        :return: Merged timestamp
+        """
+        return max(timestamps)
+
+    def encode(self, timestamps):
+        """
+        Encodes the timestamps of the messages of one datagram.
+
+        :param timestamps: List of timestamps
+        :return: Bytes
+        """
+        return struct.pack(f"<{len(timestamps)}q", *timestamps)
+
+    def decode(self, data, offset, count):
+        """
+        Decodes the timestamps of the messages of one datagram.
+
+        :param data: Datagram bytes
+        :param offset: Position of the first timestamp
+        :param count: Number of timestamps
+        :return: List of timestamps
+        """
+        if len(data) != offset + count * 8:
+            raise ValueError(f"Datagram has {len(data)} bytes, expected {count} clocks")
+        return list(struct.unpack_from(f"<{count}q", data, offset))
+
+
+class VectorClock(LamportClock):
+    type = CLOCK_VECTOR
+
+    def __init__(self, machine_id, machine_ids, clock=time):
+        """
+        Initializes a vector clock, with one counter per machine of the run.
+
+        Timestamps are tuples ordered like the sorted machine IDs. The logged value is the sum of
+        the counters: the number of events in the clock's causal past.
+
+        :param machine_id: ID of the machine the clock belongs to
+        :param machine_ids: IDs of every machine of the run
+        :param clock: Source of physical time (unused)
+        """
+        self.index = sorted(int(other_id) for other_id in machine_ids).index(int(machine_id))
+        self.vector = [0] * len(machine_ids)
+        self.total = 0
+
+    @property
+    def value(self):
+        return self.total
+
+    def tick(self):
+        self.vector[self.index] += 1
+        self.total += 1
+
+    def timestamp(self):
+        return tuple(self.vector)
+
+    def receive(self, timestamp):
+        if len(timestamp) != len(self.vector):
+            raise ValueError(f"Vector timestamp has {len(timestamp)} entries, expected {len(self.vector)}")
+        self.vector = list(map(max, self.vector, timestamp))
+        self.vector[self.index] += 1
+        self.total = sum(self.vector)
+
+    @staticmethod
+    def merge(timestamps):
+        return tuple(map(max, *timestamps))
+
+    def encode(self, timestamps):
+        """
+        Encodes vector timestamps compactly: each timestamp is the number of entries that differ
+        from the previous timestamp (the zero vector, for the first), followed by the gap since
+        the last changed entry's index and the new value of each of them, all as varints.
+
+        Zero counters cost nothing, and repeated timestamps (several messages to the same machine)
+        cost one byte each. Deltas are only taken within a datagram, since datagrams may be lost.
+        """
+        out = bytearray()
+        previous = [0] * len(self.vector)
+        for timestamp in timestamps:
+            changed = [(i, value) for i, (value, last) in enumerate(zip(timestamp, previous)) if value != last]
+            encode_varint(len(changed), out)
+            last_index = -1
+            for i, value in changed:
+                encode_varint(i - last_index - 1, out)
+                encode_varint(value, out)
+                last_index = i
+            previous = timestamp
+        return bytes(out)
+
+    def decode(self, data, offset, count):
+        timestamps = []
+        vector = [0] * len(self.vector)
+        for _ in range(count):
+            changed, offset = decode_varint(data, offset)
+            index = -1
+            for _ in range(changed):
+                gap, offset = decode_varint(data, offset)
+                index += gap + 1
+                if index >= len(vector):
+                    raise ValueError(f"Vector entry {index} out of range")
+                vector[index], offset = decode_varint(data, offset)
+            timestamps.append(tuple(vector))
+        if offset != len(data):
+            raise ValueError(f"Datagram has {len(data) - offset} bytes after its clocks")
+        return timestamps
+
+
+class HybridClock(LamportClock):
+    type = CLOCK_HYBRID
+
+    def __init__(self, machine_id, machine_ids, clock=time):
+        """
+        Initializes a hybrid logical clock: the highest physical time seen, in milliseconds, and a
+        counter ordering events within the same millisecond.
+
+        Timestamps (and the logged value) pack both into one 64-bit integer, with the counter in
+        the low HYBRID_COUNTER_BITS bits, so they compare, merge and travel like Lamport clocks.
+
+        :param machine_id: ID of the machine the clock belongs to
+        :param machine_ids: IDs of every machine of the run
+        :param clock: Source of physical time, with time_ns() (default: the time module)
+        """
+        self.clock = clock
+        # start at the current physical time, so the first event doesn't jump from 0
+        self.physical_ms = clock.time_ns() // 1_000_000
+        self.counter = 0
+
+    @property
+    def value(self):
+        return self.physical_ms << HYBRID_COUNTER_BITS | self.counter
+
+    def advance(self, physical_ms, counter):
+        # a counter that outgrows its bits borrows the next millisecond
+        if counter > HYBRID_COUNTER_MASK:
+            physical_ms, counter = physical_ms + 1, 0
+        self.physical_ms, self.counter = physical_ms, counter
+
+    def tick(self):
+        now_ms = self.clock.time_ns() // 1_000_000
+        if now_ms > self.physical_ms:
+            self.advance(now_ms, 0)
+        else:
+            self.advance(self.physical_ms, self.counter + 1)
+
+    def timestamp(self):
+        return self.value
+
+    def receive(self, timestamp):
+        now_ms = self.clock.time_ns() // 1_000_000
+        received_ms, received_counter = timestamp >> HYBRID_COUNTER_BITS, timestamp & HYBRID_COUNTER_MASK
+        physical_ms = max(self.physical_ms, received_ms, now_ms)
+        if physical_ms == self.physical_ms == received_ms:
+            counter = max(self.counter, received_counter) + 1
+        elif physical_ms == self.physical_ms:
+            counter = self.counter + 1
+        elif physical_ms == received_ms:
+            counter = received_counter + 1
+        else:
+            counter = 0
+        self.advance(physical_ms, counter)
+
+
+# Clock class of each clock type
+CLOCK_CLASSES = {CLOCK_LAMPORT: LamportClock, CLOCK_VECTOR: VectorClock, CLOCK_HYBRID: HybridClock}
+
+
+def build_logical_clock(clock_type, machine_id, machine_ids, clock=time):
+    """
+    Creates a machine's logical clock.
+
+    :param clock_type: Type of clock, one of CLOCK_TYPES
+    :param machine_id: ID of the machine
+    :param machine_ids: IDs of every machine of the run
+    :param clock: Source of physical time, for hybrid clocks (default: the time module)
+    :return: Logical clock
+    """
+    if clock_type not in CLOCK_CLASSES:
+        raise ValueError(f"Unknown clock type: {clock_type} (expected one of {', '.join(CLOCK_TYPES)})")
+    return CLOCK_CLASSES[clock_type](machine_id, machine_ids, clock)
@@ -2,18 +2,45 @@
 
 import time
 import random
-import socket
 import threading
-import struct
-import queue
 import sys
 import json
+import os
+from collections import Counter
 
-from logger import log_event
+from logger import EventLogger, build_log_options, EVENT_INITIALIZED, EVENT_CONNECTED, EVENT_SENT, EVENT_PROCESSED, EVENT_INTERNAL, EVENT_STOPPED, \
+    EVENT_DROPPED, EVENT_MERGED, EVENT_CLOCK_TYPE
+from logical_clocks import CLOCK_CODES, CLOCK_LAMPORT, build_logical_clock
+from topology import RingTopology, build_host_map, build_port_map, build_topology
+from scheduler import TickScheduler, OVERRUN_CATCH_UP
+from message_queue import MessageQueue, build_queue_options
+from wire import decode_message, encode_message, is_probe
+from transport import TRANSPORT_UDP, build_transport, check_transport
+from barrier import StartSignal
+from metrics import MachineMetrics, MetricsServer, build_metrics_address
+from profiler import PROFILE_NONE, Profiler
+from event_trace import TRACE_EXTENSION, TraceRecorder
+from clock_probe import ClockProber
+
+
+def machine_seed(seed, machine_id):
+    """
+    Returns the seed of one machine of a run, derived from the run's seed.
+
+    :param seed: Seed of the run, or None for an unseeded run
+    :param machine_id: ID of the machine
+    :return: Seed of the machine's random number generator, or None if the run is unseeded
+    """
+    if seed is None:
+        return None
+    return random.Random(f"{seed}/{machine_id}").getrandbits(32)
 
 
 class Machine:
-    def __init__(self, id, log_file_path, host, port_map, max_clock_rate, max_event_num, timeout):
+    def __init__(self, id, log_file_path, host, port_map, max_clock_rate, max_event_num, timeout, log_format="text",
+                 clock=time, topology=None, overrun_policy=OVERRUN_CATCH_UP, queue_options=None, transport=TRANSPORT_UDP,
+                 start_signal=None, metrics_address=None, profile=PROFILE_NONE, seed=None, trace=False, clock_rate=None,
+                 log_options=None, clock_type=CLOCK_LAMPORT, host_map=None, probe_interval=0):
         """
         Initializes a virtual machine.
 
@@ -24,80 +51,274 @@ class Machine:
         :param max_clock_rate: Maximum clock rate in operations/second (default: 6)
         :param max_event_num: Maximum number for determining what event to perform on each clock cycle (default: 10)
         :param timeout: How long to run the machine before exiting, in seconds (default: 60)
+        :param log_format: Format of the log file, "text" or "binary" (default: "text")
+        :param clock: Source of wall clock and monotonic time for log timestamps (default: the time module)
+        :param topology: Topology deciding which machines to send messages to (default: a ring of all machines)
+        :param overrun_policy: What to do with ticks that are due while a tick is still running, "catch-up" or "skip" (default: "catch-up")
+        :param queue_options: MessageQueue keyword arguments, e.g. {"policy": "coalesce"} (default: an unbounded queue)
+        :param transport: Name of the transport carrying messages between machines, e.g. "unix" (default: "udp")
+        :param start_signal: StartSignal to wait on until every machine is ready, before connecting (default: don't wait)
+        :param metrics_address: (host, port) or UNIX socket path to serve live metrics on (default: don't serve them)
+        :param profile: Profiling mode, e.g. "phases" to time each phase of the clock loop (default: "none")
+        :param seed: Seed of the machine's random number generator, which picks its clock rate and events (default:
+            unseeded)
+        :param trace: Whether to record the machine's event draws and message arrivals for replay.py (default: False)
+        :param clock_rate: Clock rate in operations/second (default: random between 1 and max_clock_rate)
+        :param log_options: EventLogger keyword arguments, e.g. {"segment_bytes": 1048576} (default: one log file)
+        :param clock_type: Type of logical clock, one of logical_clocks.CLOCK_TYPES (default: "lamport")
+        :param host_map: Dictionary of hostnames for each machine (default: every machine is on `host`)
+        :param probe_interval: Seconds between probes of the offset of each peer's wall clock, or 0 to not probe
+            (default: 0)
         """
+        self.created_ns = time.monotonic_ns()  # when the machine started up
 
         # SET UP PROPERTIES
-        self.id = id  # process number (1, 2, or 3)
+        self.id = id  # process number (1 to number of machines)
         self.host = host  # hostname of the machine
         self.port_map = port_map  # dictionary of port numbers for each machine
+        self.host_map = host_map or {}  # dictionary of hostnames for each machine (if not all on host)
+        # machines this machine sends messages to
+        self.topology = topology if topology is not None else RingTopology(
+            list(port_map))
         self.port = self.port_map[str(id)]  # port number for the machine
+        self.seed = seed  # seed of the machine's random number generator
+        self.rng = random.Random(seed)  # picks the clock rate, events and random recipients
         # choose a random clock rate between 1 and max_clock_rate
-        self.clock_rate = random.randint(1, max_clock_rate)
-        self.logical_clock = 0  # initialize Lamport clock to 0
+        self.clock_rate = clock_rate if clock_rate is not None else self.rng.randint(1, max_clock_rate)
+        # logical clock, and the scalar value of it that is logged (a Lamport clock starts at 0)
+        check_transport(transport, clock_type)
+        self.logical = build_logical_clock(clock_type, id, list(port_map), clock)
+        self.logical_clock = self.logical.value
         self.max_event_num = max_event_num  # maximum number for determining events
         self.timeout = timeout  # number of seconds to run for
+        self.transport_name = transport  # kind of transport to send messages over
+        self.overrun_policy = overrun_policy  # how the tick scheduler handles overruns
+        self.scheduler = None  # tick scheduler, created when the machine starts
+        self.sequences = {}  # sequence number of the last datagram sent to each machine
+        self.received_sequences = {}  # sequence number of the last datagram received from each machine
+        # counts of received datagrams, messages, receive batches, and gaps/reordering in sequence numbers
+        self.receive_stats = {"datagrams": 0, "messages": 0,
+                              "batches": 0, "lost": 0, "reordered": 0}
+        self.connections = {}  # connection to each peer, opened once every machine is ready
+        self.closed_dropped = {}  # datagrams dropped by each connection, recorded when the connections close
+        # measures the offsets of peers' wall clocks, and answers their probes even if this machine doesn't probe
+        self.probe_interval = probe_interval
+        self.prober = ClockProber(id, clock)
 
-        # Create a socket to send messages
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind((self.host, self.port))
+        # Record event draws and message arrivals, from before anything can be received
+        self.tracer = None
+        if trace:
+            self.tracer = TraceRecorder()
+            self.tracer.instrument(self)
 
-        # Start listening thread
-        # Ensure all other processes have open sockets before trying to connect!
-        time.sleep(1)
+        # Thread-safe queue to hold incoming messages, created before anything can be received
+        self.queue = MessageQueue(**(queue_options or {}), merge=self.logical.merge)
+        # In-memory counters and histograms, served while the machine runs
+        self.metrics = MachineMetrics(self)
+        self.metrics_server = MetricsServer(
+            [self.metrics], metrics_address) if metrics_address is not None else None
+        # Open socket and start listening for messages
         self.running = True  # flag to indicate if the machine is running
-        self.thread = threading.Thread(
-            target=self.listen_for_messages, daemon=True).start()
-        self.queue = queue.Queue()  # Thread-safe queue to hold incoming messages
+        self.open_socket()
 
         # Log initialization
         self.log_file_path = log_file_path
-        log_event(self.log_file_path, self.id,
-                  f"Initialized on {self.port} with clock rate {self.clock_rate}", self.queue.qsize(), self.logical_clock)
+        self.logger = EventLogger(
+            self.log_file_path, self.id, log_format=log_format, clock=clock, **(log_options or {}))
+        self.logger.log_event(EVENT_INITIALIZED, self.queue.qsize(),
+                              self.logical_clock, self.port, self.clock_rate)
+        if clock_type != CLOCK_LAMPORT:
+            self.logger.log_event(EVENT_CLOCK_TYPE, self.queue.qsize(),
+                                  self.logical_clock, CLOCK_CODES[clock_type])
+
+        # Wait until every machine has an open endpoint, so connections and first messages reach them
+        self.ready_ns = time.monotonic_ns()  # when this machine's endpoint was open
+        if start_signal is not None:
+            start_signal.wait(self.id)
+        self.released_ns = time.monotonic_ns()  # when every machine was ready
 
         # Connect to other machines
-        self.connections = {}
         self.connect_to_machines()
 
+        # Time the phases of the clock loop and listening thread, if profiling
+        self.profiler = None
+        if profile != PROFILE_NONE:
+            self.profiler = Profiler(profile)
+            self.profiler.instrument(self)
+
+    def open_socket(self):
+        """
+        Opens this machine's transport endpoint and starts the listening thread.
+        """
+        # Open an endpoint to receive messages from every machine that may send to this one
+        self.transport = build_transport(
+            self.transport_name, self.host, self.port,
+            {self.port_map[machine_id]: host for machine_id, host in self.host_map.items()})
+        self.transport.open([port for machine_id, port in self.port_map.items()
+                             if str(self.id) in self.topology.peers(machine_id)])
+        # socket of socket-based transports (None for other transports)
+        self.socket = getattr(self.transport, "socket", None)
+
+        # Start listening thread
+        self.thread = threading.Thread(
+            target=self.listen_for_messages, daemon=True).start()
+
     def listen_for_messages(self):
         """
-        Listens for incoming messages on the socket.
+        Listens for incoming messages on the transport.
         """
         while self.running:
             try:
-                # listen for 4 byte messages
-                if self.socket.fileno() == -1:
-                    # Check if the socket is still valid
+                # wait for datagrams, and take every datagram that is already waiting
+                datagrams = self.transport.receive()
+                if datagrams is None:
+                    # the transport was closed
                     return
-                data, _ = self.socket.recvfrom(4)
-                message = struct.unpack('i', data)[0]
-                self.queue.put(message)
+                self.receive_batch(datagrams)
             except Exception as e:
                 if not self.running:
                     # if the machine is stopped, exit the loop
                     break
                 print(f"ERROR: Can't receive message: {e}")
 
+    def receive(self, data):
+        """
+        Adds the messages in a received datagram to the message queue.
+
+        :param data: Datagram bytes
+        """
+        self.receive_batch([data])
+
+    def receive_batch(self, datagrams):
+        """
+        Adds the messages in a batch of received datagrams to the message queue at once.
+
+        :param datagrams: List of datagram bytes, in the order they were received
+        """
+        messages = []
+        probes = 0
+        for data in datagrams:
+            if is_probe(data):
+                probes += 1
+                self.receive_probe(data)
+                continue
+            try:
+                sender_id, sequence, clocks = decode_message(data, self.logical)
+            except ValueError as e:
+                print(f"ERROR: Can't decode message: {e}")
+                continue
+            messages.extend(clocks)
+
+            # count datagrams lost or reordered on the way (datagrams in the original format have no sequence numbers)
+            if sender_id is not None:
+                last_sequence = self.received_sequences.get(sender_id)
+                if last_sequence is not None and sequence <= last_sequence:
+                    self.receive_stats["reordered"] += 1
+                    continue
+                if last_sequence is not None:
+                    self.receive_stats["lost"] += sequence - last_sequence - 1
+                self.received_sequences[sender_id] = sequence
+        if probes == len(datagrams):
+            return
+
+        self.queue.put_many(messages)
+        self.metrics.datagrams.inc(len(datagrams) - probes)
+        self.metrics.received.inc(len(messages))
+        self.receive_stats["datagrams"] += len(datagrams) - probes
+        self.receive_stats["messages"] += len(messages)
+        self.receive_stats["batches"] += 1
+
+    def receive_probe(self, data):
+        """
+        Answers a clock probe request from a peer, or records the offset measured by a reply.
+
+        :param data: Datagram bytes
+        """
+        try:
+            reply = self.prober.receive(data)
+        except ValueError as e:
+            print(f"ERROR: Can't decode clock probe: {e}")
+            return
+        if reply is None:
+            return
+        # peers this machine isn't connected to can't be answered
+        machine_id, reply_data = reply
+        connection = self.connections.get(machine_id) if self.running else None
+        if connection is not None:
+            try:
+                connection.sendall(reply_data)
+            except Exception as e:
+                print(f"ERROR: Can't answer clock probe from machine {machine_id}: {e}")
+
+    def send_probes(self):
+        """
+        Sends a clock probe request to every peer.
+        """
+        for machine_id, connection in list(self.connections.items()):
+            try:
+                connection.sendall(self.prober.request(machine_id))
+            except Exception as e:
+                if self.running:
+                    print(f"ERROR: Can't send clock probe to machine {machine_id}: {e}")
+
+    def probe_clocks(self):
+        """
+        Probes the peers' wall clocks every probe_interval seconds while the machine runs.
+        """
+        while self.running:
+            self.send_probes()
+            time.sleep(self.probe_interval)
+
+    def open_connection(self, machine_id, port):
+        """
+        Opens a connection to another machine.
+
+        :param machine_id: ID of the other machine
+        :param port: Port number of the other machine
+        :return: Connection with sendall(data) and close() methods
+        """
+        return self.transport.connect(port)
+
     def connect_to_machines(self):
         """
-        Connects to other machines at startup.
+        Connects to this machine's peers in the topology at startup.
         """
-        for machine_id, port in self.port_map.items():
-            if machine_id != str(self.id):
-                try:
-                    s = socket.socket(
-                        socket.AF_INET, socket.SOCK_DGRAM)
-                    s.connect((self.host, port))
-                    self.connections[machine_id] = s
-                    log_event(self.log_file_path, self.id, f"Connected to machine {machine_id} on port {port}", self.queue.qsize(
-                    ), self.logical_clock)
-                except Exception as e:
-                    print(f"ERROR: Can't connect to machine {machine_id}: {e}")
+        for machine_id in self.topology.peers(str(self.id)):
+            port = self.port_map[machine_id]
+            try:
+                self.connections[machine_id] = self.open_connection(
+                    machine_id, port)
+                self.logger.log_event(EVENT_CONNECTED, self.queue.qsize(),
+                                      self.logical_clock, int(machine_id), port)
+            except Exception as e:
+                print(f"ERROR: Can't connect to machine {machine_id}: {e}")
 
-    def send_message(self, recipient_id):
+    def dropped_datagrams(self):
         """
-        Sends a message to another machine.
+        Returns how many datagrams each connection dropped while sending. Only connections of
+        transports that drop datagrams when sending (shared-memory rings that are full) count
+        them; other transports lose datagrams on the way, which the receiver sees as gaps in
+        the sequence numbers.
+
+        :return: Dictionary of the number of dropped datagrams, by recipient ID
+        """
+        dropped = dict(self.closed_dropped)
+        for machine_id, connection in list(self.connections.items()):
+            if hasattr(connection, "dropped"):
+                dropped[machine_id] = connection.dropped
+        return dropped
+
+    def send_message(self, recipient_id, timestamps=None):
+        """
+        Sends messages to another machine, in one datagram.
+
+        Each message carries its own logical timestamp, which the recipient processes separately.
+        A machine only sends messages when an event happens, and all the messages of one event
+        (e.g. event 3 in a two-machine ring, which sends two messages to the other machine) carry
+        the event's timestamp.
 
         :param recipient_id: ID of the recipient machine
+        :param timestamps: Logical timestamp of each message (default: one message with the current timestamp)
         """
         # check if still running
         if not self.running:
@@ -108,30 +329,55 @@ class Machine:
             print(f"ERROR: Invalid recipient ID: {recipient_id}")
             return
 
-        message = struct.pack('i', self.logical_clock)
+        if timestamps is None:
+            timestamps = [self.logical.timestamp()]
+        sequence = self.sequences.get(recipient_id, 0) + 1
+        message = encode_message(self.id, sequence, timestamps, self.logical)
 
         # send message to recipient
         try:
             self.connections[recipient_id].sendall(message)
-            log_event(self.log_file_path, self.id, f"Sent message to machine {recipient_id}", self.queue.qsize(
-            ), self.logical_clock)
+            self.sequences[recipient_id] = sequence
+            self.metrics.sent.inc(len(timestamps))
+            for _ in timestamps:
+                self.logger.log_event(EVENT_SENT, self.queue.qsize(),
+                                      self.logical_clock, int(recipient_id))
         except Exception as e:
             print(f"ERROR: Can't send message to machine {recipient_id}: {e}")
 
     def process_message(self):
         """
-        Receives a message from the queue and processes it.
+        Receives messages from the queue and processes them (one per tick, unless the queue
+        policy drains several).
         """
         if self.queue.empty():
             print(f"ERROR: Queue is empty")
             return
 
-        queue_length = self.queue.qsize()  # get queue length before receiving message
-        received_clock = self.queue.get()  # get message from queue
-        # update Lamport clock
-        self.logical_clock = max(self.logical_clock, received_clock) + 1
-        log_event(self.log_file_path, self.id, f"Processed message",
-                  queue_length, self.logical_clock)
+        for _ in range(self.queue.drain_per_tick):
+            if self.queue.empty():
+                break
+            queue_length = self.queue.qsize()  # get queue length before receiving message
+            received_clock = self.queue.get()  # get message from queue
+            # update logical clock
+            previous_clock = self.logical_clock
+            self.logical.receive(received_clock)
+            self.logical_clock = self.logical.value
+            self.metrics.processed.inc()
+            self.metrics.clock_jump.observe(self.logical_clock - previous_clock)
+            self.logger.log_event(EVENT_PROCESSED, queue_length,
+                                  self.logical_clock)
+
+        # Log messages the queue policy dropped or merged since the last processed message
+        dropped, merged = self.queue.take_counts()
+        self.metrics.dropped.inc(dropped)
+        self.metrics.merged.inc(merged)
+        if dropped:
+            self.logger.log_event(EVENT_DROPPED, self.queue.qsize(),
+                                  self.logical_clock, dropped)
+        if merged:
+            self.logger.log_event(EVENT_MERGED, self.queue.qsize(),
+                                  self.logical_clock, merged)
 
     def run(self):
         """
@@ -142,70 +388,176 @@ class Machine:
             self.process_message()
         else:
             # Else, generate a random number between 1 to max_event_num to determine event
-            event = random.randint(1, self.max_event_num)
-            self.logical_clock += 1  # increment Lamport clock
-
-            # Lookup tables for determining next and previous machine
-            next = [None, "2", "3", "1"]
-            prev = [None, "3", "1", "2"]
-
-            if event == 1:
-                # Send a message to the next machine
-                recipient_id = next[int(self.id)]
-                self.send_message(recipient_id)
-            elif event == 2:
-                # Send a message to the other machine
-                recipient_id = prev[int(self.id)]
-                self.send_message(recipient_id)
-            elif event == 3:
-                # Send a message to both other machines
-                recipient_id_1 = next[int(self.id)]
-                recipient_id_2 = prev[int(self.id)]
-                self.send_message(recipient_id_1)
-                self.send_message(recipient_id_2)
+            event = self.rng.randint(1, self.max_event_num)
+            self.logical.tick()  # advance logical clock
+            self.logical_clock = self.logical.value
+
+            # The topology decides who the event sends messages to (e.g. in a ring, event 1
+            # sends to the next machine, event 2 to the previous one and event 3 to both)
+            recipient_ids = self.topology.recipients(str(self.id), event, self.rng)
+
+            if recipient_ids:
+                # messages to the same machine share a datagram, and carry the event's timestamp
+                timestamp = self.logical.timestamp()
+                for recipient_id, num_messages in Counter(recipient_ids).items():
+                    self.send_message(recipient_id, [timestamp] * num_messages)
             else:
                 # Log an internal event
-                log_event(self.log_file_path, self.id, f"Internal event",
-                          self.queue.qsize(), self.logical_clock)
+                self.logger.log_event(EVENT_INTERNAL,
+                                      self.queue.qsize(), self.logical_clock)
 
     def start(self):
         timer = threading.Timer(self.timeout, self.stop)
         timer.start()
 
+        # simulate clock rate, with ticks due at fixed intervals from the start
+        self.scheduler = TickScheduler(self.clock_rate, self.overrun_policy)
+        if self.probe_interval:
+            threading.Thread(target=self.probe_clocks, daemon=True).start()
+        if self.profiler is not None:
+            self.profiler.start()
         while self.running:
-            time.sleep(1 / self.clock_rate)  # simulate clock rate
+            lateness = self.scheduler.wait()
+            if not self.running:
+                break
+            self.metrics.tick(lateness, self.queue.qsize())
             self.run()
+        if self.profiler is not None:
+            self.profiler.finish(os.path.join(
+                "logs", self.log_file_path, f"process_{self.id}"))
 
-    def stop(self):
+    def stats(self):
         """
-        Stops the virtual machine.
+        Returns performance statistics of the machine.
+
+        :return: Dictionary of logger, send, receive, queue and startup statistics, phase timings if profiling, the measured
+            offsets of peers' clocks if probing and, if the machine was started, tick statistics and the lateness of
+            every tick in nanoseconds
+        """
+        stats = {"logger": self.logger.stats(),
+                 "send": {"dropped": self.dropped_datagrams()},
+                 "receive": dict(self.receive_stats),
+                 "queue": self.queue.stats(),
+                 "startup": self.startup_stats()}
+        if self.profiler is not None:
+            stats["profile"] = self.profiler.stats()
+        if self.prober.samples:
+            stats["clock_probes"] = self.prober.stats()
+        if self.scheduler is not None:
+            stats["scheduler"] = self.scheduler.stats()
+            stats["lateness_ns"] = list(self.scheduler.lateness_ns)
+        return stats
+
+    def startup_stats(self):
+        """
+        Returns how long the machine took to start, measured from when it was created.
+
+        :return: Dictionary of the time until its endpoint was open, until every machine was ready, until its clock
+            loop started and until its first tick, in nanoseconds, and the monotonic time of its first tick (the last
+            three are None if the machine wasn't started)
+        """
+        stats = {"ready_ns": self.ready_ns - self.created_ns,
+                 "released_ns": self.released_ns - self.created_ns,
+                 "loop_start_ns": None,
+                 "first_tick_ns": None,
+                 "first_tick_monotonic_ns": None}
+        if self.scheduler is not None:
+            stats["loop_start_ns"] = self.scheduler.start_ns - self.created_ns
+            if self.scheduler.lateness_ns:
+                first_tick = self.scheduler.deadline_ns(1) + self.scheduler.lateness_ns[0]
+                stats["first_tick_ns"] = first_tick - self.created_ns
+                stats["first_tick_monotonic_ns"] = first_tick
+        return stats
+
+    def write_stats(self):
+        """
+        Writes the machine's statistics to process_<id>.stats.json next to its log file.
+        """
+        stats_path = os.path.join(
+            "logs", self.log_file_path, f"process_{self.id}.stats.json")
+        with open(stats_path, "w") as f:
+            json.dump(self.stats(), f)
+
+    def shutdown(self):
+        """
+        Stops the virtual machine, closes its connections and flushes its log.
         """
-        print("Stopping machine...")
         self.running = False
-        self.socket.close()
+        if self.transport is not None:
+            self.transport.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        self.closed_dropped = self.dropped_datagrams()
         for connection in self.connections.values():
             connection.close()
 
         # empty self.connections
         self.connections = {}
 
-        log_event(self.log_file_path, self.id, f"Stopped",
-                  self.queue.qsize(), self.logical_clock)
+        self.logger.log_event(EVENT_STOPPED,
+                              self.queue.qsize(), self.logical_clock)
+
+        # Flush remaining log records
+        self.logger.close()
+        self.write_stats()
+        if self.tracer is not None:
+            self.tracer.write(self, os.path.join(
+                "logs", self.log_file_path, f"process_{self.id}.{TRACE_EXTENSION}"))
+
+    def stop(self):
+        """
+        Stops the virtual machine and exits.
+        """
+        print("Stopping machine...")
+        self.shutdown()
+
+        # Report time spent logging in the clock loop
+        stats = self.logger.stats()
+        print(
+            f"Logged {stats['calls']} events: mean {stats['mean_ns'] / 1000:.1f} us, max {stats['max_ns'] / 1000:.1f} us per call")
+
+        # Report how long the machine took to start
+        stats = self.startup_stats()
+        print(f"Started in {stats['released_ns'] / 1e6:.1f} ms ({(stats['released_ns'] - stats['ready_ns']) / 1e6:.1f} ms waiting for other machines)")
+
+        # Report how closely the clock loop kept its rate
+        if self.scheduler is not None:
+            stats = self.scheduler.stats()
+            print(
+                f"Ran {stats['ticks']} ticks at {stats['actual_rate']:.2f}/s (clock rate {self.clock_rate}): {stats['overruns']} overruns, {stats['skipped_ticks']} skipped, mean lateness {stats['mean_lateness_ns'] / 1000:.1f} us, max {stats['max_lateness_ns'] / 1000:.1f} us")
+
+        # Report where the time in the clock loop went
+        if self.profiler is not None:
+            print(self.profiler.report())
 
         sys.exit(0)
 
 
-# Takes 2 command line arguments:
-# ID (1, 2, or 3)
+# Takes 2 command line arguments, plus an optional third:
+# ID (1 to number of machines)
 # Log file path
+# Config file path (default: ../config.json)
 if __name__ == '__main__':
-    with open("../config.json") as f:
+    config_path = sys.argv[3] if len(sys.argv) > 3 else "../config.json"
+    with open(config_path) as f:
         config = json.load(f)
-    host = config["HOST"]
-    ports = config["PORTS"]
+    ports = build_port_map(config)
+    hosts = build_host_map(config)
+    check_transport(config.get("TRANSPORT", TRANSPORT_UDP), config.get("CLOCK_TYPE", CLOCK_LAMPORT),
+                    separate_processes=True)
     config_max_clock_rate = config["MAX_CLOCK_RATE"]
     config_max_event_num = config["MAX_EVENT_NUM"]
     config_duration = config["EXPERIMENT_DURATION"]
-    machine = Machine(int(sys.argv[1]), sys.argv[2], host, ports,
-                      config_max_clock_rate, config_max_event_num, config_duration)
+    config_log_format = config.get("LOG_FORMAT", "text")
+    config_overrun_policy = config.get("OVERRUN_POLICY", OVERRUN_CATCH_UP)
+    machine = Machine(int(sys.argv[1]), sys.argv[2], hosts[sys.argv[1]], ports,
+                      config_max_clock_rate, config_max_event_num, config_duration, config_log_format,
+                      topology=build_topology(config, list(ports)), overrun_policy=config_overrun_policy,
+                      queue_options=build_queue_options(config), transport=config.get("TRANSPORT", TRANSPORT_UDP),
+                      start_signal=StartSignal.from_environment(),
+                      metrics_address=build_metrics_address(config, ports[sys.argv[1]], hosts[sys.argv[1]]),
+                      profile=config.get("PROFILE", PROFILE_NONE),
+                      seed=machine_seed(config.get("SEED"), sys.argv[1]), trace=config.get("TRACE", False),
+                      log_options=build_log_options(config), clock_type=config.get("CLOCK_TYPE", CLOCK_LAMPORT),
+                      host_map=hosts, probe_interval=config.get("CLOCK_PROBE_INTERVAL", 0))
     machine.start()
@@ -1,25 +1,68 @@
 import os
 import json
+import random
 import textwrap
 import shutil
-import subprocess
+
+from topology import build_host_map, build_port_map
+from barrier import StartBarrier
+from logical_clocks import CLOCK_LAMPORT
+from machine import machine_seed
+from transport import TRANSPORT_UDP, check_transport
 
 NUM_RUNS_PER_EXP = 5  # how many experiments will be run with each configuration
+LOG_DIR = "logs"  # folder containing one sub folder per experiment
+
+
+def next_exp_name():
+    """
+    Returns the name of the first unused experiment folder (exp_1, exp_2, ...).
 
-def set_up_exp_folder(max_clock_rate, max_event_num):
+    :return: Name of the experiment folder
+    """
+    exp_id = 1
+    while os.path.exists(f"{LOG_DIR}/exp_{exp_id}"):
+        exp_id += 1
+    return f"exp_{exp_id}"
+
+
+def random_seed():
+    """
+    Returns a new random seed, for runs that aren't given one, so every run can be reproduced.
+
+    :return: Seed between 0 and 2^32 - 1
+    """
+    return random.SystemRandom().getrandbits(32)
+
+
+def set_up_exp_folder(max_clock_rate, max_event_num, num_runs=NUM_RUNS_PER_EXP, num_machines=3, topology="ring",
+                      duration=60, exp_name=None, seeds=None, hosts=None):
     """
     Sets up a logging folder for an experiment.
 
+    Only the experiment's own folder is replaced, so logs of other experiments are kept.
+
     :param max_clock_rate: Maximum clock rate
     :param max_event_num: Maximum number for determining events
+    :param num_runs: Number of runs in the experiment (default: NUM_RUNS_PER_EXP)
+    :param num_machines: Number of machines in each run (default: 3)
+    :param topology: Name of the communication topology (default: ring)
+    :param duration: Length of each run in seconds (default: 60)
+    :param exp_name: Name of the experiment folder (default: the next unused exp_x folder)
+    :param seeds: Dictionary of the seed of each run, by run ID (default: unseeded runs, not recorded)
+    :param hosts: Dictionary of the hostname of each machine, recorded if the machines have different hosts (default:
+        not recorded)
+    :return: Name of the experiment folder, relative to the logs folder
     """
-    # create log sub directory for the experiment if it doesn't exist
-    exp_folder = f"logs"
+    # create log sub directory for the experiment
+    if exp_name is None:
+        exp_name = next_exp_name()
+    exp_folder = f"{LOG_DIR}/{exp_name}"
     shutil.rmtree(exp_folder, ignore_errors=True)  # Deletes everything inside
     os.makedirs(exp_folder, exist_ok=True)  # Recreate the folder if needed
 
     # create sub directories for each run
-    for i in range(NUM_RUNS_PER_EXP):
+    for i in range(num_runs):
         run_folder = f"{exp_folder}/run_{i + 1}"
         os.makedirs(run_folder, exist_ok=True)
 
@@ -28,7 +71,20 @@ def set_up_exp_folder(max_clock_rate, max_event_num):
         # Experiment Logs
         - **Max Clock Rate:** {max_clock_rate}
         - **Max Event Num:** {max_event_num}
+        - **Machines:** {num_machines}
+        - **Topology:** {topology}
+        - **Duration:** {duration} s
     """)
+    if hosts and len(set(hosts.values())) > 1:
+        readme_content += f"- **Hosts:** {', '.join(f'machine {i}: {host}' for i, host in hosts.items())}\n"
+
+    # Record each run's seed and the seeds its machines derive from it, so runs can be repeated
+    if seeds:
+        readme_content += "\n## Seeds\n"
+        for run_id, seed in sorted(seeds.items()):
+            machine_seeds = ", ".join(f"machine {i}: {machine_seed(seed, str(i))}"
+                                      for i in range(1, num_machines + 1))
+            readme_content += f"- **Run {run_id}:** {seed} ({machine_seeds})\n"
 
     # create a README file for the run
     with open(f"{exp_folder}/README.md", "w") as f:
@@ -36,22 +92,80 @@ def set_up_exp_folder(max_clock_rate, max_event_num):
             readme_content
         )
 
+    return exp_name
+
 
-def perform_experiment_run(run_id):
+def write_run_config(exp_name, run_id, config):
     """
-    Runs an experiment with multiple virtual machines.
+    Writes a run's configuration next to its logs, where its machines (and replay.py) read it.
 
+    :param exp_name: Name of the experiment folder
     :param run_id: ID of the run
+    :param config: Configuration dictionary of the run
+    :return: Path to the configuration file
     """
-    print(f"\tStarting run {run_id}...")
-    log_file_path = f"run_{run_id}"
+    config_path = f"{LOG_DIR}/{exp_name}/run_{run_id}/config.json"
+    with open(config_path, "w") as f:
+        json.dump(config, f, indent=2)
+    return config_path
+
 
-    procs = [ subprocess.Popen(['./machine.py', str(i + 1), log_file_path]) for i in range(3) ]
+def perform_experiment_run(run_id, machine_ids, exp_name, config_path="../config.json", async_machines=False):
+    """
+    Runs an experiment with multiple virtual machines.
+
+    :param run_id: ID of the run
+    :param machine_ids: IDs of the machines to start
+    :param exp_name: Name of the experiment folder
+    :param config_path: Path to the configuration file the machines read (default: ../config.json)
+    :param async_machines: Whether to run all machines in one asyncio process instead of one process each (default: False)
+    """
+    print(f"\tStarting run {run_id} of {exp_name}...")
+    log_file_path = f"{exp_name}/run_{run_id}"
+
+    # machines start ticking together once every machine has an open endpoint
+    barrier = StartBarrier()
+    if async_machines:
+        procs = [ barrier.spawn(['./async_machine.py', log_file_path, config_path]) ]
+    else:
+        procs = [ barrier.spawn(['./machine.py', machine_id, log_file_path, config_path]) for machine_id in machine_ids ]
+    if not barrier.wait(len(procs)):
+        print(f"ERROR: Only {len(barrier.ready_ns)} of {len(procs)} machine processes were ready, starting anyway")
+    barrier.release()
+    print(f"\tAll machines ready {barrier.stats()['release_ns'] / 1e6:.1f} ms after launch.")
     for p in procs:
         p.wait()
 
+    # Record how long the machines took to start, up to their first tick
+    first_ticks_ns = {}
+    for machine_id in machine_ids:
+        stats_path = f"{LOG_DIR}/{log_file_path}/process_{machine_id}.stats.json"
+        if os.path.exists(stats_path):
+            with open(stats_path) as f:
+                first_tick = json.load(f)["startup"]["first_tick_monotonic_ns"]
+            if first_tick is not None:
+                first_ticks_ns[machine_id] = first_tick
+    startup = barrier.stats(first_ticks_ns)
+    with open(f"{LOG_DIR}/{log_file_path}/startup.json", "w") as f:
+        json.dump(startup, f, indent=2)
+    if startup["first_tick_ns"]:
+        print(f"\tLast machine's first tick {max(startup['first_tick_ns'].values()) / 1e6:.1f} ms after launch.")
+
     print(
-        f"\tRun {run_id} complete. Log files are stored in logs/run_{run_id}.")
+        f"\tRun {run_id} complete. Log files are stored in {LOG_DIR}/{log_file_path}.")
+
+
+def check_run_transport(config):
+    """
+    Checks that the machines of a run with the given configuration can exchange messages over
+    the configured transport, before any machine is launched.
+
+    :param config: Dictionary of the run configuration
+    """
+    # asyncio machines always use UDP
+    if not config.get("ASYNC_MACHINES", False):
+        check_transport(config.get("TRANSPORT", TRANSPORT_UDP), config.get("CLOCK_TYPE", CLOCK_LAMPORT),
+                        separate_processes=True)
 
 
 def main():
@@ -67,11 +181,23 @@ def main():
         config = json.load(f)
     max_clock_rate = config["MAX_CLOCK_RATE"]
     max_event_num = config["MAX_EVENT_NUM"]
-    set_up_exp_folder(max_clock_rate, max_event_num)
-
-    for run_id in range(NUM_RUNS_PER_EXP):
-        perform_experiment_run(run_id + 1)
-    print(f"Experiment complete.")
+    machine_ids = list(build_port_map(config))
+    hosts = build_host_map(config)
+    check_run_transport(config)
+    # run i uses SEED + i - 1 (a new random seed if SEED isn't set)
+    seed = config.get("SEED")
+    if seed is None:
+        seed = random_seed()
+    seeds = {run_id: seed + run_id - 1 for run_id in range(1, NUM_RUNS_PER_EXP + 1)}
+    exp_name = set_up_exp_folder(max_clock_rate, max_event_num, num_machines=len(machine_ids),
+                                 topology=config.get("TOPOLOGY", "ring"), duration=config["EXPERIMENT_DURATION"],
+                                 seeds=seeds, hosts=hosts)
+
+    for run_id, run_seed in seeds.items():
+        config_path = write_run_config(exp_name, run_id, dict(config, SEED=run_seed))
+        perform_experiment_run(run_id, machine_ids, exp_name, config_path,
+                               async_machines=config.get("ASYNC_MACHINES", False))
+    print(f"Experiment complete. Log files are stored in {LOG_DIR}/{exp_name}.")
 
 
 if __name__ == '__main__':
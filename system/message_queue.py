@@ -0,0 +1,143 @@
+import collections
+import threading
+
+# Queue policies, selectable with QUEUE_POLICY in config.json
+QUEUE_UNBOUNDED = "unbounded"  # keep every message, process one per tick
+QUEUE_DROP_OLDEST = "drop-oldest"  # keep at most max_length messages, dropping the oldest
+QUEUE_COALESCE = "coalesce"  # keep only the highest (merged) pending clock value
+QUEUE_DRAIN = "drain"  # keep every message, process up to drain_per_tick per tick
+QUEUE_POLICIES = [QUEUE_UNBOUNDED, QUEUE_DROP_OLDEST,
+                  QUEUE_COALESCE, QUEUE_DRAIN]
+
+# Default maximum queue length of the drop-oldest policy
+DEFAULT_MAX_LENGTH = 64
+# Default number of messages processed per tick by the drain policy
+DEFAULT_DRAIN_PER_TICK = 8
+
+
+class MessageQueue:
+    def __init__(self, policy=QUEUE_UNBOUNDED, max_length=DEFAULT_MAX_LENGTH, drain_per_tick=DEFAULT_DRAIN_PER_TICK,
+                 merge=max):
+        """
+        Initializes a thread-safe FIFO queue of received messages.
+
+        Unlike queue.Queue, a whole batch of messages can be added while taking the lock once.
+        The policy decides how much the queue holds: since a Lamport clock update only needs
+        the highest pending clock, the drop-oldest and coalesce policies keep memory bounded
+        in runs where a fast machine floods a slow one.
+
+        :param policy: Queue policy, one of QUEUE_POLICIES (default: QUEUE_UNBOUNDED)
+        :param max_length: Maximum number of messages kept by the drop-oldest policy (default: DEFAULT_MAX_LENGTH)
+        :param drain_per_tick: Number of messages processed per tick by the drain policy (default: DEFAULT_DRAIN_PER_TICK)
+        :param merge: Function merging a list of clock values into one, for the coalesce policy (default: max, for
+            Lamport clocks)
+        """
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(
+                f"Unknown queue policy: {policy} (expected one of {', '.join(QUEUE_POLICIES)})")
+        self.policy = policy
+        self.max_length = max_length if policy == QUEUE_DROP_OLDEST else None
+        # number of messages the machine processes on each tick
+        self.drain_per_tick = drain_per_tick if policy == QUEUE_DRAIN else 1
+        self.merge = merge
+
+        self.messages = collections.deque()
+        self.lock = threading.Lock()
+
+        # counts of messages dropped and merged, in total and since they were last taken
+        self.dropped = 0
+        self.merged = 0
+        self.taken_dropped = 0
+        self.taken_merged = 0
+        self.max_qsize = 0  # longest the queue has been
+
+    def put(self, message):
+        """
+        Adds a message to the queue.
+
+        :param message: Logical clock value of the message
+        """
+        self.put_many([message])
+
+    def put_many(self, messages):
+        """
+        Adds a batch of messages to the queue, in order.
+
+        :param messages: Logical clock values of the messages
+        """
+        if not messages:
+            return
+        with self.lock:
+            if self.policy == QUEUE_COALESCE:
+                # merge the batch into the single pending message
+                highest = self.merge(messages)
+                if self.messages:
+                    self.messages[0] = self.merge([self.messages[0], highest])
+                    self.merged += len(messages)
+                else:
+                    self.messages.append(highest)
+                    self.merged += len(messages) - 1
+            else:
+                self.messages.extend(messages)
+                if self.max_length is not None:
+                    while len(self.messages) > self.max_length:
+                        self.messages.popleft()
+                        self.dropped += 1
+            self.max_qsize = max(self.max_qsize, len(self.messages))
+
+    def get(self):
+        """
+        Removes and returns the oldest message.
+
+        :return: Logical clock value of the message
+        """
+        with self.lock:
+            return self.messages.popleft()
+
+    def qsize(self):
+        return len(self.messages)
+
+    def empty(self):
+        return not self.messages
+
+    def take_counts(self):
+        """
+        Returns how many messages were dropped and merged since the last call.
+
+        :return: Tuple of (dropped messages, merged messages)
+        """
+        with self.lock:
+            dropped = self.dropped - self.taken_dropped
+            merged = self.merged - self.taken_merged
+            self.taken_dropped = self.dropped
+            self.taken_merged = self.merged
+        return dropped, merged
+
+    def stats(self):
+        """
+        Returns statistics about the queue.
+
+        :return: Dictionary of the policy, its settings, and message counts
+        """
+        return {
+            "policy": self.policy,
+            "max_length": self.max_length,
+            "drain_per_tick": self.drain_per_tick,
+            "dropped": self.dropped,
+            "merged": self.merged,
+            "max_qsize": self.max_qsize,
+        }
+
+
+def build_queue_options(config):
+    """
+    Returns the MessageQueue keyword arguments set in a config.
+
+    :param config: Configuration dictionary
+    :return: Dictionary of MessageQueue keyword arguments
+    """
+    return {
+        "policy": config.get("QUEUE_POLICY", QUEUE_UNBOUNDED),
+        "max_length": config.get("QUEUE_MAX_LENGTH", DEFAULT_MAX_LENGTH),
+        "drain_per_tick": config.get("QUEUE_DRAIN_PER_TICK", DEFAULT_DRAIN_PER_TICK),
+    }
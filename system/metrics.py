@@ -0,0 +1,256 @@
+import bisect
+import http.server
+import os
+import socketserver
+import threading
+
+from transport import UNIX_SOCKET_DIR
+
+# Where machines serve their metrics, selectable with METRICS in config.json
+METRICS_NONE = "none"  # don't serve metrics
+METRICS_HTTP = "http"  # serve over HTTP on the machine's port + METRICS_PORT_OFFSET
+METRICS_UNIX = "unix"  # serve over HTTP on a UNIX socket
+METRICS_MODES = [METRICS_NONE, METRICS_HTTP, METRICS_UNIX]
+
+# Default offset between a machine's port and the port of its metrics endpoint
+DEFAULT_METRICS_PORT_OFFSET = 1000
+
+# Histogram bucket upper bounds
+LATENESS_BUCKETS = [0.00001, 0.00005, 0.0001, 0.0005,
+                    0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1]  # seconds
+QUEUE_LENGTH_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+CLOCK_JUMP_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+def format_labels(labels, **extra):
+    """
+    Formats metric labels in the Prometheus text format.
+
+    :param labels: Dictionary of label names and values
+    :param extra: Additional labels
+    :return: Label string, e.g. '{machine="1"}' (empty if there are no labels)
+    """
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+class Counter:
+    def __init__(self, name, help):
+        """
+        Initializes a counter, which only goes up.
+
+        :param name: Metric name
+        :param help: Description of the metric
+        """
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self, labels):
+        return [f"{self.name}{format_labels(labels)} {self.value}"]
+
+
+class Gauge:
+    def __init__(self, name, help, function):
+        """
+        Initializes a gauge, whose value is read when the metrics are rendered.
+
+        :param name: Metric name
+        :param help: Description of the metric
+        :param function: Function returning the current value
+        """
+        self.name = name
+        self.help = help
+        self.function = function
+
+    def render(self, labels):
+        return [f"{self.name}{format_labels(labels)} {self.function()}"]
+
+
+class LabeledCounter:
+    def __init__(self, name, help, label, function):
+        """
+        Initializes a counter with one value per value of a label (e.g. per peer), whose values
+        are read when the metrics are rendered.
+
+        :param name: Metric name
+        :param help: Description of the metric
+        :param label: Name of the label
+        :param function: Function returning a dictionary of the current values, by label value
+        """
+        self.name = name
+        self.help = help
+        self.label = label
+        self.function = function
+
+    def render(self, labels):
+        return [f"{self.name}{format_labels(labels, **{self.label: key})} {value}"
+                for key, value in self.function().items()]
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        """
+        Initializes a histogram, which counts observations in buckets.
+
+        :param name: Metric name
+        :param help: Description of the metric
+        :param buckets: Sorted upper bounds of the buckets (a +Inf bucket is added)
+        """
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # per bucket, not cumulative
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            cumulative += count
+            lines.append(
+                f"{self.name}_bucket{format_labels(labels, le=bound)} {cumulative}")
+        lines.append(f"{self.name}_sum{format_labels(labels)} {self.sum}")
+        lines.append(f"{self.name}_count{format_labels(labels)} {self.count}")
+        return lines
+
+
+class MachineMetrics:
+    def __init__(self, machine):
+        """
+        Initializes the in-memory metrics of a machine, which can be read while it runs.
+
+        Each metric is only updated by one thread (the clock loop, or the listening thread for
+        received messages), so no lock is needed.
+
+        :param machine: Machine the metrics describe
+        """
+        self.labels = {"machine": machine.id}
+        self.ticks = Counter("lclock_ticks_total", "Clock ticks run")
+        self.lateness = Histogram("lclock_tick_lateness_seconds",
+                                  "How long after its deadline each tick started", LATENESS_BUCKETS)
+        self.sent = Counter("lclock_messages_sent_total", "Messages sent")
+        self.received = Counter("lclock_messages_received_total", "Messages received")
+        self.datagrams = Counter("lclock_datagrams_received_total", "Datagrams received")
+        self.processed = Counter("lclock_messages_processed_total", "Messages processed")
+        self.dropped = Counter("lclock_messages_dropped_total", "Messages dropped by the queue policy")
+        self.merged = Counter("lclock_messages_merged_total", "Messages merged by the queue policy")
+        self.queue_length = Histogram("lclock_queue_length",
+                                      "Message queue length at the start of each tick", QUEUE_LENGTH_BUCKETS)
+        self.clock_jump = Histogram("lclock_clock_jump",
+                                    "Logical clock increase of each processed message", CLOCK_JUMP_BUCKETS)
+        self.send_dropped = LabeledCounter("lclock_datagrams_send_dropped_total",
+                                           "Datagrams dropped while sending because the peer's ring buffer was full",
+                                           "peer", machine.dropped_datagrams)
+        self.metrics = [
+            Gauge("lclock_logical_clock", "Current logical clock value", lambda: machine.logical_clock),
+            Gauge("lclock_clock_rate", "Clock rate in ticks/second", lambda: machine.clock_rate),
+            Gauge("lclock_queue_current_length", "Current message queue length", lambda: machine.queue.qsize()),
+            self.ticks, self.lateness, self.sent, self.received, self.datagrams, self.processed,
+            self.dropped, self.merged, self.queue_length, self.clock_jump, self.send_dropped,
+        ]
+
+    def tick(self, lateness_ns, queue_length):
+        """
+        Records a tick that is starting.
+
+        :param lateness_ns: How long after its deadline the tick started, in nanoseconds
+        :param queue_length: Length of the message queue
+        """
+        self.ticks.inc()
+        self.lateness.observe(lateness_ns / 1_000_000_000)
+        self.queue_length.observe(queue_length)
+
+
+def render_metrics(machine_metrics):
+    """
+    Renders the metrics of one or more machines in the Prometheus text format.
+
+    :param machine_metrics: List of MachineMetrics
+    :return: Text of the metrics
+    """
+    lines = []
+    for i, metric in enumerate(machine_metrics[0].metrics if machine_metrics else []):
+        kind = {Counter: "counter", LabeledCounter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+        lines += [f"# HELP {metric.name} {metric.help}",
+                  f"# TYPE {metric.name} {kind}"]
+        for metrics in machine_metrics:
+            lines += metrics.metrics[i].render(metrics.labels)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics(self.server.machine_metrics).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # don't print a line per scrape
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    def __init__(self, machine_metrics, address):
+        """
+        Starts serving the metrics of one or more machines at /metrics, on a background thread.
+
+        :param machine_metrics: List of MachineMetrics to serve
+        :param address: (host, port) to serve over HTTP, or the path of a UNIX socket
+        """
+        self.address = address
+        if isinstance(address, str):
+            os.makedirs(os.path.dirname(address), exist_ok=True)
+            if os.path.exists(address):
+                os.remove(address)
+            self.server = UnixHTTPServer(address, MetricsHandler)
+        else:
+            self.server = http.server.ThreadingHTTPServer(address, MetricsHandler)
+        self.server.machine_metrics = machine_metrics
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+def build_metrics_address(config, port, host=None):
+    """
+    Returns where the machine with the given port serves its metrics, as set in a config.
+
+    :param config: Configuration dictionary
+    :param port: Port number of the machine
+    :param host: Hostname of the machine (default: HOST)
+    :return: (host, port) for HTTP, the path of a UNIX socket, or None if metrics aren't served
+    """
+    mode = config.get("METRICS", METRICS_NONE)
+    if mode not in METRICS_MODES:
+        raise ValueError(
+            f"Unknown metrics mode: {mode} (expected one of {', '.join(METRICS_MODES)})")
+    if mode == METRICS_HTTP:
+        return (host if host is not None else config["HOST"], port + config.get("METRICS_PORT_OFFSET", DEFAULT_METRICS_PORT_OFFSET))
+    if mode == METRICS_UNIX:
+        return os.path.join(UNIX_SOCKET_DIR, f"metrics_{port}.sock")
+    return None
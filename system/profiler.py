@@ -0,0 +1,197 @@
+import cProfile
+import collections
+import os
+import sys
+import threading
+import time
+
+# Profiling modes, selectable with PROFILE in config.json
+PROFILE_NONE = "none"  # no profiling
+PROFILE_PHASES = "phases"  # time each phase of the clock loop and listening thread
+PROFILE_CPROFILE = "cprofile"  # phases, plus cProfile of the clock loop (process_<id>.prof)
+PROFILE_STACKS = "stacks"  # phases, plus sampled stacks of the clock loop (process_<id>.collapsed)
+PROFILE_MODES = [PROFILE_NONE, PROFILE_PHASES,
+                 PROFILE_CPROFILE, PROFILE_STACKS]
+
+# Seconds between stack samples
+DEFAULT_SAMPLE_INTERVAL = 0.001
+
+
+class TimedConnection:
+    def __init__(self, connection, sendall):
+        """
+        Initializes a connection whose sends are timed.
+
+        :param connection: Connection to another machine
+        :param sendall: Timed sendall function of the connection
+        """
+        self.connection = connection
+        self.sendall = sendall
+
+    def close(self):
+        self.connection.close()
+
+
+class StackSampler:
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Initializes a sampler that periodically records the call stack of a thread, for
+        flamegraphs in the collapsed-stack format.
+
+        :param thread_id: ID of the thread to sample
+        :param interval: Seconds between samples (default: DEFAULT_SAMPLE_INTERVAL)
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()  # number of samples of each stack
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def sample(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def write(self, path):
+        """
+        Writes the sampled stacks in the collapsed-stack format ("frame;frame;frame count" per
+        line), as read by flamegraph.pl and speedscope.
+
+        :param path: Path of the output file
+        """
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    def __init__(self, mode=PROFILE_PHASES):
+        """
+        Initializes an opt-in profiler of a machine's hot paths.
+
+        Instead of timing code that always runs, instrument() replaces the methods of one
+        machine with timed wrappers, so machines that aren't profiled pay nothing.
+
+        :param mode: Profiling mode, one of PROFILE_MODES other than PROFILE_NONE (default: PROFILE_PHASES)
+        """
+        if mode not in PROFILE_MODES or mode == PROFILE_NONE:
+            raise ValueError(
+                f"Unknown profiling mode: {mode} (expected one of {', '.join(PROFILE_MODES[1:])})")
+        self.mode = mode
+        self.phases = {}  # [calls, total ns, max ns] of each phase
+        self.profile = None  # cProfile of the clock loop
+        self.sampler = None  # stack sampler of the clock loop
+
+    def timed(self, name, function):
+        """
+        Wraps a function so each call is counted and timed as a phase.
+
+        Each phase is only called from one thread, so its counters need no lock.
+
+        :param name: Name of the phase
+        :param function: Function to time
+        :return: Timed function
+        """
+        phase = self.phases[name] = [0, 0, 0]
+        clock = time.perf_counter_ns
+
+        def timed_function(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                phase[0] += 1
+                phase[1] += elapsed
+                if elapsed > phase[2]:
+                    phase[2] = elapsed
+        return timed_function
+
+    def instrument(self, machine):
+        """
+        Times the phases of a machine: its ticks, sending, processing, logging and queue
+        operations, and in its listening thread, waiting for and receiving datagrams.
+
+        :param machine: Machine to instrument, after it has connected to its peers
+        """
+        machine.run = self.timed("run", machine.run)
+        machine.send_message = self.timed("send_message", machine.send_message)
+        machine.process_message = self.timed(
+            "process_message", machine.process_message)
+        machine.logger.log_event = self.timed(
+            "log_event", machine.logger.log_event)
+        machine.queue.get = self.timed("queue_get", machine.queue.get)
+        machine.queue.put_many = self.timed(
+            "queue_put_many", machine.queue.put_many)
+        sendall = self.timed("sendall", lambda connection, data: connection.sendall(data))
+        machine.connections = {
+            machine_id: TimedConnection(connection, lambda data, connection=connection: sendall(connection, data))
+            for machine_id, connection in machine.connections.items()
+        }
+        machine.receive_batch = self.timed(
+            "receive_batch", machine.receive_batch)
+        if machine.transport is not None:
+            machine.transport.receive = self.timed(
+                "receive_wait", machine.transport.receive)
+
+    def start(self):
+        """
+        Starts cProfile or the stack sampler on the calling thread (the clock loop).
+        """
+        if self.mode == PROFILE_CPROFILE:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        elif self.mode == PROFILE_STACKS:
+            self.sampler = StackSampler(threading.get_ident())
+
+    def finish(self, path_prefix):
+        """
+        Stops cProfile or the stack sampler (on the clock loop's thread) and writes its output.
+
+        :param path_prefix: Path of the output files, without extension
+        """
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(f"{path_prefix}.prof")
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler.write(f"{path_prefix}.collapsed")
+
+    def stats(self):
+        """
+        Returns the aggregates of each phase.
+
+        :return: Dictionary of the number of calls and the total, mean and max time in nanoseconds of each phase
+        """
+        return {name: {"calls": calls, "total_ns": total, "mean_ns": total / calls if calls else 0.0,
+                       "max_ns": longest}
+                for name, (calls, total, longest) in self.phases.items()}
+
+    def report(self):
+        """
+        Formats the phase aggregates as a table, with each phase's share of the time spent in ticks.
+
+        :return: Text of the table
+        """
+        stats = self.stats()
+        tick_time = stats["run"]["total_ns"] if "run" in stats else 0
+        lines = [f"{'Phase':<16} {'calls':>8} {'total ms':>10} {'mean us':>9} {'max us':>9} {'of ticks':>9}"]
+        for name, phase in sorted(stats.items(), key=lambda item: -item[1]["total_ns"]):
+            share = f"{phase['total_ns'] / tick_time:.1%}" if tick_time and name not in (
+                "receive_wait", "receive_batch", "queue_put_many") else "-"
+            lines.append(f"{name:<16} {phase['calls']:>8} {phase['total_ns'] / 1e6:>10.1f} "
+                         f"{phase['mean_ns'] / 1000:>9.1f} {phase['max_ns'] / 1000:>9.1f} {share:>9}")
+        return "\n".join(lines)
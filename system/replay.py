@@ -0,0 +1,142 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import time
+
+from analyze_logs import LOG_DIR, find_run_log_files, parse_log_file
+from event_trace import TRACE_EXTENSION, ReplayedRandom, load_trace
+from logical_clocks import CLOCK_LAMPORT
+from machine import Machine
+from message_queue import build_queue_options
+from topology import build_port_map, build_topology
+
+# Folder in a run folder that replayed logs are written to
+REPLAY_DIR = "replay"
+# Columns of the parsed logs that a replay must reproduce
+REPLAYED_COLUMNS = ["Event", "Logical Clock", "Logical Clock Jump", "Queue Length", "Queue Length Change"]
+
+
+class ReplayConnection:
+    def sendall(self, data):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayMachine(Machine):
+    def __init__(self, trace, *args, **kwargs):
+        """
+        Initializes a virtual machine that replays a recorded trace instead of drawing events and
+        receiving messages.
+
+        :param trace: Trace of the machine, from event_trace.load_trace
+        :param args: Remaining Machine arguments
+        :param kwargs: Remaining Machine keyword arguments
+        """
+        self.trace = trace
+        super().__init__(trace["machine_id"], *args, clock_rate=trace["clock_rate"], seed=trace["seed"], **kwargs)
+        self.rng = ReplayedRandom(trace["draws"])
+
+    def open_socket(self):
+        self.socket = None
+        self.transport = None
+
+    def open_connection(self, machine_id, port):
+        if machine_id not in self.trace["connected"]:
+            raise ConnectionError("not connected when the trace was recorded")
+        return ReplayConnection()
+
+    def replay(self):
+        """
+        Runs every recorded tick back to back, receiving each recorded batch of datagrams
+        before the tick it arrived before, then stops the machine.
+
+        :return: Seconds the ticks and batches took
+        """
+        arrivals = self.trace["arrivals"]
+        next_arrival = 0
+        start = time.perf_counter()
+        for tick in range(self.trace["ticks"]):
+            while next_arrival < len(arrivals) and arrivals[next_arrival][0] <= tick:
+                self.receive_batch(arrivals[next_arrival][1])
+                next_arrival += 1
+            self.run()
+        elapsed = time.perf_counter() - start
+        self.shutdown()
+        return elapsed
+
+
+def replay_run(run_path, config=None):
+    """
+    Replays the trace of every machine of a run, writing the replayed logs to the run's replay
+    folder, and checks they match the recorded logs.
+
+    :param run_path: Path to the run folder, inside LOG_DIR
+    :param config: Configuration dictionary of the run (default: the run's config.json)
+    :return: List of dictionaries of each machine's ID, ticks, replay time and whether its replayed events match
+    """
+    if config is None:
+        with open(os.path.join(run_path, "config.json")) as f:
+            config = json.load(f)
+    port_map = build_port_map(config)
+    topology = build_topology(config, list(port_map))
+    # replace the logs of earlier replays, since loggers append to existing logs
+    replay_path = os.path.join(os.path.relpath(run_path, LOG_DIR), REPLAY_DIR)
+    shutil.rmtree(os.path.join(LOG_DIR, replay_path), ignore_errors=True)
+    os.makedirs(os.path.join(LOG_DIR, replay_path))
+
+    results = []
+    for trace_path in sorted(glob.glob(os.path.join(run_path, f"process_*.{TRACE_EXTENSION}"))):
+        trace = load_trace(trace_path)
+        machine = ReplayMachine(trace, replay_path, "replay", port_map, config["MAX_CLOCK_RATE"],
+                                config["MAX_EVENT_NUM"], config["EXPERIMENT_DURATION"],
+                                config.get("LOG_FORMAT", "text"), topology=topology,
+                                queue_options=build_queue_options(config),
+                                clock_type=config.get("CLOCK_TYPE", CLOCK_LAMPORT))
+        seconds = machine.replay()
+        results.append({"machine_id": machine.id, "ticks": trace["ticks"], "seconds": seconds,
+                        "matches": replay_matches(run_path, replay_path, machine)})
+    return results
+
+
+def replay_matches(run_path, replay_path, machine):
+    """
+    Checks that a replayed machine logged the same events, clocks and queue lengths as the recorded one.
+
+    :param run_path: Path to the recorded run folder
+    :param replay_path: Path to the replayed run folder, relative to LOG_DIR
+    :param machine: Replayed machine
+    :return: Whether the parsed logs match
+    """
+    process_name = f"process_{machine.id}"
+    recorded = parse_log_file(find_run_log_files(run_path)[process_name], 1)[REPLAYED_COLUMNS]
+    replayed = parse_log_file(find_run_log_files(os.path.join(LOG_DIR, replay_path))[process_name],
+                              1)[REPLAYED_COLUMNS]
+    # the recorded machine may have stopped in the middle of a tick
+    return replayed.iloc[:len(recorded)].astype({"Event": object}).equals(recorded.astype({"Event": object}))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replays the recorded traces of a run's machines as fast as possible.")
+    parser.add_argument("run", help="Run folder with trace files, e.g. logs/exp_4/run_1 (recorded with TRACE)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Number of times to replay the run, e.g. to compare code versions (default: 1)")
+    args = parser.parse_args()
+
+    for repetition in range(1, args.repeat + 1):
+        results = replay_run(args.run)
+        if not results:
+            print(f"ERROR: No trace files in {args.run}; record a run with TRACE set in config.json")
+            return
+        for result in results:
+            print(f"Replay {repetition}, machine {result['machine_id']}: {result['ticks']} ticks in "
+                  f"{result['seconds'] * 1000:.1f} ms ({result['ticks'] / max(result['seconds'], 1e-9):,.0f} ticks/s), "
+                  f"{'matches the recorded log' if result['matches'] else 'DIFFERS from the recorded log'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+# imported as a module, since analyze_logs imports this module to ingest the experiments it analyzes
+import analyze_logs
+
+# Default path of the results database
+RESULTS_DB = "results.db"
+
+# Tables of the results database. Experiments hold the parameters from their README, runs their
+# configuration, machines and run_summaries the statistics of each run, and events every parsed event.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    max_clock_rate INTEGER,
+    max_event_num INTEGER,
+    machines INTEGER,
+    topology TEXT,
+    duration REAL,
+    runs INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    experiment_id INTEGER NOT NULL REFERENCES experiments(id),
+    run_number INTEGER NOT NULL,
+    seed INTEGER,
+    config TEXT,
+    events INTEGER NOT NULL,
+    elapsed_seconds REAL,
+    UNIQUE (experiment_id, run_number)
+);
+CREATE TABLE IF NOT EXISTS machines (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    process_id INTEGER NOT NULL,
+    clock_rate INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    final_clock INTEGER NOT NULL,
+    mean_drift REAL NOT NULL,
+    max_drift INTEGER NOT NULL,
+    max_queue_length INTEGER NOT NULL,
+    PRIMARY KEY (run_id, process_id)
+);
+CREATE TABLE IF NOT EXISTS run_summaries (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    clock_rate INTEGER NOT NULL,
+    min_drift INTEGER NOT NULL,
+    mean_drift REAL NOT NULL,
+    max_drift INTEGER NOT NULL,
+    mean_logical_clock_jump REAL NOT NULL,
+    max_logical_clock_jump INTEGER NOT NULL,
+    mean_queue_length REAL NOT NULL,
+    max_queue_length INTEGER NOT NULL,
+    mean_queue_length_change REAL NOT NULL,
+    max_queue_length_change INTEGER NOT NULL,
+    sent_events INTEGER NOT NULL,
+    processed_events INTEGER NOT NULL,
+    internal_events INTEGER NOT NULL,
+    total_events INTEGER NOT NULL,
+    PRIMARY KEY (run_id, clock_rate)
+);
+CREATE TABLE IF NOT EXISTS event_names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    process_id INTEGER NOT NULL,
+    event_id INTEGER NOT NULL REFERENCES event_names(id),
+    time_ns INTEGER NOT NULL,
+    elapsed_seconds REAL NOT NULL,
+    logical_clock INTEGER NOT NULL,
+    logical_clock_jump INTEGER NOT NULL,
+    queue_length INTEGER NOT NULL,
+    queue_length_change INTEGER NOT NULL,
+    drift INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_experiment ON runs (experiment_id);
+CREATE INDEX IF NOT EXISTS events_run_time ON events (run_id, time_ns);
+CREATE INDEX IF NOT EXISTS events_run_process ON events (run_id, process_id);
+"""
+
+# Experiment parameters written to README.md by main.set_up_exp_folder, with their column and type
+README_PARAMETERS = {
+    "Max Clock Rate": ("max_clock_rate", int),
+    "Max Event Num": ("max_event_num", int),
+    "Machines": ("machines", int),
+    "Topology": ("topology", str),
+    "Duration": ("duration", lambda value: float(value.removesuffix(" s"))),
+}
+
+# Columns of the run_summaries table for each column of analyze_logs.compute_statistics
+SUMMARY_COLUMNS = {
+    "Min Drift": "min_drift",
+    "Mean Drift": "mean_drift",
+    "Max Drift": "max_drift",
+    "Mean Logical Clock Jump": "mean_logical_clock_jump",
+    "Max Logical Clock Jump": "max_logical_clock_jump",
+    "Mean Queue Length": "mean_queue_length",
+    "Max Queue Length": "max_queue_length",
+    "Mean Queue Length Change": "mean_queue_length_change",
+    "Max Queue Length Change": "max_queue_length_change",
+    "Sent Events": "sent_events",
+    "Processed Events": "processed_events",
+    "Internal Events": "internal_events",
+    "Total Events": "total_events",
+}
+
+# Experiment parameters results can be grouped by in summarize_by
+PARAMETERS = ["max_clock_rate", "max_event_num", "machines", "topology", "duration"]
+
+
+def read_experiment_readme(folder_path):
+    """
+    Reads the parameters and run seeds an experiment's README.md records.
+
+    :param folder_path: Path to the experiment folder
+    :return: Tuple of (dictionary of parameters by column name, dictionary of seeds by run number)
+    """
+    parameters, seeds = {}, {}
+    readme_path = os.path.join(folder_path, "README.md")
+    if not os.path.exists(readme_path):
+        return parameters, seeds
+    with open(readme_path) as f:
+        for line in f:
+            match = re.match(r"- \*\*(.+?):\*\* (\S.*?)(?: \(.*\))?$", line.strip())
+            if not match:
+                continue
+            label, value = match.groups()
+            if label in README_PARAMETERS:
+                column, convert = README_PARAMETERS[label]
+                parameters[column] = convert(value)
+            elif label.startswith("Run "):
+                seeds[int(label.split()[-1])] = int(value)
+    return parameters, seeds
+
+
+def experiment_signature(folder_path):
+    """
+    Returns a signature of the files an experiment's results are read from, which changes when
+    any of them is added, appended to or replaced: the log files, the stats files (whose clock
+    probes correct the log timestamps), the run configurations and the README.
+
+    :param folder_path: Path to the experiment folder
+    :return: Hex digest of the files' paths, sizes and modification times
+    """
+    paths = [os.path.join(folder_path, "README.md")]
+    for run_folder in sorted(os.listdir(folder_path)):
+        run_path = os.path.join(folder_path, run_folder)
+        if not os.path.isdir(run_path):
+            continue
+        paths += analyze_logs.find_run_log_files(run_path).values()
+        paths += [os.path.join(run_path, file) for file in sorted(os.listdir(run_path)) if file.endswith(".json")]
+
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+class ResultsStore:
+    def __init__(self, db_path=RESULTS_DB):
+        """
+        Opens (or creates) a SQLite database of parsed experiment results.
+
+        Each experiment is ingested once, with its parameters, run configurations, per-run
+        summaries and events, so questions across experiments are answered with a query instead
+        of parsing every log again.
+
+        :param db_path: Path to the database file (default: RESULTS_DB)
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def ingest_experiment(self, folder_path, df=None, events=True):
+        """
+        Adds an experiment's results to the store, replacing any earlier results of its folder.
+
+        Experiments whose log files haven't changed since they were ingested are skipped.
+
+        :param folder_path: Path to the experiment folder
+        :param df: Parsed log data of the experiment, from analyze_logs.parse_log_files (default: parse the logs)
+        :param events: Whether to store every event, as well as the summaries (default: True)
+        :return: Whether the experiment was ingested
+        """
+        path = os.path.abspath(folder_path)
+        signature = experiment_signature(folder_path)
+        existing = self.connection.execute(
+            "SELECT id, signature FROM experiments WHERE path = ?", (path,)).fetchone()
+        if existing is not None and existing[1] == signature:
+            return False
+        if df is None:
+            df = analyze_logs.parse_log_files(folder_path)
+        parameters, seeds = read_experiment_readme(folder_path)
+
+        with self.connection:
+            if existing is not None:
+                self.delete_experiment(existing[0])
+            columns = ["name", "path", "runs", "signature", "ingested_at"] + list(parameters)
+            values = [os.path.basename(path), path, int(df["Run"].nunique()), signature, time.time()] + \
+                list(parameters.values())
+            experiment_id = self.connection.execute(
+                f"INSERT INTO experiments ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values).lastrowid
+            for run_number, run_df in df.groupby("Run"):
+                self.insert_run(experiment_id, folder_path, int(run_number), run_df, seeds, events)
+        return True
+
+    def insert_run(self, experiment_id, folder_path, run_number, run_df, seeds, events):
+        """
+        Adds one run of an experiment being ingested, with its machines, summaries and events.
+
+        :param experiment_id: ID of the experiment's row
+        :param folder_path: Path to the experiment folder
+        :param run_number: Number of the run
+        :param run_df: Parsed log data of the run
+        :param seeds: Dictionary of seeds by run number, from the experiment's README
+        :param events: Whether to store every event
+        """
+        config = None
+        config_path = os.path.join(folder_path, f"run_{run_number}", "config.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                config = json.load(f)
+        seed = config.get("SEED") if config is not None else None
+        if seed is None:
+            seed = seeds.get(run_number)
+        run_id = self.connection.execute(
+            "INSERT INTO runs (experiment_id, run_number, seed, config, events, elapsed_seconds) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (experiment_id, run_number, seed, json.dumps(config) if config is not None else None, len(run_df),
+             float(run_df["Elapsed Seconds"].max()) if len(run_df) else None)).lastrowid
+
+        machines = run_df.groupby("Process ID").agg(
+            clock_rate=("Clock Rate", "last"), events=("Drift", "size"), final_clock=("Logical Clock", "max"),
+            mean_drift=("Drift", "mean"), max_drift=("Drift", "max"), max_queue_length=("Queue Length", "max"))
+        self.connection.executemany(
+            "INSERT INTO machines VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(run_id, process_id, *row) for process_id, row in
+             zip(machines.index.tolist(), machines.astype(object).itertuples(index=False))])
+
+        summary_df, _ = analyze_logs.compute_statistics(run_df)
+        self.connection.executemany(
+            f"INSERT INTO run_summaries VALUES ({', '.join('?' * (len(SUMMARY_COLUMNS) + 2))})",
+            [(run_id, clock_rate, *row) for clock_rate, row in
+             zip(summary_df.index.tolist(), summary_df[list(SUMMARY_COLUMNS)].astype(object).itertuples(index=False))])
+
+        if events:
+            event_ids = self.event_ids(run_df["Event"].cat.categories)
+            self.connection.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                zip([run_id] * len(run_df), run_df["Process ID"].tolist(),
+                    event_ids[run_df["Event"].cat.codes.to_numpy()].tolist(), run_df["Time NS"].tolist(),
+                    run_df["Elapsed Seconds"].tolist(), run_df["Logical Clock"].tolist(),
+                    run_df["Logical Clock Jump"].tolist(), run_df["Queue Length"].tolist(),
+                    run_df["Queue Length Change"].tolist(), run_df["Drift"].tolist()))
+
+    def event_ids(self, names):
+        """
+        Returns the IDs of event names, adding names that aren't stored yet.
+
+        :param names: Index of event names
+        :return: Array of event IDs, in the order of the names
+        """
+        self.connection.executemany("INSERT OR IGNORE INTO event_names (name) VALUES (?)",
+                                    [(name,) for name in names])
+        ids = dict(self.connection.execute("SELECT name, id FROM event_names"))
+        return pd.Series([ids[name] for name in names], dtype="int64").to_numpy()
+
+    def delete_experiment(self, experiment_id):
+        """
+        Deletes an experiment and everything stored for its runs.
+
+        :param experiment_id: ID of the experiment's row
+        """
+        runs = "SELECT id FROM runs WHERE experiment_id = ?"
+        for table in ["events", "machines", "run_summaries"]:
+            self.connection.execute(f"DELETE FROM {table} WHERE run_id IN ({runs})", (experiment_id,))
+        self.connection.execute("DELETE FROM runs WHERE experiment_id = ?", (experiment_id,))
+        self.connection.execute("DELETE FROM experiments WHERE id = ?", (experiment_id,))
+
+    def query(self, sql, params=()):
+        """
+        Runs a query against the store.
+
+        :param sql: SQL query
+        :param params: Parameters of the query (default: none)
+        :return: DataFrame of the query's rows
+        """
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def summarize_by(self, parameter):
+        """
+        Summarizes drift and queue lengths across every stored run by an experiment parameter,
+        e.g. max drift by MAX_CLOCK_RATE across all sweeps.
+
+        :param parameter: Experiment column to group by (one of PARAMETERS)
+        :return: DataFrame of statistics, indexed by the parameter's values
+        """
+        if parameter not in PARAMETERS:
+            raise ValueError(f"Unknown parameter: {parameter}")
+        return self.query(f"""
+            SELECT e.{parameter}, COUNT(DISTINCT e.id) AS experiments, COUNT(DISTINCT r.id) AS runs,
+                   MAX(s.max_drift) AS max_drift, SUM(s.mean_drift * s.total_events) / SUM(s.total_events) AS mean_drift,
+                   MAX(s.max_queue_length) AS max_queue_length, SUM(s.total_events) AS total_events
+            FROM run_summaries s JOIN runs r ON s.run_id = r.id JOIN experiments e ON r.experiment_id = e.id
+            GROUP BY e.{parameter} ORDER BY e.{parameter}
+        """).set_index(parameter)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ingests experiment results into a SQLite database and queries them.")
+    parser.add_argument("folders", nargs="*", metavar="folder",
+                        help="Experiment folders to ingest (default: the latest logs/exp_x folder, unless querying)")
+    parser.add_argument("--all", action="store_true",
+                        help="Ingest every logs/exp_x folder")
+    parser.add_argument("--db", default=RESULTS_DB,
+                        help=f"Path to the results database (default: {RESULTS_DB})")
+    parser.add_argument("--no-events", action="store_true",
+                        help="Only store summaries, not every event")
+    parser.add_argument("--by", choices=PARAMETERS,
+                        help="Print drift and queue length statistics by an experiment parameter")
+    parser.add_argument("--query", help="SQL query to print the results of")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    try:
+        querying = args.by is not None or args.query is not None
+        folder_paths = analyze_logs.exp_folders() if args.all else \
+            args.folders or ([] if querying else [analyze_logs.latest_exp_folder()])
+        for folder_path in folder_paths:
+            ingested = store.ingest_experiment(folder_path, events=not args.no_events)
+            print(f"{'Ingested' if ingested else 'Skipped (unchanged)'} {folder_path}")
+        if args.by is not None:
+            print(store.summarize_by(args.by).to_string())
+        if args.query is not None:
+            print(store.query(args.query).to_string())
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import time
+
+# What to do when a tick starts after the deadline of the next tick has already passed
+OVERRUN_CATCH_UP = "catch-up"  # run every missed tick back to back until caught up
+OVERRUN_SKIP = "skip"  # drop missed ticks and continue from the latest deadline
+OVERRUN_POLICIES = [OVERRUN_CATCH_UP, OVERRUN_SKIP]
+
+
+class TickScheduler:
+    def __init__(self, clock_rate, overrun_policy=OVERRUN_CATCH_UP, clock=time):
+        """
+        Initializes a scheduler that paces clock ticks on absolute monotonic deadlines.
+
+        Tick k is due k / clock_rate seconds after the scheduler starts, so time spent running a
+        tick is not added to the period, and the configured rate is kept on average.
+
+        :param clock_rate: Clock rate in ticks/second
+        :param overrun_policy: OVERRUN_CATCH_UP or OVERRUN_SKIP (default: OVERRUN_CATCH_UP)
+        :param clock: Source of monotonic time and sleep (default: the time module)
+        """
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(
+                f"Unknown overrun policy: {overrun_policy} (expected one of {', '.join(OVERRUN_POLICIES)})")
+        self.clock_rate = clock_rate
+        self.overrun_policy = overrun_policy
+        self.clock = clock
+        self.start_ns = clock.monotonic_ns()
+        self.tick = 0  # index of the last tick that was due
+        self.skipped_ticks = 0  # ticks dropped by the skip policy
+        self.lateness_ns = []  # how long after its deadline each tick started
+
+    def deadline_ns(self, tick):
+        """
+        Returns the monotonic deadline of a tick.
+
+        :param tick: Index of the tick (tick 1 is due one period after the start)
+        :return: Deadline in nanoseconds
+        """
+        return self.start_ns + tick * 1_000_000_000 // self.clock_rate
+
+    def due(self):
+        """
+        Moves on to the next tick.
+
+        :return: Seconds until the tick is due (0 if it is already due)
+        """
+        self.tick += 1
+        now = self.clock.monotonic_ns()
+        if self.overrun_policy == OVERRUN_SKIP:
+            # drop every tick whose deadline has passed, except the latest one
+            while self.deadline_ns(self.tick + 1) <= now:
+                self.tick += 1
+                self.skipped_ticks += 1
+        return max(self.deadline_ns(self.tick) - now, 0) / 1_000_000_000
+
+    def start_tick(self):
+        """
+        Records the lateness of a tick that is starting.
+
+        :return: Lateness of the tick in nanoseconds
+        """
+        lateness = self.clock.monotonic_ns() - self.deadline_ns(self.tick)
+        self.lateness_ns.append(lateness)
+        return lateness
+
+    def wait(self):
+        """
+        Sleeps until the next tick is due.
+
+        :return: Lateness of the tick in nanoseconds
+        """
+        delay = self.due()
+        if delay > 0:
+            self.clock.sleep(delay)
+        return self.start_tick()
+
+    def stats(self):
+        """
+        Returns statistics about the ticks run so far.
+
+        A tick is counted as an overrun if it started after the next tick was already due.
+
+        :return: Dictionary of tick counts, rates and lateness statistics in nanoseconds
+        """
+        lateness = sorted(self.lateness_ns)
+        ticks = len(lateness)
+        period = 1_000_000_000 / self.clock_rate
+        elapsed = (self.clock.monotonic_ns() - self.start_ns) / 1_000_000_000
+        return {
+            "clock_rate": self.clock_rate,
+            "overrun_policy": self.overrun_policy,
+            "ticks": ticks,
+            "skipped_ticks": self.skipped_ticks,
+            "overruns": sum(1 for late in lateness if late >= period),
+            "actual_rate": ticks / elapsed if elapsed > 0 else 0.0,
+            "mean_lateness_ns": sum(lateness) / ticks if ticks else 0.0,
+            "p50_lateness_ns": lateness[ticks // 2] if ticks else 0,
+            "p99_lateness_ns": lateness[ticks * 99 // 100] if ticks else 0,
+            "max_lateness_ns": lateness[-1] if ticks else 0,
+        }
@@ -0,0 +1,231 @@
+import argparse
+import heapq
+import json
+import random
+import time
+
+from machine import Machine, machine_seed
+from main import random_seed, set_up_exp_folder
+from topology import TOPOLOGIES, build_port_map, build_topology
+from logger import LogWriter, build_log_options
+from logical_clocks import CLOCK_LAMPORT
+from message_queue import build_queue_options
+
+# Kinds of simulation events (ticks sort before deliveries at the same time)
+TICK = 0
+DELIVER = 1
+
+
+class VirtualClock:
+    def __init__(self, start_ns):
+        """
+        Initializes a virtual clock shared by all machines in a simulated run.
+
+        Provides the same time_ns() and monotonic_ns() methods as the time module, so it can
+        be used as an EventLogger clock.
+
+        :param start_ns: Wall clock time at the start of the run, in nanoseconds
+        """
+        self.start_ns = start_ns
+        self.now_ns = 0  # virtual time since the start of the run
+
+    def time_ns(self):
+        return self.start_ns + self.now_ns
+
+    def monotonic_ns(self):
+        return self.now_ns
+
+
+class SimulatedConnection:
+    def __init__(self, simulation, recipient_id):
+        """
+        Initializes a simulated connection to another machine.
+
+        :param simulation: Simulation the connection belongs to
+        :param recipient_id: ID of the machine on the other end
+        """
+        self.simulation = simulation
+        self.recipient_id = recipient_id
+
+    def sendall(self, data):
+        """
+        Sends a message over the simulated network.
+
+        :param data: Message bytes
+        """
+        self.simulation.send(self.recipient_id, data)
+
+    def close(self):
+        pass
+
+
+class SimulatedMachine(Machine):
+    def __init__(self, simulation, id, *args, **kwargs):
+        """
+        Initializes a virtual machine that runs in virtual time, without sockets or threads.
+
+        :param simulation: Simulation the machine belongs to
+        :param id: ID of the machine
+        :param args: Remaining Machine arguments
+        :param kwargs: Remaining Machine keyword arguments
+        """
+        self.simulation = simulation
+        super().__init__(id, *args, clock=simulation.clock, **kwargs)
+
+    def open_socket(self):
+        self.socket = None
+        self.transport = None
+
+    def open_connection(self, machine_id, port):
+        return SimulatedConnection(self.simulation, machine_id)
+
+
+class Simulation:
+    def __init__(self, log_file_path, port_map, max_clock_rate, max_event_num, duration,
+                 latency=0.0, jitter=0.0, log_format="text", seed=None, topology=None, queue_options=None,
+                 log_options=None, clock_type=CLOCK_LAMPORT):
+        """
+        Initializes a discrete-event simulation of one experiment run.
+
+        Machines tick at their clock rate on a virtual clock, and messages are delivered after a
+        simulated network latency, so a run takes as long as its events take to process rather
+        than `duration` seconds.
+
+        :param log_file_path: Path to log folder for this run
+        :param port_map: Dictionary of port numbers for each machine (only used for logging)
+        :param max_clock_rate: Maximum clock rate in operations/second
+        :param max_event_num: Maximum number for determining what event to perform on each clock cycle
+        :param duration: Length of the run in virtual seconds
+        :param latency: Network latency in seconds (default: 0)
+        :param jitter: Maximum extra random network latency in seconds (default: 0)
+        :param log_format: Format of the log files, "text" or "binary" (default: "text")
+        :param seed: Seed of the run, from which each machine's seed (for its clock rate and events) and the jitter's
+            seed are derived (default: unseeded)
+        :param topology: Topology deciding which machines to send messages to (default: a ring of all machines)
+        :param queue_options: MessageQueue keyword arguments for every machine (default: an unbounded queue)
+        :param log_options: EventLogger keyword arguments for every machine (default: one log file per machine)
+        :param clock_type: Type of logical clock of every machine (default: "lamport")
+        """
+        self.rng = random.Random(seed)  # network jitter
+        self.duration_ns = int(duration * 1_000_000_000)
+        self.latency_ns = int(latency * 1_000_000_000)
+        self.jitter_ns = int(jitter * 1_000_000_000)
+        self.clock = VirtualClock(time.time_ns())
+        self.events = []  # heap of (time ns, kind, sequence number, machine ID, message)
+        self.sequence = 0  # tie breaker that keeps events at the same time in FIFO order
+        self.writer = LogWriter()  # one thread writes the logs of every machine
+        log_options = dict(log_options or {}, writer=self.writer)
+
+        self.machines = {
+            machine_id: SimulatedMachine(self, int(machine_id), log_file_path, "simulated", port_map,
+                                         max_clock_rate, max_event_num, duration, log_format,
+                                         topology=topology, queue_options=queue_options, log_options=log_options, clock_type=clock_type,
+                                         seed=machine_seed(seed, machine_id))
+            for machine_id in port_map
+        }
+
+    def schedule(self, time_ns, kind, machine_id, message=None):
+        """
+        Schedules an event.
+
+        :param time_ns: Virtual time of the event, in nanoseconds
+        :param kind: TICK or DELIVER
+        :param machine_id: ID of the machine the event happens on
+        :param message: Message bytes to deliver
+        """
+        heapq.heappush(self.events, (time_ns, kind,
+                       self.sequence, machine_id, message))
+        self.sequence += 1
+
+    def send(self, recipient_id, data):
+        """
+        Sends a message to a machine after the simulated network latency.
+
+        :param recipient_id: ID of the recipient machine
+        :param data: Message bytes
+        """
+        delay_ns = self.latency_ns
+        if self.jitter_ns:
+            delay_ns += self.rng.randint(0, self.jitter_ns)
+        self.schedule(self.clock.now_ns + delay_ns,
+                      DELIVER, recipient_id, data)
+
+    def run(self):
+        """
+        Runs the simulation until the virtual duration has passed, then stops every machine.
+        """
+        # like Machine.start, each machine sleeps one clock cycle before its first tick
+        ticks = {}
+        for machine_id, machine in self.machines.items():
+            ticks[machine_id] = 1
+            self.schedule(1_000_000_000 // machine.clock_rate,
+                          TICK, machine_id)
+
+        while self.events and self.events[0][0] <= self.duration_ns:
+            time_ns, kind, _, machine_id, message = heapq.heappop(self.events)
+            self.clock.now_ns = time_ns
+            machine = self.machines[machine_id]
+
+            if kind == TICK:
+                machine.run()
+                # compute each tick from the start, so rounding errors don't accumulate
+                ticks[machine_id] += 1
+                self.schedule(ticks[machine_id] * 1_000_000_000 // machine.clock_rate,
+                              TICK, machine_id)
+            else:
+                machine.receive(message)
+
+        self.clock.now_ns = self.duration_ns
+        for machine in self.machines.values():
+            machine.shutdown()
+        self.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs an experiment as a discrete-event simulation in virtual time.")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Number of runs (default: 5)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Network latency in seconds (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Maximum extra random network latency in seconds (default: 0)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Random seed of the first run; later runs use seed + run number - 1 "
+                             "(default: SEED in config.json, or a new random seed)")
+    parser.add_argument("--machines", type=int, default=None,
+                        help="Number of machines (default: NUM_MACHINES or PORTS in config.json)")
+    parser.add_argument("--topology", choices=list(TOPOLOGIES), default=None,
+                        help="Communication topology (default: TOPOLOGY in config.json, or ring)")
+    args = parser.parse_args()
+
+    with open("../config.json") as f:
+        config = json.load(f)
+    if args.machines is not None:
+        config["NUM_MACHINES"] = args.machines
+    if args.topology is not None:
+        config["TOPOLOGY"] = args.topology
+    max_clock_rate = config["MAX_CLOCK_RATE"]
+    max_event_num = config["MAX_EVENT_NUM"]
+    port_map = build_port_map(config)
+    topology = build_topology(config, list(port_map))
+    seed = args.seed if args.seed is not None else config.get("SEED")
+    if seed is None:
+        seed = random_seed()
+    seeds = {run_id: seed + run_id - 1 for run_id in range(1, args.runs + 1)}
+    exp_name = set_up_exp_folder(max_clock_rate, max_event_num, args.runs, len(port_map),
+                                 config.get("TOPOLOGY", "ring"), config["EXPERIMENT_DURATION"], seeds=seeds)
+
+    print(f"\nSimulating {args.runs} runs...")
+    start = time.perf_counter()
+    for run_id, seed in seeds.items():
+        Simulation(f"{exp_name}/run_{run_id}", port_map, max_clock_rate, max_event_num,
+                   config["EXPERIMENT_DURATION"], args.latency, args.jitter,
+                   config.get("LOG_FORMAT", "text"), seed, topology, build_queue_options(config),
+                   build_log_options(config), config.get("CLOCK_TYPE", CLOCK_LAMPORT)).run()
+    print(
+        f"Simulation complete in {time.perf_counter() - start:.2f} s. Log files are stored in logs/{exp_name}.")
+
+
+if __name__ == '__main__':
+    main()
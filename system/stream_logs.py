@@ -0,0 +1,414 @@
+import argparse
+import collections
+from datetime import datetime
+import gzip
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import time
+
+import pandas as pd
+
+from analyze_logs import COUNTED_EVENTS, HYBRID_CLOCK_EVENT, LOG_PATTERN, SKIPPED_EVENTS, find_run_log_files, \
+    is_binary_log, latest_exp_folder
+from logical_clocks import HYBRID_COUNTER_BITS
+from logger import BINARY_HEADER, BINARY_MAGIC, BINARY_RECORD, BINARY_VERSION, COMPRESSED_SUFFIX, EVENT_FORMATS, \
+    EVENT_INITIALIZED, EVENT_STOPPED, INDEX_SUFFIX, LOG_EXTENSIONS, segment_name
+
+# Text of the initialization event before its arguments
+INITIALIZED_PREFIX = EVENT_FORMATS[EVENT_INITIALIZED].split("{", 1)[0]
+# Name of a log segment, e.g. process_1.log.00002.gz, with the name of its process
+SEGMENT_PATTERN = re.compile(
+    rf"^(process_\d+)\.(?:{'|'.join(LOG_EXTENSIONS.values())})\.\d+(?:{re.escape(COMPRESSED_SUFFIX)})?$")
+# Default number of seconds between reads of the log files
+DEFAULT_POLL_INTERVAL = 0.5
+# Default number of seconds between printed summaries
+DEFAULT_SUMMARY_INTERVAL = 5.0
+# Default number of seconds after which a process that logs nothing new stops holding back the others
+DEFAULT_STALE_SECONDS = 10.0
+
+
+class RunningStats:
+    __slots__ = ("count", "total", "minimum", "maximum")
+
+    def __init__(self):
+        """
+        Initializes a running count, sum, minimum and maximum of a series of values.
+        """
+        self.count = 0
+        self.total = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+
+class RateStats:
+    def __init__(self):
+        """
+        Initializes the running statistics of every event of machines with one clock rate.
+        """
+        self.drift = RunningStats()
+        self.jump = RunningStats()
+        self.queue_length = RunningStats()
+        self.queue_length_change = RunningStats()
+        self.counts = collections.Counter()
+
+    def summary(self):
+        """
+        Returns the statistics in the layout of analyze_logs.compute_statistics.
+
+        :return: Dictionary of statistics
+        """
+        return {
+            "Min Drift": self.drift.minimum,
+            "Mean Drift": self.drift.mean,
+            "Max Drift": self.drift.maximum,
+            "Mean Logical Clock Jump": self.jump.mean,
+            "Max Logical Clock Jump": self.jump.maximum,
+            "Mean Queue Length": self.queue_length.mean,
+            "Max Queue Length": self.queue_length.maximum,
+            "Mean Queue Length Change": self.queue_length_change.mean,
+            "Max Queue Length Change": self.queue_length_change.maximum,
+            **{column: self.counts[column] for column in COUNTED_EVENTS.values()},
+            "Total Events": self.drift.count,
+        }
+
+
+class LogTail:
+    def __init__(self, path):
+        """
+        Initializes a reader of the records appended to a text or binary log file (or log segment)
+        since it was last read.
+
+        :param path: Path to the log file
+        """
+        self.path = path
+        self.binary = is_binary_log(path)
+        self.offset = BINARY_HEADER.size if self.binary else 0
+        self.partial = b""  # start of a line or record that hasn't been completely written yet
+        self.checked_header = False
+
+    def read(self):
+        """
+        Reads the complete records appended to the file.
+
+        :return: List of (event message, time in ns, logical clock, queue length) tuples
+        """
+        with (gzip.open if self.path.endswith(COMPRESSED_SUFFIX) else open)(self.path, "rb") as file:
+            if self.binary and not self.checked_header:
+                header = file.read(BINARY_HEADER.size)
+                if len(header) < BINARY_HEADER.size:
+                    return []
+                magic, version, record_size = BINARY_HEADER.unpack(header)
+                if magic != BINARY_MAGIC or version != BINARY_VERSION or record_size != BINARY_RECORD.size:
+                    raise ValueError(f"Unsupported binary log file: {self.path}")
+                self.checked_header = True
+            file.seek(self.offset)
+            data = self.partial + file.read()
+        self.offset += len(data) - len(self.partial)
+
+        if self.binary:
+            complete = len(data) - len(data) % BINARY_RECORD.size
+            self.partial = data[complete:]
+            return [(EVENT_FORMATS[event_type].format(arg1, arg2), time_ns, logical_clock, queue_length)
+                    for time_ns, _, logical_clock, queue_length, arg1, arg2, _, event_type
+                    in BINARY_RECORD.iter_unpack(data[:complete])]
+
+        complete = data.rfind(b"\n") + 1
+        self.partial = data[complete:]
+        records = []
+        for line in data[:complete].decode().splitlines():
+            match = LOG_PATTERN.match(line)
+            if not match:
+                continue
+            _, event, system_time, logical_clock, queue_length, time_ns, _ = match.groups()
+            if time_ns is None:
+                # fall back to the system time for logs without nanosecond timestamps
+                time_ns = int(datetime.fromisoformat(system_time).timestamp()) * 1_000_000_000
+            records.append((event, int(time_ns), int(logical_clock), int(queue_length)))
+        return records
+
+
+class SegmentedLogTail:
+    def __init__(self, index_path):
+        """
+        Initializes a reader of the records appended to a segmented log since it was last read,
+        which follows the open segment and moves on to the next segment once the open one is
+        added to the index.
+
+        :param index_path: Path to the index of the log segments, which may not exist yet
+        """
+        self.index_path = index_path
+        self.folder = os.path.dirname(index_path)
+        self.process_id = int(os.path.basename(index_path).split(".", 1)[0].removeprefix("process_"))
+        self.index_offset = 0  # bytes of the index read so far
+        self.complete = collections.deque()  # file names of complete segments not yet read to the end
+        self.number = 1  # number of the segment being read
+        self.tail = None  # LogTail of the segment being read, once it has been found
+
+    def read(self):
+        """
+        Reads the complete records appended to the log's segments.
+
+        :return: List of (event message, time in ns, logical clock, queue length) tuples
+        """
+        # read the index first, so a segment that isn't listed yet is still being written
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                f.seek(self.index_offset)
+                data = f.read()
+            complete = data.rfind(b"\n") + 1
+            self.index_offset += complete
+            self.complete.extend(json.loads(line)["segment"] for line in data[:complete].splitlines() if line.strip())
+
+        records = []
+        while self.complete:
+            # the rest of a complete segment is read from its final (possibly compressed) file
+            path = os.path.join(self.folder, self.complete.popleft())
+            if self.tail is None:
+                self.tail = LogTail(path)
+            self.tail.path = path
+            records += self.tail.read()
+            self.number += 1
+            self.tail = None
+
+        if self.tail is None:
+            for log_format in LOG_EXTENSIONS:
+                path = os.path.join(self.folder, segment_name(self.process_id, log_format, self.number))
+                if os.path.exists(path):
+                    self.tail = LogTail(path)
+        if self.tail is not None:
+            try:
+                records += self.tail.read()
+            except FileNotFoundError:
+                pass  # the segment was closed and compressed since the index was read
+        return records
+
+
+class ProcessState:
+    def __init__(self, order, found):
+        """
+        Initializes the state of one process of a run, which is the same size however long the run is.
+
+        :param order: Position of the process's log file in its run, which breaks ties between events at the same time
+        :param found: Monotonic time in seconds at which the process's log file was found
+        """
+        self.order = order
+        self.updated = found  # monotonic time at which the latest event was read, or the log file was found
+        self.clock_rate = None  # from the latest initialization
+        self.hybrid = False  # whether the process has a hybrid logical clock
+        self.last_clock = 0
+        self.last_queue_length = 0
+        self.last_time_ns = None  # time of the latest event read
+        self.stopped = False
+        # events read but not yet merged with the other processes of the run, because one of them
+        # may still log an earlier event
+        self.pending = collections.deque()
+
+
+class StreamingAnalyzer:
+    def __init__(self, folder_path, stale_seconds=DEFAULT_STALE_SECONDS, clock=time):
+        """
+        Initializes an analyzer that follows the log files of an experiment as they are written.
+
+        Statistics are kept as running aggregates per clock rate, so memory use doesn't grow with
+        the length of the run. Drift needs the highest clock of the run at the time of each event,
+        so the events of a run's processes are merged in time order up to the latest time every
+        running process has reached; only events after that time are held back. A process that
+        hasn't logged anything new for stale_seconds (e.g. because it died without logging that
+        it stopped) is no longer waited for, so the other processes' events aren't held back
+        without bound.
+
+        :param folder_path: Path to the experiment folder
+        :param stale_seconds: Seconds without new events after which a process is no longer waited for (default: 10)
+        :param clock: Source of monotonic() times (default: the time module)
+        """
+        self.folder_path = folder_path
+        self.stale_seconds = stale_seconds
+        self.clock = clock
+        self.tails = {}  # LogTail of each log file
+        self.runs = {}  # ProcessState of each log file, by run folder
+        self.max_clocks = {}  # highest logical clock merged so far, by run folder
+        self.rate_stats = collections.defaultdict(RateStats)
+        self.events = 0  # number of events read
+
+    def find_log_files(self):
+        """
+        Starts following log files that have appeared since the last poll.
+        """
+        for run_folder in sorted(os.listdir(self.folder_path)):
+            run_path = os.path.join(self.folder_path, run_folder)
+            if not os.path.isdir(run_path):
+                continue
+            processes = self.runs.setdefault(run_folder, {})
+            # follow the segments of a segmented log through its index, which is only written once
+            # its first segment is complete
+            log_files = find_run_log_files(run_path)
+            for log_file in sorted(os.listdir(run_path)):
+                match = SEGMENT_PATTERN.match(log_file)
+                if match:
+                    log_files[match.group(1)] = os.path.join(run_path, f"{match.group(1)}.{INDEX_SUFFIX}")
+            for log_path in log_files.values():
+                if log_path not in self.tails:
+                    self.tails[log_path] = SegmentedLogTail(log_path) if log_path.endswith(INDEX_SUFFIX) \
+                        else LogTail(log_path)
+                    processes[log_path] = ProcessState(len(processes), self.clock.monotonic())
+            self.max_clocks.setdefault(run_folder, 0)
+
+    def read(self, log_path, process):
+        """
+        Reads a log file's new events into its process's pending events.
+
+        :param log_path: Path to the log file
+        :param process: ProcessState of the log file
+        """
+        records = self.tails[log_path].read()
+        if records:
+            process.updated = self.clock.monotonic()
+        for event, time_ns, logical_clock, queue_length in records:
+            self.events += 1
+            process.last_time_ns = time_ns
+            if event.startswith(INITIALIZED_PREFIX):
+                process.clock_rate = int(event.rsplit(None, 1)[-1])
+                continue
+            if event.startswith(EVENT_FORMATS[EVENT_STOPPED]):
+                process.stopped = True
+            if event == HYBRID_CLOCK_EVENT:
+                # the first event's jump is measured from the hybrid clock's start
+                process.hybrid = True
+                process.last_clock = logical_clock >> HYBRID_COUNTER_BITS
+            if event.startswith(SKIPPED_EVENTS) or process.clock_rate is None:
+                continue
+            if process.hybrid:
+                # compare hybrid clocks by their physical milliseconds
+                logical_clock >>= HYBRID_COUNTER_BITS
+            jump = logical_clock - process.last_clock
+            queue_length_change = queue_length - process.last_queue_length
+            process.last_clock = logical_clock
+            process.last_queue_length = queue_length
+            process.pending.append((time_ns, process.order, event, logical_clock, jump,
+                                    queue_length, queue_length_change, process.clock_rate))
+
+    def merge(self, run_folder, processes, final):
+        """
+        Merges the pending events of a run in time order, up to the latest time every running
+        process has reached, and adds them to the statistics. Stale processes are left out, unless
+        every running process is stale.
+
+        :param run_folder: Name of the run folder
+        :param processes: ProcessState of each log file of the run
+        :param final: Whether to merge every pending event (no more events will be read)
+        """
+        running = [process for process in processes.values() if not process.stopped]
+        now = self.clock.monotonic()
+        # a process whose events arrive late is counted against the clocks of the events merged by then
+        waited = [process for process in running if now - process.updated < self.stale_seconds] or running
+        if final or not running:
+            watermark = math.inf
+        elif any(process.last_time_ns is None for process in waited):
+            return  # a process hasn't logged anything yet
+        else:
+            watermark = min(process.last_time_ns for process in waited)
+
+        ready = []
+        for process in processes.values():
+            events = []
+            while process.pending and process.pending[0][0] < watermark:
+                events.append(process.pending.popleft())
+            ready.append(events)
+
+        # events at the same time see each other's clocks
+        max_clock = self.max_clocks[run_folder]
+        for _, tie in itertools.groupby(heapq.merge(*ready), key=lambda event: event[0]):
+            tie = list(tie)
+            max_clock = max(max_clock, max(event[3] for event in tie))
+            for _, _, event, logical_clock, jump, queue_length, queue_length_change, clock_rate in tie:
+                stats = self.rate_stats[clock_rate]
+                stats.drift.add(max_clock - logical_clock)
+                stats.jump.add(jump)
+                stats.queue_length.add(queue_length)
+                stats.queue_length_change.add(queue_length_change)
+                for kind, column in COUNTED_EVENTS.items():
+                    if kind in event:
+                        stats.counts[column] += 1
+        self.max_clocks[run_folder] = max_clock
+
+    def poll(self, final=False):
+        """
+        Reads what has been appended to the log files and updates the statistics.
+
+        :param final: Whether this is the last poll, so every event read should be counted (default: False)
+        """
+        self.find_log_files()
+        for run_folder, processes in self.runs.items():
+            for log_path, process in processes.items():
+                self.read(log_path, process)
+            self.merge(run_folder, processes, final)
+
+    def summary(self):
+        """
+        Returns the statistics so far, in the layout of analyze_logs.compute_statistics.
+
+        :return: DataFrame of statistics, indexed by clock rate
+        """
+        summary_df = pd.DataFrame.from_dict(
+            {clock_rate: stats.summary() for clock_rate, stats in sorted(self.rate_stats.items())}, orient="index")
+        summary_df.index.name = "Clock Rate"
+        return summary_df
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Follows the logs of a running experiment and prints running statistics.")
+    parser.add_argument("folder", nargs="?", default=None,
+                        help="Experiment folder to follow (default: the latest logs/exp_x folder)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Seconds between reads of the log files (default: {DEFAULT_POLL_INTERVAL})")
+    parser.add_argument("--summary-interval", type=float, default=DEFAULT_SUMMARY_INTERVAL,
+                        help=f"Seconds between printed summaries (default: {DEFAULT_SUMMARY_INTERVAL})")
+    parser.add_argument("--stale-seconds", type=float, default=DEFAULT_STALE_SECONDS,
+                        help="Seconds without new events after which a process is no longer waited for "
+                             f"(default: {DEFAULT_STALE_SECONDS})")
+    parser.add_argument("--once", action="store_true",
+                        help="Read the logs once, print a summary and exit")
+    args = parser.parse_args()
+
+    folder_path = args.folder if args.folder is not None else latest_exp_folder()
+    analyzer = StreamingAnalyzer(folder_path, args.stale_seconds)
+    if args.once:
+        analyzer.poll(final=True)
+        print(analyzer.summary().to_string())
+        return
+
+    print(f"Following {folder_path} (Ctrl-C to stop)...")
+    next_summary = time.monotonic() + args.summary_interval
+    try:
+        while True:
+            analyzer.poll()
+            if time.monotonic() >= next_summary:
+                print(f"\n{time.strftime('%H:%M:%S')}: {analyzer.events} events")
+                print(analyzer.summary().to_string())
+                next_summary += args.summary_interval
+            time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        analyzer.poll(final=True)
+        print(f"\nFinal: {analyzer.events} events")
+        print(analyzer.summary().to_string())
+
+
+if __name__ == "__main__":
+    main()
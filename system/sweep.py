@@ -0,0 +1,192 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import itertools
+import json
+import os
+import queue
+import time
+
+from main import LOG_DIR, check_run_transport, perform_experiment_run, random_seed, set_up_exp_folder, \
+    write_run_config
+from simulation import Simulation
+from topology import DEFAULT_BASE_PORT, build_host_map, build_port_map, build_topology
+from logger import build_log_options
+from logical_clocks import CLOCK_LAMPORT
+from message_queue import build_queue_options
+from metrics import DEFAULT_METRICS_PORT_OFFSET
+
+
+def plan_sweep(config, clock_rates, event_nums, durations, run_counts, seed=None):
+    """
+    Sets up one experiment folder per combination of sweep parameters.
+
+    Runs are numbered across the sweep, and the n-th run (from 0) uses seed + n, recorded in
+    its experiment's README.
+
+    :param config: Base configuration dictionary
+    :param clock_rates: MAX_CLOCK_RATE values to sweep
+    :param event_nums: MAX_EVENT_NUM values to sweep
+    :param durations: EXPERIMENT_DURATION values to sweep, in seconds
+    :param run_counts: Numbers of runs per experiment to sweep
+    :param seed: Seed of the first run (default: SEED in the config, or a new random seed)
+    :return: List of (experiment name, run ID, run configuration) tuples, one per run
+    """
+    num_machines = len(build_port_map(config))
+    topology = config.get("TOPOLOGY", "ring")
+    if seed is None:
+        seed = config.get("SEED")
+    if seed is None:
+        seed = random_seed()
+
+    runs = []
+    for max_clock_rate, max_event_num, duration, num_runs in itertools.product(
+            clock_rates, event_nums, durations, run_counts):
+        seeds = {run_id: seed + len(runs) + run_id - 1 for run_id in range(1, num_runs + 1)}
+        exp_name = set_up_exp_folder(max_clock_rate, max_event_num, num_runs, num_machines, topology,
+                                     duration, seeds=seeds)
+        print(f"\t{exp_name}: MAX_CLOCK_RATE={max_clock_rate}, MAX_EVENT_NUM={max_event_num}, "
+              f"EXPERIMENT_DURATION={duration}, runs={num_runs}")
+        runs += [(exp_name, run_id, dict(config, MAX_CLOCK_RATE=max_clock_rate, MAX_EVENT_NUM=max_event_num,
+                                         EXPERIMENT_DURATION=duration, SEED=run_seed))
+                 for run_id, run_seed in seeds.items()]
+    return runs
+
+
+def build_slot_config(config, slot, workers):
+    """
+    Returns the configuration of a run in a worker slot, with the slot's range of ports.
+
+    Machines keep the hosts they have in the config, listed in HOSTS by machine ID. Metrics ports
+    are moved past the machine ports of every slot, so one run's metrics can't take another
+    run's machine ports.
+
+    :param config: Run configuration dictionary
+    :param slot: Worker slot of the run, from 0
+    :param workers: Number of worker slots
+    :return: Run configuration dictionary for the slot
+    """
+    port_map = build_port_map(config)
+    host_map = build_host_map(config)
+    num_machines = len(port_map)
+    return dict(config, NUM_MACHINES=num_machines, HOSTS=[host_map[machine_id] for machine_id in port_map],
+                BASE_PORT=config.get("BASE_PORT", DEFAULT_BASE_PORT) + slot * num_machines,
+                METRICS_PORT_OFFSET=max(config.get("METRICS_PORT_OFFSET", DEFAULT_METRICS_PORT_OFFSET),
+                                        workers * num_machines))
+
+
+def run_sweep(runs, workers):
+    """
+    Runs sweep runs as real machine processes, with up to `workers` runs at a time.
+
+    Each concurrent run gets its own range of ports: worker slot i runs its machines on ports
+    BASE_PORT + i * machines onwards, and a slot's ports are only reused once its run has ended.
+
+    :param runs: List of (experiment name, run ID, run configuration) tuples
+    :param workers: Maximum number of concurrent runs
+    """
+    slots = queue.Queue()  # free port ranges
+    for slot in range(workers):
+        slots.put(slot)
+
+    def perform_sweep_run(run):
+        exp_name, run_id, config = run
+        machine_ids = list(build_port_map(config))
+        slot = slots.get()
+        try:
+            # write the run's configuration next to its logs, with the slot's ports
+            config_path = write_run_config(exp_name, run_id, build_slot_config(config, slot, workers))
+            perform_experiment_run(run_id, machine_ids, exp_name, config_path,
+                                   config.get("ASYNC_MACHINES", False))
+        finally:
+            slots.put(slot)
+
+    # the machines are separate processes, so threads are enough to wait on them
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(perform_sweep_run, runs))
+
+
+def simulate_run(run, latency=0.0, jitter=0.0, seed=None):
+    """
+    Runs one sweep run as a discrete-event simulation.
+
+    :param run: Tuple of (experiment name, run ID, run configuration)
+    :param latency: Network latency in seconds (default: 0)
+    :param jitter: Maximum extra random network latency in seconds (default: 0)
+    :param seed: Random seed for the run (default: SEED in the run configuration)
+    """
+    exp_name, run_id, config = run
+    if seed is None:
+        seed = config.get("SEED")
+    port_map = build_port_map(config)
+    Simulation(f"{exp_name}/run_{run_id}", port_map, config["MAX_CLOCK_RATE"], config["MAX_EVENT_NUM"],
+               config["EXPERIMENT_DURATION"], latency, jitter, config.get("LOG_FORMAT", "text"), seed,
+               build_topology(config, list(port_map)), build_queue_options(config),
+               build_log_options(config), config.get("CLOCK_TYPE", CLOCK_LAMPORT)).run()
+
+
+def simulate_sweep(runs, workers, latency=0.0, jitter=0.0, seed=None):
+    """
+    Runs sweep runs as discrete-event simulations on a process pool.
+
+    :param runs: List of (experiment name, run ID, run configuration) tuples
+    :param workers: Number of processes
+    :param latency: Network latency in seconds (default: 0)
+    :param jitter: Maximum extra random network latency in seconds (default: 0)
+    :param seed: Random seed of the first run, in place of the planned seeds; later runs use seed + index of the
+        run (default: each run's planned seed)
+    """
+    seeds = [None if seed is None else seed + i for i in range(len(runs))]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(simulate_run, runs, itertools.repeat(latency),
+                          itertools.repeat(jitter), seeds))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs an experiment for every combination of the given parameters, running runs in parallel.")
+    parser.add_argument("--clock-rates", type=int, nargs="+", default=None,
+                        help="MAX_CLOCK_RATE values (default: MAX_CLOCK_RATE in config.json)")
+    parser.add_argument("--event-nums", type=int, nargs="+", default=None,
+                        help="MAX_EVENT_NUM values (default: MAX_EVENT_NUM in config.json)")
+    parser.add_argument("--durations", type=float, nargs="+", default=None,
+                        help="EXPERIMENT_DURATION values in seconds (default: EXPERIMENT_DURATION in config.json)")
+    parser.add_argument("--runs", type=int, nargs="+", default=[5],
+                        help="Numbers of runs per experiment (default: 5)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Maximum number of concurrent runs (default: number of CPUs)")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Run simulated machines in virtual time instead of machine processes")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated network latency in seconds (default: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Maximum extra random simulated network latency in seconds (default: 0)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Random seed of the first run; later runs use seed + index of the run "
+                             "(default: SEED in config.json, or a new random seed)")
+    args = parser.parse_args()
+
+    with open("../config.json") as f:
+        config = json.load(f)
+
+    if not args.simulate:
+        check_run_transport(config)
+
+    print(f"\nSetting up sweep...")
+    runs = plan_sweep(config,
+                      args.clock_rates or [config["MAX_CLOCK_RATE"]],
+                      args.event_nums or [config["MAX_EVENT_NUM"]],
+                      args.durations or [config["EXPERIMENT_DURATION"]],
+                      args.runs, args.seed)
+
+    print(f"\nRunning {len(runs)} runs on {args.workers} workers...")
+    start = time.perf_counter()
+    if args.simulate:
+        simulate_sweep(runs, args.workers, args.latency, args.jitter)
+    else:
+        run_sweep(runs, args.workers)
+    print(
+        f"Sweep complete in {time.perf_counter() - start:.2f} s. Log files are stored in {LOG_DIR}/.")
+
+
+if __name__ == '__main__':
+    main()
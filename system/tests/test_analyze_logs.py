@@ -0,0 +1,260 @@
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+import analyze_logs
+from analyze_logs import FIGURES, compute_statistics, load_time_range, parse_log_files, parse_log_file, \
+    parse_log_file_by_line, plot_statistics
+from convert_logs import convert_folder
+from logical_clocks import CLOCK_TYPES
+from simulation import Simulation
+
+# Archived experiment logs (second-resolution timestamps)
+ARCHIVED_LOGS = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'logs', 'exp_1'))
+
+# Wall clock start time of the synthetic logs, in nanoseconds
+START_NS = 1_740_000_000 * 1_000_000_000
+
+
+def write_log(path, process_id, clock_rate, events, clock_offset=0):
+    """
+    Writes a synthetic log file in the current log format.
+
+    :param path: Path to the log file
+    :param process_id: ID of the process
+    :param clock_rate: Clock rate logged at initialization
+    :param events: List of (seconds since start, event, logical clock, queue length)
+    :param clock_offset: Seconds the process's wall clock is ahead (default: 0)
+    """
+    events = [(0, f"Initialized on 1 with clock rate {clock_rate}", 0, 0)] + events
+    with open(path, "w") as f:
+        for seconds, event, logical_clock, queue_length in events:
+            time_ns = START_NS + int((seconds + clock_offset) * 1_000_000_000)
+            system_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(
+                time_ns // 1_000_000_000)) + f".{time_ns % 1_000_000_000 // 1000:06d}"
+            f.write(
+                f"{process_id}> Event: {event} | System Time: {system_time} | Logical Clock: {logical_clock} | Queue Length: {queue_length} | Time NS: {time_ns} | Monotonic NS: {time_ns - START_NS}\n")
+
+
+def test_drift_aligned_on_time(tmp_path):
+    """
+    Test that drift compares each event against the highest clock of any process as of its time.
+    """
+    os.makedirs(tmp_path / "run_1")
+    write_log(tmp_path / "run_1" / "process_1.log", 1, 1, [
+        (1.0, "Internal event", 1, 0),
+        (2.0, "Internal event", 2, 0),
+    ])
+    write_log(tmp_path / "run_1" / "process_2.log", 2, 2, [
+        (0.5, "Internal event", 1, 0),
+        (1.0, "Internal event", 2, 0),
+        (1.5, "Sent message to machine 1", 3, 0),
+        (2.0, "Internal event", 4, 0),
+    ])
+
+    df = parse_log_files(str(tmp_path), cache_dir=None)
+    drift = df.set_index(["Process ID", "Logical Clock"])["Drift"]
+    assert drift[(1, 1)] == 1, "Events at the same time should see each other's clocks"
+    assert drift[(1, 2)] == 2, "Drift should use the latest clock of the faster process"
+    assert drift[(2, 1)] == 0, "Processes with no earlier events should not affect drift"
+    assert (df.loc[df["Process ID"] == 2, "Drift"] == 0).all(
+    ), "The fastest process should never drift"
+    assert df.loc[df["Process ID"] == 2, "Elapsed Seconds"].tolist() == [
+        0.5, 1.0, 1.5, 2.0], "Elapsed time should have sub-second resolution"
+
+
+def test_drift_corrects_clock_offsets(tmp_path):
+    """
+    Test that the clock offsets measured by clock probes move events onto one clock before
+    drift is computed.
+    """
+    os.makedirs(tmp_path / "run_1")
+    write_log(tmp_path / "run_1" / "process_1.log", 1, 1, [
+        (1.0, "Internal event", 1, 0),
+        (2.0, "Internal event", 2, 0),
+    ])
+    # process 2's clock is 10 seconds ahead, which would put all of its events after process 1's
+    write_log(tmp_path / "run_1" / "process_2.log", 2, 2, [
+        (0.5, "Internal event", 1, 0),
+        (1.5, "Internal event", 3, 0),
+    ], clock_offset=10)
+    with open(tmp_path / "run_1" / "process_1.stats.json", "w") as f:
+        json.dump({"clock_probes": {"2": {"offset_ns": 10_000_000_000, "rtt_ns": 100_000, "samples": 5}}}, f)
+
+    df = parse_log_files(str(tmp_path), cache_dir=None)
+    drift = df.set_index(["Process ID", "Logical Clock"])["Drift"]
+    assert drift[(1, 1)] == 0 and drift[(1, 2)] == 1, "Drift should compare events on the corrected clocks"
+    assert df.loc[df["Process ID"] == 2, "Time NS"].min() == START_NS + 500_000_000, \
+        "Timestamps should be moved onto the clock of the lowest process ID"
+
+
+def test_statistics_by_clock_rate(tmp_path):
+    """
+    Test that compute_statistics counts each kind of event from categorical events, and reports
+    integer statistics as int64 however compactly the log data is stored.
+    """
+    os.makedirs(tmp_path / "run_1")
+    write_log(tmp_path / "run_1" / "process_1.log", 1, 1, [
+        (1.0, "Internal event", 1, 0),
+        (2.0, "Sent message to machine 2", 2, 1),
+    ])
+    write_log(tmp_path / "run_1" / "process_2.log", 2, 2, [
+        (0.5, "Internal event", 1, 0),
+        (1.5, "Processed message", 5, 0),
+    ])
+
+    df = parse_log_files(str(tmp_path), cache_dir=None)
+    assert df["Event"].dtype == "category", "Events should be parsed as categories"
+    summary_df, _ = compute_statistics(df)
+    assert summary_df.loc[1, ["Sent Events", "Processed Events", "Internal Events", "Total Events"]].tolist() == [1, 0, 1, 2]
+    assert summary_df.loc[2, ["Sent Events", "Processed Events", "Internal Events", "Total Events"]].tolist() == [0, 1, 1, 2]
+    assert summary_df.loc[1, "Max Drift"] == 3 and summary_df.loc[2, "Max Logical Clock Jump"] == 4
+    assert (summary_df.dtypes[summary_df.columns.str.startswith("Max")] == "int64").all()
+    pd.testing.assert_frame_equal(summary_df, compute_statistics(df.astype({"Event": object}))[0])
+
+
+def test_parse_archived_logs():
+    """
+    Test that logs written before nanosecond timestamps were added can still be parsed.
+    """
+    df = parse_log_files(ARCHIVED_LOGS, cache_dir=None)
+    assert sorted(df["Run"].unique()) == [1, 2, 3, 4, 5], "All runs should be parsed"
+    assert df["Drift"].notna().all(), "Every event should have a drift value"
+    assert (df["Drift"] >= 0).all(), "Drift should never be negative"
+
+
+def test_vectorized_parser_matches_line_parser(tmp_path):
+    """
+    Test that the vectorized parser produces the same DataFrame as the line-by-line parser.
+    """
+    for log_path in sorted(glob.glob(os.path.join(ARCHIVED_LOGS, "run_*", "*.log"))):
+        pd.testing.assert_frame_equal(
+            parse_log_file(log_path, 1), parse_log_file_by_line(log_path, 1))
+
+    # current format, plus a file with an unparseable line that needs the regex fallback
+    write_log(tmp_path / "process_1.log", 1, 3, [
+        (0.25, "Internal event", 1, 0),
+        (0.5, "Sent message to machine 2", 2, 0),
+        (0.75, "Processed message", 7, 2),
+    ])
+    with open(tmp_path / "process_1.log") as f:
+        lines = f.readlines()
+    with open(tmp_path / "process_2.log", "w") as f:
+        f.writelines(lines[:2] + ["not a log line\n"] + lines[2:])
+
+    for log_file in ["process_1.log", "process_2.log"]:
+        df = parse_log_file(tmp_path / log_file, 1)
+        pd.testing.assert_frame_equal(
+            df, parse_log_file_by_line(tmp_path / log_file, 1))
+        assert df["Logical Clock Jump"].tolist() == [
+            1, 1, 5], "Clock jumps should be diffed per process"
+
+
+def test_binary_conversion_round_trip(tmp_path):
+    """
+    Test that archived logs converted to the binary format and back parse to the same DataFrame.
+    """
+    convert_folder(ARCHIVED_LOGS, tmp_path / "binary", "binary")
+    convert_folder(tmp_path / "binary", tmp_path / "text", "text")
+
+    df = parse_log_files(ARCHIVED_LOGS, cache_dir=None)
+    pd.testing.assert_frame_equal(df, parse_log_files(
+        str(tmp_path / "binary"), cache_dir=None))
+    pd.testing.assert_frame_equal(df, parse_log_files(
+        str(tmp_path / "text"), cache_dir=None))
+
+
+def test_parallel_cached_parsing(tmp_path, monkeypatch):
+    """
+    Test that parsing on a process pool and from the cache gives the same DataFrame, and that
+    only new or changed log files are parsed again.
+    """
+    cache_dir = tmp_path / "cache"
+    df = parse_log_files(ARCHIVED_LOGS, cache_dir=None)
+
+    # force the process pool even for small logs
+    monkeypatch.setattr(analyze_logs, "PARALLEL_MIN_BYTES", 0)
+    pd.testing.assert_frame_equal(df, parse_log_files(
+        ARCHIVED_LOGS, cache_dir=cache_dir, workers=2))
+    assert len(os.listdir(cache_dir)) == 15, "Each log file should be cached"
+
+    # a second call is served from the cache without rewriting it
+    cached = {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(cache_dir)}
+    pd.testing.assert_frame_equal(df, parse_log_files(
+        ARCHIVED_LOGS, cache_dir=cache_dir))
+    assert cached == {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(
+        cache_dir)}, "Cached results should be reused"
+
+    # a changed log file gets a new cache entry
+    shutil.copytree(ARCHIVED_LOGS, tmp_path / "exp")
+    with open(tmp_path / "exp" / "run_1" / "process_1.log", "a") as f:
+        f.write("1> Event: Internal event | System Time: 2025-02-28 17:43:10 | Logical Clock: 999 | Queue Length: 0\n")
+    parse_log_files(str(tmp_path / "exp"), cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 30, "Copied and changed log files should be cached again"
+
+
+def test_figures_skipped_when_unchanged(tmp_path):
+    """
+    Test that figures are only rendered again when the statistics they are drawn from change,
+    or when one of them is missing.
+    """
+    summary_df, drift_df = compute_statistics(parse_log_files(ARCHIVED_LOGS, cache_dir=None))
+    figure_dir = tmp_path / "exp_1"
+    assert plot_statistics(summary_df, drift_df, figure_dir, workers=2), "New figures should be rendered"
+    assert sorted(os.listdir(figure_dir)) == sorted([analyze_logs.HASH_FILE, *FIGURES])
+
+    assert not plot_statistics(summary_df, drift_df, figure_dir), "Unchanged statistics should not be rendered again"
+    os.remove(figure_dir / "events.png")
+    assert plot_statistics(summary_df, drift_df, figure_dir), "Missing figures should be rendered again"
+    summary_df.loc[summary_df.index[0], "Max Drift"] += 1
+    assert plot_statistics(summary_df, drift_df, figure_dir), "Changed statistics should be rendered again"
+
+
+@pytest.mark.parametrize("clock_type", CLOCK_TYPES)
+@pytest.mark.parametrize("log_format", ["text", "binary"])
+def test_segmented_logs(tmp_path, monkeypatch, log_format, clock_type):
+    """
+    Test that compressed log segments parse the same as single log files, and that a window of a
+    run loaded from the segments it overlaps has the same events and drift as the whole run.
+    """
+    monkeypatch.chdir(tmp_path)
+    port_map = {"1": 5001, "2": 5002, "3": 5003}
+    os.makedirs("logs/whole/run_1")
+    os.makedirs("logs/segmented/run_1")
+    # both simulations start at the same wall clock time, so hybrid clocks match
+    monkeypatch.setattr(time, "time_ns", lambda: START_NS)
+    Simulation("whole/run_1", port_map, 6, 10, 60, 0.01, 0.005, log_format, seed=1, clock_type=clock_type).run()
+    Simulation("segmented/run_1", port_map, 6, 10, 60, 0.01, 0.005, log_format, seed=1,
+               log_options={"segment_bytes": 8192, "segment_seconds": 5, "compress": True},
+               clock_type=clock_type).run()
+    monkeypatch.undo()
+    monkeypatch.chdir(tmp_path)
+
+    whole = parse_log_files("logs/whole", cache_dir=None).drop(columns=["System Time", "Time NS"])
+    segmented = parse_log_files("logs/segmented", cache_dir=None)
+    pd.testing.assert_frame_equal(segmented.drop(columns=["System Time", "Time NS"]), whole)
+
+    window = load_time_range("logs/segmented", 1, 20, 40)
+    expected = segmented[(segmented["Elapsed Seconds"] >= 20) & (segmented["Elapsed Seconds"] < 40)]
+    assert len(window) > 0, "The window should hold events"
+    pd.testing.assert_frame_equal(window.astype({"Event": object}),
+                                  expected.reset_index(drop=True).astype({"Event": object}))
+
+    convert_folder("logs/segmented", "logs/converted", "text" if log_format == "binary" else "binary")
+    assert any(file.endswith(".00001.gz") for file in os.listdir("logs/converted/run_1")), \
+        "Converted segments should stay compressed"
+    pd.testing.assert_frame_equal(parse_log_files("logs/converted", cache_dir=None), segmented)
+    pd.testing.assert_frame_equal(load_time_range("logs/converted", 1, 20, 40), window)
+    convert_folder("logs/segmented", "logs/copied", log_format)
+    pd.testing.assert_frame_equal(parse_log_files("logs/copied", cache_dir=None), segmented)
@@ -0,0 +1,36 @@
+import asyncio
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from analyze_logs import parse_log_files
+from async_machine import run_machines
+from topology import FullMeshTopology, build_port_map
+
+
+def test_async_machines(tmp_path, monkeypatch):
+    """
+    Test that many asyncio machines can run in one process, exchanging messages and logging
+    the same events as machine processes.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+
+    port_map = build_port_map({"NUM_MACHINES": 20, "BASE_PORT": 41000})
+    machines = asyncio.run(run_machines("run_1", "localhost", port_map, 20, 3, 1.5,
+                                        topology=FullMeshTopology(list(port_map))))
+
+    df = parse_log_files("logs", cache_dir=None)
+    assert df["Process ID"].nunique() == 20, "Every machine should log events"
+    assert df["Event"].eq("Processed message").any(), "Machines should receive each other's messages"
+    for machine in machines:
+        stats = machine.scheduler.stats()
+        assert not machine.running, "Machines should stop after the timeout"
+        assert abs(stats["ticks"] - machine.clock_rate * 1.5) <= 1, "Machines should keep their clock rate"
+        assert os.path.exists(f"logs/run_1/process_{machine.id}.stats.json"), "Machines should write their stats"
+    writers = {machine.logger.writer for machine in machines}
+    assert len(writers) == 1, "Machines in one process should share a log writer thread"
+    assert not writers.pop().thread.is_alive(), "The log writer should stop with the machines"
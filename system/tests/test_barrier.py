@@ -0,0 +1,47 @@
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from barrier import StartBarrier
+
+SYSTEM_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def machine_command(machine_id):
+    """
+    Returns the command line of a stand-in machine process, which waits on the barrier and
+    exits once it is released.
+    """
+    return [sys.executable, "-c",
+            f"import sys; sys.path.insert(0, {SYSTEM_DIR!r}); from barrier import StartSignal; "
+            f"StartSignal.from_environment().wait({machine_id})"]
+
+
+def test_start_barrier_releases_ready_machines():
+    """
+    Test that the barrier waits for every machine to be ready, then releases all of them.
+    """
+    barrier = StartBarrier()
+    procs = [barrier.spawn(machine_command(machine_id)) for machine_id in (1, 2, 3)]
+    assert barrier.wait(3), "Every machine should be ready"
+    barrier.release()
+    assert [proc.wait(timeout=10) for proc in procs] == [0, 0, 0], "Released machines should run to completion"
+
+    stats = barrier.stats()
+    assert set(stats["ready_ns"]) == {"1", "2", "3"}, "The time each machine was ready should be recorded"
+    assert stats["release_ns"] >= max(stats["ready_ns"].values()), "Machines should only be released once all are ready"
+
+
+def test_start_barrier_stops_waiting_for_exited_machine():
+    """
+    Test that the barrier stops waiting if a machine process exits before it is ready.
+    """
+    barrier = StartBarrier()
+    procs = [barrier.spawn(machine_command(1)),
+             barrier.spawn([sys.executable, "-c", "raise SystemExit(1)"])]
+    assert not barrier.wait(2, timeout=10), "Waiting should fail once a machine has exited"
+    barrier.release()
+    assert procs[0].wait(timeout=10) == 0, "Ready machines should still be released"
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from clock_probe import ClockProber, estimate_offsets
+from machine import Machine
+from topology import RingTopology
+from wire import decode_probe, is_probe
+
+
+class SteppingClock:
+    def __init__(self, offset_ns):
+        """
+        Initializes a wall clock that is offset from a shared time, which every reading advances by 1 ms.
+
+        :param offset_ns: Offset of the clock, in ns
+        """
+        self.offset_ns = offset_ns
+
+    def time_ns(self):
+        SteppingClock.now_ns += 1_000_000
+        return SteppingClock.now_ns + self.offset_ns
+
+
+def test_clock_prober():
+    """
+    Test that probes measure the offset between two clocks, keeping the sample with the
+    shortest round trip, and that offsets are chained across machines.
+    """
+    SteppingClock.now_ns = 0
+    prober = ClockProber(1, SteppingClock(0))
+    peer = ClockProber(2, SteppingClock(5_000_000_000))
+
+    request = prober.request("2")
+    assert is_probe(request) and decode_probe(request)[:3] == (0, 1, 1), "Requests should carry the sender and number"
+    peer_id, reply = peer.receive(request)
+    assert peer_id == "1", "Requests should be answered to their sender"
+    assert prober.receive(reply) is None and prober.receive(reply) is None, "Replies should be recorded once"
+    stats = prober.stats()["2"]
+    assert stats["offset_ns"] == 5_000_000_000 and stats["samples"] == 1, "The offset should be measured"
+
+    probes = {"1": {"2": {"offset_ns": 5_000_000_000, "rtt_ns": 50, "samples": 1}},
+              "2": {"3": {"offset_ns": -1000, "rtt_ns": 10, "samples": 1}},
+              "3": {"1": {"offset_ns": 7, "rtt_ns": 99, "samples": 1}}}
+    assert estimate_offsets(probes) == {1: 0, 2: 5_000_000_000, 3: 4_999_999_000}, \
+        "Offsets should follow the probes with the shortest round trips"
+    assert estimate_offsets({}) == {}, "Runs without probes should have no offsets"
+
+
+def test_machines_on_loopback_hosts(tmp_path, monkeypatch):
+    """
+    Test that machines on different loopback addresses exchange messages and clock probes.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+    port_map = {"1": 42301, "2": 42302}
+    host_map = {"1": "127.0.0.1", "2": "127.0.0.2"}
+    machines = [Machine(int(machine_id), "run_1", host_map[machine_id], port_map, 6, 10, 60,
+                        topology=RingTopology(list(port_map)), host_map=host_map, probe_interval=1)
+                for machine_id in port_map]
+    try:
+        machines[0].send_message("2")
+        for machine in machines:
+            machine.send_probes()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not (machines[1].queue.qsize() and
+                                                   all(machine.prober.samples for machine in machines)):
+            time.sleep(0.01)
+        assert machines[1].queue.qsize() == 1, "Messages should reach a machine on another address"
+        for machine in machines:
+            probe = machine.stats()["clock_probes"][str(3 - machine.id)]
+            assert probe["rtt_ns"] > 0 and abs(probe["offset_ns"]) < probe["rtt_ns"] + 1_000_000, \
+                "Machines sharing a clock should measure a small offset"
+        assert machines[1].receive_stats["datagrams"] == 1, "Probes should not be counted as messages"
+    finally:
+        for machine in machines:
+            machine.shutdown()
@@ -0,0 +1,144 @@
+import gzip
+import json
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from logger import EventLogger, LogWriter, EVENT_INITIALIZED, EVENT_INTERNAL, EVENT_SENT
+from analyze_logs import read_binary_log_fields
+
+
+def test_logger_flushes_on_close(tmp_path, monkeypatch):
+    """
+    Test that all queued events are written, in order, when the logger is closed.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+
+    # Use a large batch and interval so nothing is flushed before close
+    logger = EventLogger("run_1", 1, batch_size=10000, flush_interval=60)
+    for i in range(500):
+        logger.log_event(EVENT_INTERNAL, 0, i)
+    logger.close()
+
+    with open("logs/run_1/process_1.log") as f:
+        lines = f.readlines()
+    assert len(lines) == 500, "All events should be written on close"
+    assert lines[0].startswith(
+        "1> Event: Internal event"), "Lines should be prefixed with the process ID"
+    assert "Logical Clock: 499 |" in lines[-1], "Events should be written in order"
+
+
+def test_logging_after_close(tmp_path, monkeypatch):
+    """
+    Test that events logged after a logger is closed, e.g. by a clock loop finishing its last
+    cycle, are dropped without stopping a writer shared with other loggers.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+
+    writer = LogWriter()
+    stopped, running = EventLogger("run_1", 1, writer=writer), EventLogger("run_1", 2, writer=writer)
+    stopped.log_event(EVENT_INTERNAL, 0, 1)
+    stopped.close()
+    stopped.log_event(EVENT_INTERNAL, 0, 2)
+    running.log_event(EVENT_INTERNAL, 0, 1)
+    running.close()
+    assert writer.thread.is_alive(), "The writer should keep running"
+    writer.close()
+
+    for process_id in (1, 2):
+        with open(f"logs/run_1/process_{process_id}.log") as f:
+            assert len(f.readlines()) == 1, "Only events logged before close should be written"
+
+
+def test_logger_flushes_by_interval(tmp_path, monkeypatch):
+    """
+    Test that a partial batch is flushed once the flush interval has passed.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+
+    logger = EventLogger("run_1", 2, batch_size=10000, flush_interval=0.05)
+    logger.log_event(EVENT_INTERNAL, 0, 1)
+    logger.writer.thread.join(timeout=0.5)  # give the writer time to flush
+
+    with open("logs/run_1/process_2.log") as f:
+        assert len(f.readlines()) == 1, "Partial batch should be flushed by interval"
+    logger.close()
+
+
+def test_logger_stats(tmp_path, monkeypatch):
+    """
+    Test that the logger measures time spent in log_event.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+
+    logger = EventLogger("run_1", 3)
+    for i in range(100):
+        logger.log_event(EVENT_INTERNAL, 0, i)
+    logger.close()
+
+    stats = logger.stats()
+    assert stats["calls"] == 100, "Every call should be counted"
+    assert 0 < stats["max_ns"] <= stats["total_ns"], "Max time should be bounded by total time"
+    assert stats["mean_ns"] <= stats["max_ns"], "Mean time should not exceed max time"
+
+
+def test_binary_logger(tmp_path, monkeypatch):
+    """
+    Test that the binary log format stores the same events as fixed-width records.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+
+    logger = EventLogger("run_1", 4, log_format="binary")
+    logger.log_event(EVENT_INITIALIZED, 0, 0, 12345, 3)
+    logger.log_event(EVENT_SENT, 2, 1, 2)
+    logger.log_event(EVENT_INTERNAL, 1, 2)
+    logger.close()
+
+    fields = read_binary_log_fields("logs/run_1/process_4.bin")
+    events = fields["Event Names"][fields["Event Codes"]].tolist()
+    assert events == ["Initialized on 12345 with clock rate 3", "Sent message to machine 2",
+                      "Internal event"], "Events should be stored with their arguments"
+    assert fields["Logical Clock"].tolist() == [0, 1, 2], "Logical clocks should be stored"
+    assert fields["Queue Length"].tolist() == [0, 2, 1], "Queue lengths should be stored"
+    assert (fields["Process ID"] == 4).all(), "Process ID should be stored in every record"
+    assert (fields["Time NS"][1:] >= fields["Time NS"][:-1]).all(), "Timestamps should be in order"
+
+
+def test_logger_rotates_segments(tmp_path, monkeypatch):
+    """
+    Test that a segmented log rotates by size, compresses closed segments and indexes their ranges.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+
+    logger = EventLogger("run_1", 1, segment_bytes=4096, compress=True)
+    logger.log_event(EVENT_INITIALIZED, 0, 0, 5001, 3)
+    for i in range(1, 201):
+        logger.log_event(EVENT_INTERNAL, 0, i)
+    logger.close()
+
+    with open("logs/run_1/process_1.index.jsonl") as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) > 1, "The log should be split into several segments"
+    assert sorted(os.listdir("logs/run_1")) == sorted(
+        ["process_1.index.jsonl"] + [entry["segment"] for entry in entries]), "Closed segments should be compressed"
+    assert all(entry["bytes"] <= 4096 for entry in entries), "Segments should not exceed their size"
+
+    lines = []
+    for entry in entries:
+        with gzip.open(os.path.join("logs/run_1", entry["segment"]), "rt") as f:
+            segment_lines = f.readlines()
+        assert len(segment_lines) == entry["records"], "The index should count each segment's records"
+        assert f"Logical Clock: {entry['max_clock']} |" in segment_lines[-1], "The index should hold clock ranges"
+        lines += segment_lines
+    assert len(lines) == 201 and "Logical Clock: 200 |" in lines[-1], "Every event should be written in order"
+    assert entries[0]["state"]["clock_rate"] == 3, "Segments should carry the clock rate on to the next"
+    assert entries[0]["state"]["last_clock"] == entries[0]["max_clock"], "Segments should end with their last clock"
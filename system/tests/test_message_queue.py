@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from analyze_logs import parse_log_files
+from machine import Machine
+from message_queue import MessageQueue, QUEUE_COALESCE, QUEUE_DRAIN, QUEUE_DROP_OLDEST
+from simulation import Simulation
+from topology import build_port_map, RingTopology, StarTopology
+
+
+def test_drop_oldest():
+    """
+    Test that the drop-oldest policy keeps the newest messages and counts the dropped ones.
+    """
+    queue = MessageQueue(QUEUE_DROP_OLDEST, max_length=3)
+    queue.put_many([1, 2, 3])
+    queue.put_many([4, 5])
+    assert [queue.get() for _ in range(queue.qsize())] == [3, 4, 5], "The oldest messages should be dropped"
+    assert queue.take_counts() == (2, 0), "Dropped messages should be counted"
+    assert queue.take_counts() == (0, 0), "Counts should reset once taken"
+
+
+def test_coalesce():
+    """
+    Test that the coalesce policy keeps only the highest pending clock.
+    """
+    queue = MessageQueue(QUEUE_COALESCE)
+    queue.put_many([4, 9, 2])
+    queue.put(7)
+    assert queue.qsize() == 1, "Pending messages should be merged into one"
+    assert queue.get() == 9, "The merged message should have the highest clock"
+    assert queue.take_counts() == (0, 3), "Merged messages should be counted"
+
+
+def test_queue_policies_in_simulation(tmp_path, monkeypatch):
+    """
+    Test that bounded queue policies keep a flooded star hub's queue small and log what they
+    dropped or merged, without affecting the analysis.
+    """
+    monkeypatch.chdir(tmp_path)
+    port_map = build_port_map({"NUM_MACHINES": 20})
+    topology = StarTopology(list(port_map))
+
+    for policy, max_qsize in [(QUEUE_DROP_OLDEST, 10), (QUEUE_COALESCE, 1), (QUEUE_DRAIN, None)]:
+        os.makedirs(f"logs/{policy}/run_1")
+        simulation = Simulation(f"{policy}/run_1", port_map, 6, 5, 30, seed=1, topology=topology,
+                                queue_options={"policy": policy, "max_length": 10, "drain_per_tick": 4})
+        simulation.run()
+
+        hub = simulation.machines["1"]
+        with open(f"logs/{policy}/run_1/process_1.log") as f:
+            log = f.read()
+        if max_qsize is not None:
+            assert hub.queue.max_qsize <= max_qsize, "The queue should stay within its bound"
+            assert ("Dropped" if policy == QUEUE_DROP_OLDEST else "Merged") in log, "Queue policies should log their counts"
+        else:
+            assert log.count("Processed message") > hub.clock_rate * 30, "The hub should drain several messages per tick"
+
+        df = parse_log_files(f"logs/{policy}", cache_dir=None)
+        assert not df["Event"].str.startswith(("Dropped", "Merged")).any(), "Queue policy events should not be analyzed"
+
+
+def test_drain_processes_each_message_clock(tmp_path, monkeypatch):
+    """
+    Test that the drain policy processes every message of a received batch with its own clock,
+    including several messages sent in one datagram.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+    port_map = {"1": 42311, "2": 42312}
+    sender, receiver = [Machine(int(machine_id), "run_1", "localhost", port_map, 6, 10, 60,
+                                topology=RingTopology(list(port_map)),
+                                queue_options={"policy": QUEUE_DRAIN, "drain_per_tick": 8})
+                        for machine_id in port_map]
+    try:
+        sender.send_message("2", [5, 9, 7])
+        sender.send_message("2", [3])
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and receiver.queue.qsize() < 4:
+            time.sleep(0.01)
+        assert receiver.queue.qsize() == 4, "Every message of each datagram should be queued"
+        receiver.process_message()
+        assert receiver.queue.empty(), "The drain policy should process the whole batch in one tick"
+    finally:
+        for machine in (sender, receiver):
+            machine.shutdown()
+
+    df = parse_log_files("logs", cache_dir=None)
+    processed = df[(df["Process ID"] == 2) & (df["Event"] == "Processed message")]
+    assert processed["Logical Clock"].tolist() == [6, 10, 11, 12], \
+        "Each message should advance the clock from its own timestamp"
@@ -0,0 +1,66 @@
+import os
+import socket
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from message_queue import MessageQueue
+from metrics import MachineMetrics, MetricsServer, render_metrics
+from transport import UNIX_SOCKET_DIR
+
+
+def make_metrics(machine_id, dropped=None):
+    machine = SimpleNamespace(id=machine_id, logical_clock=42, clock_rate=3, queue=MessageQueue(),
+                              dropped_datagrams=lambda: dropped or {})
+    return MachineMetrics(machine)
+
+
+def test_render_metrics():
+    """
+    Test that metrics are rendered in the Prometheus text format, with cumulative histogram buckets.
+    """
+    metrics = make_metrics(1, {"2": 5})
+    metrics.sent.inc(3)
+    for jump in (1, 1, 4, 2000):
+        metrics.clock_jump.observe(jump)
+    lines = render_metrics([metrics, make_metrics(2)]).splitlines()
+
+    assert "# TYPE lclock_messages_sent_total counter" in lines
+    assert 'lclock_messages_sent_total{machine="1"} 3' in lines
+    assert 'lclock_messages_sent_total{machine="2"} 0' in lines, "Every machine's metrics should be rendered"
+    assert 'lclock_logical_clock{machine="1"} 42' in lines, "Gauges should read the machine's current state"
+    assert 'lclock_clock_jump_bucket{machine="1",le="1"} 2' in lines
+    assert 'lclock_clock_jump_bucket{machine="1",le="5"} 3' in lines, "Histogram buckets should be cumulative"
+    assert 'lclock_clock_jump_bucket{machine="1",le="+Inf"} 4' in lines
+    assert 'lclock_clock_jump_count{machine="1"} 4' in lines
+    assert 'lclock_datagrams_send_dropped_total{machine="1",peer="2"} 5' in lines, \
+        "Labeled counters should render one line per label value"
+
+
+@pytest.mark.parametrize("address", [("localhost", 42201), os.path.join(UNIX_SOCKET_DIR, "metrics_test.sock")])
+def test_metrics_server(address):
+    """
+    Test that metrics are served at /metrics over HTTP and UNIX sockets.
+    """
+    metrics = make_metrics(1)
+    metrics.tick(2_000_000, 5)
+    server = MetricsServer([metrics], address)
+    try:
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        with socket.socket(family, socket.SOCK_STREAM) as s:
+            s.connect(address)
+            s.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+            response = b""
+            while data := s.recv(65536):
+                response += data
+    finally:
+        server.close()
+
+    assert response.startswith(b"HTTP/1.0 200")
+    assert b'lclock_ticks_total{machine="1"} 1' in response
+    assert b'lclock_tick_lateness_seconds_bucket{machine="1",le="0.005"} 1' in response
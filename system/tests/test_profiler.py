@@ -0,0 +1,38 @@
+import json
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from profiler import Profiler
+from simulation import Simulation
+
+
+def test_profiler_times_phases(tmp_path, monkeypatch):
+    """
+    Test that an instrumented machine times each phase of its ticks, and writes the aggregates to its stats.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+    simulation = Simulation("run_1", {"1": 5001, "2": 5002, "3": 5003}, 6, 10, 10, seed=1)
+    machine = simulation.machines["1"]
+    profiler = Profiler()
+    profiler.instrument(machine)
+    machine.profiler = profiler
+    simulation.run()
+
+    stats = profiler.stats()
+    ticks = stats["run"]["calls"]
+    assert ticks == 10 * machine.clock_rate, "Every tick should be timed"
+    assert stats["process_message"]["calls"] + stats["send_message"]["calls"] <= ticks
+    assert stats["sendall"]["calls"] == stats["send_message"]["calls"], "Sends should be timed through connections"
+    assert stats["log_event"]["calls"] >= ticks, "Every tick logs at least one event"
+    assert stats["queue_put_many"]["calls"] > 0 and stats["receive_batch"]["calls"] > 0, \
+        "Received messages should be timed"
+    assert stats["run"]["total_ns"] >= stats["send_message"]["total_ns"], "Phases should nest inside ticks"
+    assert "of ticks" in profiler.report()
+
+    with open("logs/run_1/process_1.stats.json") as f:
+        assert json.load(f)["profile"]["run"]["calls"] == ticks, "Phase timings should be written to the stats"
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from machine import Machine, machine_seed
+from replay import replay_run
+from topology import FullMeshTopology
+from transport import TRANSPORT_INPROCESS
+
+class ThreadStartSignal:
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties)
+
+    def wait(self, machine_id):
+        self.barrier.wait()
+
+
+# In-process machines only use their ports as names
+PORTS = {"1": 42301, "2": 42302, "3": 42303}
+CONFIG = {"PORTS": PORTS, "MAX_CLOCK_RATE": 200, "MAX_EVENT_NUM": 10, "EXPERIMENT_DURATION": 1,
+          "TOPOLOGY": "full-mesh"}
+
+
+# Machine.stop exits its timer thread with sys.exit
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_replay_matches_recorded_run(tmp_path, monkeypatch):
+    """
+    Test that replaying the traces of machines that ran concurrently reproduces their logged events,
+    clocks and queue lengths, and that seeded machines pick the same clock rates.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+    # machines connect once every machine's endpoint is open
+    signal = ThreadStartSignal(len(PORTS))
+    machines = {}
+
+    def run_machine(machine_id):
+        machine = Machine(int(machine_id), "run_1", "localhost", PORTS, CONFIG["MAX_CLOCK_RATE"],
+                          CONFIG["MAX_EVENT_NUM"], CONFIG["EXPERIMENT_DURATION"],
+                          topology=FullMeshTopology(list(PORTS)), transport=TRANSPORT_INPROCESS,
+                          start_signal=signal, seed=machine_seed(1, machine_id), trace=True)
+        machines[machine_id] = machine
+        machine.start()
+
+    threads = [threading.Thread(target=run_machine, args=(machine_id,)) for machine_id in PORTS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for thread in threading.enumerate():
+        if isinstance(thread, threading.Timer):
+            thread.join()
+
+    results = replay_run("logs/run_1", CONFIG)
+    assert [result["machine_id"] for result in results] == [1, 2, 3], "Every machine should be replayed"
+    assert all(result["matches"] for result in results), "Replays should log the recorded events"
+    for result in results:
+        # a one second run stops around its last tick
+        assert 0 < result["ticks"] <= machines[str(result["machine_id"])].clock_rate + 1, "Every tick should be traced"
+    assert os.path.exists("logs/run_1/replay/process_1.log"), "Replayed logs should be kept apart"
+
+    # a machine with the same seed picks the same clock rate
+    seeded = Machine(1, "run_1", "localhost", PORTS, CONFIG["MAX_CLOCK_RATE"], CONFIG["MAX_EVENT_NUM"], 1,
+                     topology=FullMeshTopology(list(PORTS)), transport=TRANSPORT_INPROCESS, seed=machine_seed(1, "1"))
+    seeded.shutdown()
+    assert seeded.clock_rate == machines["1"].clock_rate, "Seeded machines should be reproducible"
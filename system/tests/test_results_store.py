@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+import analyze_logs
+from analyze_logs import compute_statistics, parse_log_files
+from main import set_up_exp_folder
+from results_store import ResultsStore
+from simulation import Simulation
+
+# Port numbers are only logged in simulated runs
+PORTS = {"1": 5001, "2": 5002, "3": 5003}
+
+
+def simulate_experiment(max_clock_rate, seeds):
+    """
+    Simulates a 10 second experiment with one run per seed.
+
+    :param max_clock_rate: Maximum clock rate of the experiment
+    :param seeds: List of the seed of each run
+    :return: Path to the experiment folder
+    """
+    exp_name = set_up_exp_folder(max_clock_rate, 10, len(seeds), len(PORTS), duration=10,
+                                 seeds={run_id: seed for run_id, seed in enumerate(seeds, 1)})
+    for run_id, seed in enumerate(seeds, 1):
+        Simulation(f"{exp_name}/run_{run_id}", PORTS, max_clock_rate, 10, 10, seed=seed).run()
+    return os.path.join("logs", exp_name)
+
+
+def test_results_store(tmp_path, monkeypatch):
+    """
+    Test that ingested experiments keep their parameters, seeds, per-run summaries and events,
+    and that unchanged experiments aren't ingested again.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs")
+    slow = simulate_experiment(3, [1, 2])
+    fast = simulate_experiment(9, [3])
+
+    store = ResultsStore("results.db")
+    assert store.ingest_experiment(slow) and store.ingest_experiment(fast), "New experiments should be ingested"
+    assert not store.ingest_experiment(slow), "Unchanged experiments should be skipped"
+
+    df = parse_log_files(slow, cache_dir=None)
+    summary_df, _ = compute_statistics(df[df["Run"] == 2])
+    stored = store.query("""
+        SELECT s.clock_rate, s.max_drift, s.mean_queue_length, s.total_events, r.seed, e.max_clock_rate, e.topology
+        FROM run_summaries s JOIN runs r ON s.run_id = r.id JOIN experiments e ON r.experiment_id = e.id
+        WHERE e.path = ? AND r.run_number = 2 ORDER BY s.clock_rate
+    """, (os.path.abspath(slow),))
+    assert stored["clock_rate"].tolist() == summary_df.index.tolist(), "Each clock rate should be summarized"
+    assert stored["max_drift"].tolist() == summary_df["Max Drift"].tolist(), "Summaries should match the analysis"
+    assert stored["mean_queue_length"].tolist() == summary_df["Mean Queue Length"].tolist()
+    assert stored["total_events"].sum() == (df["Run"] == 2).sum(), "Every event should be summarized"
+    assert (stored["seed"] == 2).all() and (stored["max_clock_rate"] == 3).all() and (stored["topology"] == "ring").all(), \
+        "Runs should keep their seed and experiment parameters"
+
+    events = store.query("SELECT COUNT(*) AS events, MAX(drift) AS max_drift FROM events")
+    assert events["events"][0] == len(df) + len(parse_log_files(fast, cache_dir=None)), "Every event should be stored"
+
+    by_rate = store.summarize_by("max_clock_rate")
+    assert by_rate.index.tolist() == [3, 9] and by_rate["runs"].tolist() == [2, 1], \
+        "Runs should be grouped by their experiment's parameter"
+    assert by_rate["max_drift"][3] == df["Drift"].max()
+
+    # a changed experiment replaces its earlier results
+    Simulation(f"{os.path.basename(fast)}/run_1", PORTS, 9, 10, 10, seed=3).run()
+    assert store.ingest_experiment(fast), "Changed experiments should be ingested again"
+    assert store.query("SELECT COUNT(*) AS runs FROM runs")["runs"][0] == 3, "Earlier results should be replaced"
+
+    # so do changes to the files that correct the logs' timestamps and record the parameters
+    with open(os.path.join(fast, "run_1", "process_1.stats.json"), "w") as f:
+        json.dump({"clock_probes": {"2": {"offset_ns": 1000, "rtt_ns": 100_000, "samples": 1}}}, f)
+    assert store.ingest_experiment(fast), "Experiments with changed stats files should be ingested again"
+    with open(os.path.join(fast, "README.md"), "a") as f:
+        f.write("\n")
+    assert store.ingest_experiment(fast), "Experiments with changed READMEs should be ingested again"
+    store.close()
+
+
+def test_analyze_logs_ingests(tmp_path, monkeypatch):
+    """
+    Test that analyze_logs.py --ingest adds the experiments it analyzes to the store.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs")
+    folder_paths = [simulate_experiment(3, [1]), simulate_experiment(6, [2])]
+    monkeypatch.setattr(sys, "argv", ["analyze_logs.py", "--ingest", "--db", "results.db", "--workers", "1"] +
+                        folder_paths)
+    analyze_logs.main()
+
+    store = ResultsStore("results.db")
+    assert store.query("SELECT max_clock_rate FROM experiments ORDER BY max_clock_rate")["max_clock_rate"].tolist() \
+        == [3, 6], "Every analyzed experiment should be ingested"
+    assert not store.ingest_experiment(folder_paths[0]), "Ingested experiments should be up to date"
+    store.close()
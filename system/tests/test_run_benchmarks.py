@@ -0,0 +1,45 @@
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+from run_benchmarks import compare, merge_best, metric
+
+SETTINGS = {"duration": 1.0}
+
+
+def results(**values):
+    return {"settings": SETTINGS, "benchmarks": values}
+
+
+def test_compare():
+    """
+    Test that only gated results that got worse by more than the tolerance are regressions, in
+    the direction each result improves.
+    """
+    baseline = results(latency=metric(100, "us", False), throughput=metric(1000, "lines/s", True),
+                       tail=metric(100, "us", False, gated=False), zero=metric(0, "ticks/s", True))
+    assert compare(results(latency=metric(119, "us", False), throughput=metric(810, "lines/s", True),
+                           tail=metric(500, "us", False, gated=False), zero=metric(0, "ticks/s", True)),
+                   baseline, 0.2) == [], "Changes within the tolerance and ungated results should pass"
+    assert compare(results(latency=metric(50, "us", False), throughput=metric(5000, "lines/s", True)),
+                   baseline, 0.2) == [], "Improvements should pass"
+    assert compare(results(latency=metric(121, "us", False), throughput=metric(790, "lines/s", True)),
+                   baseline, 0.2) == ["latency", "throughput"], "Changes beyond the tolerance should regress"
+    assert compare(results(new=metric(1, "us", False)), baseline, 0.2) == [], \
+        "Results missing from the baseline should be skipped"
+
+
+def test_merge_best():
+    """
+    Test that measuring benchmarks again keeps the better result of each.
+    """
+    benchmarks = {"latency": metric(100, "us", False), "throughput": metric(1000, "lines/s", True)}
+    merge_best(benchmarks, {"latency": metric(90, "us", False), "throughput": metric(900, "lines/s", True),
+                            "new": metric(1, "us", False)})
+    assert {name: result["value"] for name, result in benchmarks.items()} == \
+        {"latency": 90, "throughput": 1000, "new": 1}, "The better measurement of each benchmark should be kept"
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from scheduler import TickScheduler, OVERRUN_CATCH_UP, OVERRUN_SKIP
+
+
+class FakeClock:
+    """
+    Clock where sleeping (and running ticks) only advances virtual time.
+    """
+
+    def __init__(self):
+        self.now_ns = 0
+
+    def monotonic_ns(self):
+        return self.now_ns
+
+    def sleep(self, seconds):
+        self.now_ns += int(seconds * 1_000_000_000)
+
+    def work(self, milliseconds):
+        self.now_ns += milliseconds * 1_000_000
+
+
+def test_scheduler_keeps_rate():
+    """
+    Test that time spent running a tick is not added to the period.
+    """
+    clock = FakeClock()
+    scheduler = TickScheduler(10, clock=clock)
+    for _ in range(50):
+        assert scheduler.wait() == 0, "Ticks should start on their deadline"
+        clock.work(60)  # each tick takes 60% of the period
+
+    stats = scheduler.stats()
+    assert clock.now_ns == 50 * 100_000_000 + 60_000_000, "Ticks should be 100 ms apart"
+    assert stats["ticks"] == 50 and stats["overruns"] == 0, "No tick should overrun"
+
+
+@pytest.mark.parametrize("policy, ticks, skipped", [(OVERRUN_CATCH_UP, 10, 0), (OVERRUN_SKIP, 9, 1)])
+def test_scheduler_overruns(policy, ticks, skipped):
+    """
+    Test that ticks missed during a long tick are run back to back or skipped, depending on policy.
+    """
+    clock = FakeClock()
+    scheduler = TickScheduler(10, policy, clock=clock)
+    lateness = []
+    while clock.now_ns < 1_000_000_000:
+        lateness.append(scheduler.wait())
+        clock.work(250 if len(lateness) == 3 else 10)  # tick 3 overruns by 1.5 periods
+
+    stats = scheduler.stats()
+    assert stats["ticks"] == ticks, "Missed ticks should be caught up or skipped"
+    assert stats["skipped_ticks"] == skipped, "Skipped ticks should be counted"
+    assert lateness[3] == (150_000_000 if policy == OVERRUN_CATCH_UP else 50_000_000), \
+        "The tick after the overrun should be late"
+    assert stats["overruns"] == (1 if policy == OVERRUN_CATCH_UP else 0), "Overruns should be counted"
+    assert lateness[-1] == 0, "The scheduler should get back on schedule"
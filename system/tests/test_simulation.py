@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from analyze_logs import parse_log_files
+from logical_clocks import CLOCK_HYBRID, CLOCK_TYPES
+from simulation import Simulation
+
+# Port numbers are only logged in simulated runs
+PORTS = {"1": 5001, "2": 5002, "3": 5003}
+
+
+def simulate(seed, latency=0.0, jitter=0.0, clock_type="lamport"):
+    """
+    Runs a seeded 10 second simulation in run_1 and parses its logs.
+
+    :param seed: Random seed for the run
+    :param latency: Network latency in seconds
+    :param jitter: Maximum extra random network latency in seconds
+    :param clock_type: Type of logical clock of the machines (default: "lamport")
+    :return: Tuple of (Simulation, parsed DataFrame of the run)
+    """
+    os.makedirs("logs/run_1", exist_ok=True)
+    for log_file in os.listdir("logs/run_1"):
+        os.remove(os.path.join("logs/run_1", log_file))
+    simulation = Simulation("run_1", PORTS, 6, 10, 10, latency, jitter, seed=seed, clock_type=clock_type)
+    simulation.run()
+    return simulation, parse_log_files("logs", cache_dir=None)
+
+
+def test_simulation_logs(tmp_path, monkeypatch):
+    """
+    Test that a simulated run writes logs analyze_logs can parse, with one event per clock tick.
+    """
+    monkeypatch.chdir(tmp_path)
+    simulation, df = simulate(seed=1, latency=0.01, jitter=0.01)
+
+    assert sorted(df["Process ID"].unique()) == [1, 2, 3], "Every machine should log events"
+    for process_id, events in df.groupby("Process ID"):
+        clock_rate = simulation.machines[str(process_id)].clock_rate
+        # each tick logs one event, except sends to both machines, which log two
+        assert clock_rate * 10 <= len(events) <= clock_rate * 10 * 2, "Machines should tick at their clock rate"
+    assert (df["Elapsed Seconds"] <= 10).all(), "Events should happen in virtual time"
+    assert df["Event"].eq("Processed message").any(), "Messages should be delivered"
+
+
+def test_simulation_is_reproducible(tmp_path, monkeypatch):
+    """
+    Test that simulated runs with the same seed log the same events.
+    """
+    monkeypatch.chdir(tmp_path)
+    columns = ["Process ID", "Event", "Logical Clock", "Queue Length", "Elapsed Seconds"]
+    first = simulate(seed=2, latency=0.01, jitter=0.05)[1][columns]
+    second = simulate(seed=2, latency=0.01, jitter=0.05)[1][columns]
+    assert first.equals(second), "Runs with the same seed should be identical"
+
+
+@pytest.mark.parametrize("clock_type", CLOCK_TYPES)
+def test_simulation_clock_types(tmp_path, monkeypatch, clock_type):
+    """
+    Test that runs with every clock type write logs analyze_logs can parse, with hybrid clocks
+    analyzed in milliseconds of drift.
+    """
+    monkeypatch.chdir(tmp_path)
+    simulation, df = simulate(seed=3, latency=0.01, clock_type=clock_type)
+
+    assert df["Event"].eq("Processed message").any(), "Messages should be delivered"
+    assert (df.groupby("Process ID")["Logical Clock Jump"].min() >= 0).all(), "Logical clocks should never go back"
+    if clock_type == CLOCK_HYBRID:
+        # hybrid clocks are parsed as physical milliseconds, which stay close to the run's time
+        assert df["Logical Clock"].max() - df["Logical Clock"].min() <= 11_000, \
+            "Hybrid clocks should be parsed in milliseconds"
+        assert df["Logical Clock Jump"].max() <= 2_000, "Hybrid clocks should start at the run's physical time"
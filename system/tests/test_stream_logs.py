@@ -0,0 +1,151 @@
+import gzip
+import itertools
+import json
+import os
+import shutil
+import sys
+
+import pandas as pd
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+from analyze_logs import compute_statistics, parse_log_files, read_log_index
+from logger import COMPRESSED_SUFFIX, INDEX_SUFFIX
+from simulation import Simulation
+from stream_logs import StreamingAnalyzer
+from synthetic_logs import write_synthetic_run
+
+# Archived experiment logs (second-resolution timestamps)
+ARCHIVED_LOGS = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'logs', 'exp_1'))
+
+
+def expected_summary(folder_path):
+    summary_df, _ = compute_statistics(parse_log_files(folder_path, cache_dir=None))
+    return summary_df
+
+
+def test_streaming_matches_batch_analysis():
+    """
+    Test that reading finished logs in one go gives the same statistics as compute_statistics.
+    """
+    analyzer = StreamingAnalyzer(ARCHIVED_LOGS)
+    analyzer.poll(final=True)
+    pd.testing.assert_frame_equal(analyzer.summary(), expected_summary(ARCHIVED_LOGS),
+                                  check_dtype=False, check_names=False)
+
+
+@pytest.mark.parametrize("log_format", ["text", "binary"])
+def test_streaming_follows_growing_logs(tmp_path, log_format):
+    """
+    Test that following logs while they are written, including partially written lines, gives
+    the same statistics as analyzing the finished logs.
+    """
+    source = tmp_path / "source"
+    write_synthetic_run(str(source / "run_1"), 6000, log_format=log_format)
+    live = tmp_path / "live"
+    (live / "run_1").mkdir(parents=True)
+
+    contents = {name: (source / "run_1" / name).read_bytes() for name in os.listdir(source / "run_1")}
+    analyzer = StreamingAnalyzer(str(live))
+    # append each file in uneven chunks that cut lines and records in half, polling in between
+    for start in range(0, max(len(data) for data in contents.values()), 7919):
+        for name, data in contents.items():
+            with open(live / "run_1" / name, "ab") as f:
+                f.write(data[start:start + 7919])
+        analyzer.poll()
+    analyzer.poll(final=True)
+    assert not any(process.pending for process in analyzer.runs["run_1"].values()), \
+        "Every event should be counted after the final poll"
+
+    pd.testing.assert_frame_equal(analyzer.summary(), expected_summary(str(source)),
+                                  check_dtype=False, check_names=False)
+
+
+class ManualClock:
+    def __init__(self):
+        """
+        Initializes a monotonic clock that only moves when the test advances it.
+        """
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_streaming_releases_stale_processes(tmp_path):
+    """
+    Test that a process that dies without logging that it stopped only holds back the other
+    processes' events until it has been silent for the stale time.
+    """
+    source = tmp_path / "source"
+    write_synthetic_run(str(source / "run_1"), 6000)
+    live = tmp_path / "live"
+    (live / "run_1").mkdir(parents=True)
+    with open(source / "run_1" / "process_3.log") as f:
+        lines = f.readlines()
+    with open(live / "run_1" / "process_3.log", "w") as f:
+        f.writelines(lines[:20])
+    contents = {name: (source / "run_1" / name).read_bytes() for name in ("process_1.log", "process_2.log")}
+
+    clock = ManualClock()
+    analyzer = StreamingAnalyzer(str(live), stale_seconds=5, clock=clock)
+    for half in (0, 1):
+        for name, data in contents.items():
+            with open(live / "run_1" / name, "ab") as f:
+                f.write(data[half * len(data) // 2:(half + 1) * len(data) // 2])
+        analyzer.poll()
+        clock.now += 10
+    processes = analyzer.runs["run_1"]
+    held_back = min(processes[str(live / "run_1" / f"process_{i}.log")].last_time_ns for i in (1, 2))
+    assert all(event[0] >= held_back for process in processes.values() for event in process.pending), \
+        "Events should only be held back for the processes that are still logging"
+
+    analyzer.poll(final=True)
+    pd.testing.assert_frame_equal(analyzer.summary(), expected_summary(str(live)),
+                                  check_dtype=False, check_names=False)
+
+
+@pytest.mark.parametrize("log_format", ["text", "binary"])
+def test_streaming_follows_segmented_logs(tmp_path, monkeypatch, log_format):
+    """
+    Test that following segmented logs while they are written, as each segment grows, is
+    compressed and added to the index, gives the same statistics as analyzing the finished logs.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/source/run_1")
+    os.makedirs("logs/live/run_1")
+    Simulation("source/run_1", {"1": 5001, "2": 5002, "3": 5003}, 6, 10, 60, 0.01, 0.005, log_format, seed=1,
+               log_options={"segment_bytes": 8192, "compress": True}).run()
+
+    def write_segments(index_name):
+        # replay how the logger writes a process's segments, one step per poll
+        for entry in read_log_index(os.path.join("logs/source/run_1", index_name)):
+            name = entry["segment"].removesuffix(COMPRESSED_SUFFIX)
+            with gzip.open(os.path.join("logs/source/run_1", entry["segment"])) as f:
+                data = f.read()
+            for start in range(0, len(data), 3001):
+                with open(os.path.join("logs/live/run_1", name), "ab") as f:
+                    f.write(data[start:start + 3001])
+                yield
+            shutil.copy(os.path.join("logs/source/run_1", entry["segment"]), "logs/live/run_1")
+            os.remove(os.path.join("logs/live/run_1", name))
+            with open(os.path.join("logs/live/run_1", index_name), "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            yield
+
+    analyzer = StreamingAnalyzer("logs/live")
+    writers = [write_segments(name) for name in os.listdir("logs/source/run_1") if name.endswith(INDEX_SUFFIX)]
+    assert len(writers) == 3
+    for _ in itertools.zip_longest(*writers):
+        analyzer.poll()
+    analyzer.poll(final=True)
+    assert analyzer.events > 0 and not any(process.pending for process in analyzer.runs["run_1"].values())
+
+    pd.testing.assert_frame_equal(analyzer.summary(), expected_summary("logs/source"),
+                                  check_dtype=False, check_names=False)
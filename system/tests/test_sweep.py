@@ -0,0 +1,56 @@
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from analyze_logs import parse_log_files
+from metrics import METRICS_HTTP, build_metrics_address
+from sweep import build_slot_config, plan_sweep, simulate_sweep
+from topology import build_host_map, build_port_map
+
+CONFIG = {"PORTS": {"1": 5001, "2": 5002, "3": 5003},
+          "MAX_CLOCK_RATE": 6, "MAX_EVENT_NUM": 10, "EXPERIMENT_DURATION": 60}
+
+
+def test_sweep_experiment_folders(tmp_path, monkeypatch):
+    """
+    Test that a sweep gets one experiment folder per parameter combination, without deleting
+    earlier experiments.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/exp_1/run_1")
+
+    runs = plan_sweep(CONFIG, [2, 6], [10], [5], [1, 2])
+    assert sorted(os.listdir("logs")) == [
+        "exp_1", "exp_2", "exp_3", "exp_4", "exp_5"], "Each combination should get a new experiment folder"
+    assert os.path.isdir("logs/exp_1/run_1"), "Earlier experiments should be kept"
+    assert len(runs) == 6, "Each experiment should have its number of runs"
+
+    simulate_sweep(runs, workers=2)
+    with open("logs/exp_5/README.md") as f:
+        readme = f.read()
+    assert "- **Max Clock Rate:** 6" in readme, "Experiment parameters should be recorded"
+    assert f"- **Run 2:** {runs[-1][2]['SEED']} (machine 1: " in readme, "Each run's seeds should be recorded"
+    df = parse_log_files("logs/exp_5", cache_dir=None)
+    assert sorted(df["Run"].unique()) == [1, 2], "Every run should be logged"
+    assert df["Clock Rate"].max() <= 6, "Runs should use their experiment's parameters"
+    assert df["Elapsed Seconds"].max() <= 5, "Runs should use their experiment's duration"
+
+
+def test_slot_config_ports_and_hosts():
+    """
+    Test that runs in different worker slots keep their machines' hosts, and that no metrics
+    port is another slot's machine port.
+    """
+    config = dict(CONFIG, HOST="127.0.0.1", METRICS=METRICS_HTTP, METRICS_PORT_OFFSET=1,
+                  PORTS={"1": "127.0.0.2:5001", "2": 5002, "3": "127.0.0.3:5003"})
+    slot_configs = [build_slot_config(config, slot, 4) for slot in range(4)]
+    machine_ports = [port for slot_config in slot_configs for port in build_port_map(slot_config).values()]
+    metrics_ports = [build_metrics_address(slot_config, port)[1]
+                     for slot_config in slot_configs for port in build_port_map(slot_config).values()]
+    assert len(set(machine_ports)) == 12, "Each slot should have its own ports"
+    assert not set(machine_ports) & set(metrics_ports), "Metrics ports should be outside every slot's ports"
+    assert build_host_map(slot_configs[2]) == {"1": "127.0.0.2", "2": "127.0.0.1", "3": "127.0.0.3"}, \
+        "Machines should keep their hosts"
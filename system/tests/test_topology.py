@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from topology import FullMeshTopology, RandomKTopology, RingTopology, StarTopology, build_host_map, build_port_map
+
+MACHINE_IDS = [str(i + 1) for i in range(30)]
+
+
+def test_ring_matches_original_machines():
+    """
+    Test that a ring of 3 machines sends events to the same machines as the original 3-machine setup.
+    """
+    topology = RingTopology(["1", "2", "3"])
+    next = [None, "2", "3", "1"]
+    prev = [None, "3", "1", "2"]
+    for machine_id in range(1, 4):
+        assert topology.recipients(str(machine_id), 1) == [next[machine_id]], "Event 1 should send to the next machine"
+        assert topology.recipients(str(machine_id), 2) == [prev[machine_id]], "Event 2 should send to the previous machine"
+        assert topology.recipients(str(machine_id), 3) == [next[machine_id], prev[machine_id]], "Event 3 should send to both"
+        assert topology.recipients(str(machine_id), 4) == [], "Other events should be internal"
+
+
+def test_topology_peers():
+    """
+    Test the peers of each topology with 30 machines.
+    """
+    assert RingTopology(MACHINE_IDS).peers("30") == ["1", "29"], "Rings should wrap around in ID order"
+    assert len(FullMeshTopology(MACHINE_IDS).peers("5")) == 29, "A full mesh should connect every machine"
+
+    star = StarTopology(MACHINE_IDS)
+    assert star.peers("1") == MACHINE_IDS[1:], "The hub should connect to every machine"
+    assert star.peers("7") == ["1"], "Other machines should only connect to the hub"
+    assert star.recipients("7", 2) == ["1"], "Other machines should send to the hub"
+
+    random_k = RandomKTopology(MACHINE_IDS, k=4, seed=3)
+    assert all(len(random_k.peers(machine_id)) == 4 and machine_id not in random_k.peers(machine_id)
+               for machine_id in MACHINE_IDS), "Each machine should have k other peers"
+    assert random_k.peer_map == RandomKTopology(
+        MACHINE_IDS, k=4, seed=3).peer_map, "Every process should build the same random topology"
+
+
+def test_build_port_map():
+    """
+    Test that ports are generated for NUM_MACHINES machines, and PORTS is used otherwise.
+    """
+    ports = build_port_map({"NUM_MACHINES": 300, "BASE_PORT": 30000})
+    assert len(ports) == 300 and ports["1"] == 30000 and ports["300"] == 30299, "Ports should be consecutive"
+    assert build_port_map({"PORTS": {"1": 5001}}) == {"1": 5001}, "PORTS should be used without NUM_MACHINES"
+
+
+def test_build_host_map():
+    """
+    Test that machines run on their own "host:port" address from PORTS, or on HOST, and that
+    NUM_MACHINES machines are assigned to HOSTS in turn.
+    """
+    config = {"HOST": "localhost", "PORTS": {"1": 5001, "2": "127.0.0.2:5002", "3": "127.0.0.3:5003"}}
+    assert build_port_map(config) == {"1": 5001, "2": 5002, "3": 5003}, "Ports should be split from hosts"
+    assert build_host_map(config) == {"1": "localhost", "2": "127.0.0.2", "3": "127.0.0.3"}, \
+        "Machines should run on their own hosts"
+    hosts = build_host_map({"NUM_MACHINES": 5, "HOSTS": ["127.0.0.1", "127.0.0.2"]})
+    assert list(hosts.values()) == ["127.0.0.1", "127.0.0.2"] * 2 + ["127.0.0.1"], "Hosts should be used in turn"
+    with pytest.raises(ValueError):
+        build_port_map({"PORTS": {"1": "127.0.0.1:5001", "2": "127.0.0.2:5001"}})
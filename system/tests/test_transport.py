@@ -0,0 +1,94 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from logical_clocks import CLOCK_LAMPORT, CLOCK_VECTOR
+from machine import Machine
+from main import check_run_transport
+from metrics import render_metrics
+from transport import TRANSPORT_INPROCESS, TRANSPORT_SHM, TRANSPORTS, SharedMemoryTransport, build_transport, \
+    check_transport
+from wire import encode_message
+
+
+@pytest.mark.parametrize("name", list(TRANSPORTS))
+def test_transport_round_trip(name):
+    """
+    Test that each transport delivers datagrams from several senders, in order per sender.
+    """
+    receiver = build_transport(name, "localhost", 42101)
+    senders = [build_transport(name, "localhost", port) for port in (42102, 42103)]
+    receiver.open([42102, 42103])
+    for sender in senders:
+        sender.open([])
+
+    connections = [sender.connect(42101) for sender in senders]
+    for sequence in range(1, 4):
+        for sender_id, connection in enumerate(connections, start=2):
+            connection.sendall(encode_message(sender_id, sequence, [sequence * 10]))
+
+    datagrams = []
+    while len(datagrams) < 6:
+        datagrams += receiver.receive()
+    for sender_id in (2, 3):
+        assert [data for data in datagrams if data[2] == sender_id] == [
+            encode_message(sender_id, sequence, [sequence * 10]) for sequence in range(1, 4)
+        ], "Datagrams from each sender should arrive in order"
+
+    for connection in connections:
+        connection.close()
+    for transport in senders + [receiver]:
+        transport.close()
+    assert receiver.receive() is None, "Receiving on a closed transport should return None"
+
+
+def test_shm_rejects_vector_clocks(tmp_path):
+    """
+    Test that machines using vector clocks can't be built with the shared-memory transport.
+    """
+    check_transport(TRANSPORT_SHM, CLOCK_LAMPORT)
+    with pytest.raises(ValueError):
+        check_transport(TRANSPORT_SHM, CLOCK_VECTOR)
+    with pytest.raises(ValueError):
+        Machine(1, str(tmp_path), "localhost", {"1": 42111, "2": 42112}, 6, 10, 60,
+                transport=TRANSPORT_SHM, clock_type=CLOCK_VECTOR)
+
+
+def test_shm_reports_dropped_datagrams(tmp_path, monkeypatch):
+    """
+    Test that datagrams dropped because a ring buffer is full are reported per connection, in
+    the machine's stats and metrics.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+    port_map = {"1": 42131, "2": 42132}
+    receiver = SharedMemoryTransport("localhost", port_map["2"], slots=2)
+    receiver.open([port_map["1"]])
+    machine = Machine(1, "run_1", "localhost", port_map, 6, 10, 60, transport=TRANSPORT_SHM)
+    try:
+        for _ in range(5):
+            machine.send_message("2")
+        assert machine.stats()["send"]["dropped"] == {"2": 3}, "Datagrams that don't fit the ring should be counted"
+        assert 'lclock_datagrams_send_dropped_total{machine="1",peer="2"} 3' in \
+            render_metrics([machine.metrics]).splitlines(), "Dropped datagrams should be served as metrics"
+    finally:
+        machine.shutdown()
+        receiver.close()
+    assert machine.stats()["send"]["dropped"] == {"2": 3}, "Dropped datagrams should be kept after shutdown"
+
+
+def test_inprocess_rejected_for_machine_processes():
+    """
+    Test that the in-process transport is only allowed for machines sharing a process.
+    """
+    check_transport(TRANSPORT_INPROCESS)
+    with pytest.raises(ValueError):
+        check_transport(TRANSPORT_INPROCESS, separate_processes=True)
+    with pytest.raises(ValueError):
+        check_run_transport({"TRANSPORT": TRANSPORT_INPROCESS})
+    check_run_transport({"TRANSPORT": TRANSPORT_INPROCESS, "ASYNC_MACHINES": True})
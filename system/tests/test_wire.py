@@ -0,0 +1,94 @@
+import os
+import struct
+import sys
+import time
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from logical_clocks import CLOCK_HYBRID, CLOCK_LAMPORT, CLOCK_VECTOR, HYBRID_COUNTER_BITS, build_logical_clock
+from simulation import Simulation
+from wire import decode_message, encode_message
+
+
+def test_wire_format_round_trip():
+    """
+    Test that datagrams carry several clocks with the sender ID and sequence number, and that
+    datagrams in the original 4-byte format can still be decoded.
+    """
+    data = encode_message(7, 42, [1, 2 ** 40, 3])
+    assert len(data) == 8 + 3 * 8, "Datagrams should have an 8-byte header and 8 bytes per clock"
+    assert decode_message(data) == (7, 42, [1, 2 ** 40, 3]), "Datagrams should round trip"
+    assert decode_message(struct.pack('i', 99)) == (None, None, [99]), "4-byte messages should be decoded"
+
+    with pytest.raises(ValueError):
+        decode_message(data[:-1])
+    with pytest.raises(ValueError):
+        decode_message(bytes([2]) + data[1:])
+
+
+def test_receive_batch(tmp_path, monkeypatch):
+    """
+    Test that a batch of datagrams is queued in order, and that sequence gaps are counted.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("logs/run_1")
+    machine = Simulation("run_1", {"1": 5001, "2": 5002, "3": 5003}, 6, 10, 1).machines["1"]
+
+    machine.receive_batch([encode_message(2, 1, [5]), encode_message(2, 2, [6, 7]),
+                           encode_message(3, 1, [1]), encode_message(2, 5, [8])])
+    assert [machine.queue.get() for _ in range(machine.queue.qsize())] == [
+        5, 6, 7, 1, 8], "Messages should be queued in the order they were received"
+    assert machine.receive_stats == {"datagrams": 4, "messages": 5, "batches": 1, "lost": 2, "reordered": 0}, \
+        "Datagrams, messages and lost datagrams should be counted"
+
+
+def test_clock_typed_wire_format():
+    """
+    Test that vector and hybrid timestamps round trip, that vector timestamps are encoded
+    compactly, and that datagrams from machines with another clock type are rejected.
+    """
+    machine_ids = [str(machine_id) for machine_id in range(1, 101)]
+    vector = build_logical_clock(CLOCK_VECTOR, "3", machine_ids)
+    for _ in range(5):
+        vector.tick()
+    vector.receive(tuple(range(100)))
+    timestamps = [vector.timestamp()] * 3
+    data = encode_message(3, 9, timestamps, vector)
+    assert decode_message(data, vector) == (3, 9, timestamps), "Vector timestamps should round trip"
+    assert len(data) < 100 * 3, "Vector timestamps should take less than one byte per entry"
+
+    hybrid = build_logical_clock(CLOCK_HYBRID, "1", machine_ids)
+    hybrid.tick()
+    hybrid.receive(hybrid.timestamp() + (5 << HYBRID_COUNTER_BITS))
+    data = encode_message(1, 1, [hybrid.timestamp()], hybrid)
+    assert decode_message(data, hybrid) == (1, 1, [hybrid.timestamp()]), "Hybrid timestamps should round trip"
+
+    with pytest.raises(ValueError):
+        decode_message(data, vector)
+    with pytest.raises(ValueError):
+        decode_message(data, build_logical_clock(CLOCK_LAMPORT, "1", machine_ids))
+
+
+def test_logical_clocks():
+    """
+    Test that every clock type orders a send before its receipt, and that hybrid clocks stay
+    close to physical time.
+    """
+    machine_ids = ["1", "2"]
+    for clock_type in (CLOCK_LAMPORT, CLOCK_VECTOR, CLOCK_HYBRID):
+        sender, receiver = (build_logical_clock(clock_type, machine_id, machine_ids) for machine_id in machine_ids)
+        for _ in range(10):
+            sender.tick()
+        receiver.receive(sender.timestamp())
+        assert receiver.value > sender.value, f"{clock_type} clocks should advance past received timestamps"
+    assert receiver.physical_ms == time.time_ns() // 1_000_000 or receiver.counter == 0, \
+        "Hybrid clocks should follow physical time"
+
+    vector = build_logical_clock(CLOCK_VECTOR, "1", ["1", "2", "3"])
+    assert vector.merge([(1, 5, 0), (2, 0, 1)]) == (2, 5, 1), "Vector merges should take the maximum of each entry"
+    vector.receive((2, 5, 1))
+    assert vector.timestamp() == (3, 5, 1) and vector.value == 9, "Vector clocks should log the sum of their entries"
@@ -0,0 +1,229 @@
+import random
+
+# Port of machine 1 when ports are generated from NUM_MACHINES (machine i gets BASE_PORT + i - 1)
+DEFAULT_BASE_PORT = 20000
+# Number of peers of each machine in the random-k topology
+DEFAULT_RANDOM_K = 2
+# Hostname of machines whose PORTS entry is only a port number, when HOST isn't set
+DEFAULT_HOST = "localhost"
+
+
+class Topology:
+    def __init__(self, machine_ids):
+        """
+        Initializes a communication topology, which decides which machines each machine can send
+        messages to, and which machines each event sends to.
+
+        On each clock cycle without queued messages, a machine draws an event number between 1
+        and MAX_EVENT_NUM and asks its topology for the recipients of that event; events with
+        no recipients are internal events.
+
+        :param machine_ids: IDs of all machines, as strings
+        """
+        # sort numerically, so neighbours are machines with adjacent IDs
+        self.machine_ids = sorted(machine_ids, key=int)
+        self.peer_map = {machine_id: self.build_peers(machine_id)
+                         for machine_id in self.machine_ids}
+
+    def build_peers(self, machine_id):
+        """
+        Returns the machines that a machine can send messages to.
+
+        :param machine_id: ID of the machine
+        :return: List of peer machine IDs
+        """
+        raise NotImplementedError
+
+    def peers(self, machine_id):
+        """
+        Returns the machines that a machine can send messages to.
+
+        :param machine_id: ID of the machine
+        :return: List of peer machine IDs
+        """
+        return self.peer_map[machine_id]
+
+    def recipients(self, machine_id, event, rng=random):
+        """
+        Returns the recipients of an event (default: events 1 and 2 send to one random peer
+        and event 3 sends to every peer).
+
+        :param machine_id: ID of the machine
+        :param event: Event number between 1 and MAX_EVENT_NUM
+        :param rng: Random number generator choosing random peers, e.g. the machine's seeded one (default: the random
+            module)
+        :return: List of recipient machine IDs (empty for internal events)
+        """
+        peers = self.peers(machine_id)
+        if not peers:
+            return []
+        if event in (1, 2):
+            return [rng.choice(peers)]
+        if event == 3:
+            return list(peers)
+        return []
+
+
+class RingTopology(Topology):
+    def build_peers(self, machine_id):
+        """
+        Returns the next and previous machine in ID order (wrapping around).
+
+        With 3 machines, this is the original 3-machine setup.
+        """
+        index = self.machine_ids.index(machine_id)
+        num_machines = len(self.machine_ids)
+        next_id = self.machine_ids[(index + 1) % num_machines]
+        prev_id = self.machine_ids[index - 1]
+        if next_id == machine_id:
+            return []  # a single machine has no peers
+        if next_id == prev_id:
+            return [next_id]
+        return [next_id, prev_id]
+
+    def recipients(self, machine_id, event, rng=random):
+        """
+        Returns the recipients of an event: event 1 sends to the next machine, event 2 to the
+        previous machine and event 3 to both.
+        """
+        peers = self.peers(machine_id)
+        if not peers:
+            return []
+        if event == 1:
+            return [peers[0]]
+        if event == 2:
+            return [peers[-1]]  # same as the next machine if there are only 2 machines
+        if event == 3:
+            return list(peers)
+        return []
+
+
+class FullMeshTopology(Topology):
+    def build_peers(self, machine_id):
+        """
+        Returns every other machine.
+        """
+        return [peer for peer in self.machine_ids if peer != machine_id]
+
+
+class RandomKTopology(Topology):
+    def __init__(self, machine_ids, k=DEFAULT_RANDOM_K, seed=0):
+        """
+        Initializes a topology where each machine sends to k randomly chosen machines.
+
+        Peers are directed (a machine may receive from machines it doesn't send to) and are
+        drawn from their own seeded generator, so every process builds the same topology.
+
+        :param machine_ids: IDs of all machines, as strings
+        :param k: Number of peers per machine (default: DEFAULT_RANDOM_K)
+        :param seed: Seed for choosing peers (default: 0)
+        """
+        self.k = k
+        self.rng = random.Random(seed)
+        super().__init__(machine_ids)
+
+    def build_peers(self, machine_id):
+        """
+        Returns k random other machines.
+        """
+        others = [peer for peer in self.machine_ids if peer != machine_id]
+        return sorted(self.rng.sample(others, min(self.k, len(others))), key=int)
+
+
+class StarTopology(Topology):
+    def build_peers(self, machine_id):
+        """
+        Returns every other machine for the hub (the machine with the lowest ID), and only the
+        hub for every other machine.
+        """
+        hub = self.machine_ids[0]
+        if machine_id == hub:
+            return self.machine_ids[1:]
+        return [hub]
+
+    def recipients(self, machine_id, event, rng=random):
+        """
+        Returns the recipients of an event: the hub sends to one random machine on events 1 and 2
+        and to every machine on event 3, and other machines send to the hub on events 1 to 3.
+        """
+        if machine_id != self.machine_ids[0] and event in (1, 2, 3):
+            return list(self.peers(machine_id))
+        return super().recipients(machine_id, event, rng)
+
+
+# Topologies selectable with TOPOLOGY in config.json
+TOPOLOGIES = {
+    "ring": RingTopology,
+    "full-mesh": FullMeshTopology,
+    "random-k": RandomKTopology,
+    "star": StarTopology,
+}
+
+
+def parse_address(address, default_host):
+    """
+    Splits an entry of PORTS into a hostname and a port number.
+
+    :param address: Port number, or "host:port" string (e.g. "127.0.0.2:12345")
+    :param default_host: Hostname of entries that are only a port number
+    :return: Tuple of (hostname, port number)
+    """
+    if isinstance(address, str) and ":" in address:
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    return default_host, int(address)
+
+
+def build_port_map(config):
+    """
+    Returns the port number of each machine.
+
+    If NUM_MACHINES is set in the config, ports are numbered consecutively from BASE_PORT;
+    otherwise the PORTS dictionary is used. Transports address machines by port, so ports must
+    be unique even when machines have different hosts.
+
+    :param config: Configuration dictionary
+    :return: Dictionary of port numbers for each machine
+    """
+    if "NUM_MACHINES" not in config:
+        port_map = {machine_id: parse_address(address, None)[1] for machine_id, address in config["PORTS"].items()}
+        if len(set(port_map.values())) != len(port_map):
+            raise ValueError("Every machine in PORTS needs its own port number")
+        return port_map
+    base_port = config.get("BASE_PORT", DEFAULT_BASE_PORT)
+    return {str(i + 1): base_port + i for i in range(config["NUM_MACHINES"])}
+
+
+def build_host_map(config):
+    """
+    Returns the hostname of each machine.
+
+    Machines whose PORTS entry is a "host:port" string run on that host, and the others on
+    HOST. With NUM_MACHINES, machines are assigned to the HOSTS list in turn, if it is set.
+
+    :param config: Configuration dictionary
+    :return: Dictionary of hostnames for each machine
+    """
+    default_host = config.get("HOST", DEFAULT_HOST)
+    if "NUM_MACHINES" not in config:
+        return {machine_id: parse_address(address, default_host)[0] for machine_id, address in config["PORTS"].items()}
+    hosts = config.get("HOSTS") or [default_host]
+    return {str(i + 1): hosts[i % len(hosts)] for i in range(config["NUM_MACHINES"])}
+
+
+def build_topology(config, machine_ids):
+    """
+    Builds the topology named by TOPOLOGY in the config (default: ring).
+
+    :param config: Configuration dictionary
+    :param machine_ids: IDs of all machines, as strings
+    :return: Topology
+    """
+    name = config.get("TOPOLOGY", "ring")
+    if name not in TOPOLOGIES:
+        raise ValueError(
+            f"Unknown topology: {name} (expected one of {', '.join(TOPOLOGIES)})")
+    if name == "random-k":
+        return RandomKTopology(machine_ids, config.get("RANDOM_K", DEFAULT_RANDOM_K),
+                               config.get("TOPOLOGY_SEED", 0))
+    return TOPOLOGIES[name](machine_ids)
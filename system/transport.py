@@ -0,0 +1,438 @@
+import os
+import queue
+import select
+import socket
+import struct
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from logical_clocks import CLOCK_LAMPORT, CLOCK_VECTOR
+from wire import MAX_DATAGRAM_SIZE
+
+# Transports, selectable with TRANSPORT in config.json
+TRANSPORT_UDP = "udp"
+TRANSPORT_UNIX = "unix"
+TRANSPORT_SHM = "shm"
+TRANSPORT_INPROCESS = "inprocess"
+
+# Folder holding the UNIX datagram sockets (one per port number)
+UNIX_SOCKET_DIR = os.path.join(tempfile.gettempdir(), "logical-clocks")
+
+# Shared-memory ring buffers: a header with the write and read counters, then fixed-size slots
+# holding a 2-byte datagram length and the datagram
+RING_HEADER = struct.Struct("<QQ")
+RING_LENGTH = struct.Struct("<H")
+DEFAULT_RING_SLOTS = 256
+RING_SLOT_SIZE = 64
+# Seconds a shared-memory receiver sleeps between polls when its rings are empty
+RING_MIN_POLL_INTERVAL = 0.00005
+RING_MAX_POLL_INTERVAL = 0.001
+
+
+class Transport:
+    def __init__(self, host, port, hosts=None):
+        """
+        Initializes a transport, which carries datagrams between machines.
+
+        Machines are addressed by port number; each transport maps port numbers to its own
+        kind of address.
+
+        :param host: Hostname of this machine
+        :param port: Port number of this machine
+        :param hosts: Hostname of each other machine, by port number, for machines on other hosts (default: every
+            machine is on `host`)
+        """
+        self.host = host
+        self.port = port
+        self.hosts = hosts or {}
+        self.closed = False
+
+    def open(self, sender_ports):
+        """
+        Opens this machine's endpoint so other machines can send to it.
+
+        :param sender_ports: Port numbers of the machines that may send to this machine
+        """
+        raise NotImplementedError
+
+    def connect(self, port):
+        """
+        Opens a connection to another machine.
+
+        :param port: Port number of the other machine
+        :return: Connection with sendall(data) and close() methods
+        """
+        raise NotImplementedError
+
+    def receive(self, timeout=None):
+        """
+        Waits for datagrams, then returns every datagram that is waiting.
+
+        :param timeout: Maximum number of seconds to wait (default: wait until a datagram arrives)
+        :return: List of datagram bytes (empty if the timeout passed), or None once the transport is closed
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Closes this machine's endpoint.
+        """
+        self.closed = True
+
+
+class SocketTransport(Transport):
+    family = None
+
+    def address(self, port):
+        """
+        Returns the socket address of a machine.
+
+        :param port: Port number of the machine
+        :return: Socket address
+        """
+        raise NotImplementedError
+
+    def open(self, sender_ports):
+        self.socket = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.socket.bind(self.address(self.port))
+
+    def connect(self, port):
+        s = socket.socket(self.family, socket.SOCK_DGRAM)
+        s.connect(self.address(port))
+        return s
+
+    def receive(self, timeout=None):
+        if self.socket.fileno() == -1:
+            # Check if the socket is still valid
+            return None
+        # wait for a datagram, then drain every other datagram that is already waiting
+        if timeout is not None and not select.select([self.socket], [], [], timeout)[0]:
+            return []
+        datagrams = [self.socket.recv(MAX_DATAGRAM_SIZE)]
+        while True:
+            try:
+                datagrams.append(self.socket.recv(
+                    MAX_DATAGRAM_SIZE, socket.MSG_DONTWAIT))
+            except BlockingIOError:
+                break
+        return datagrams
+
+    def close(self):
+        super().close()
+        self.socket.close()
+
+
+class UdpTransport(SocketTransport):
+    family = socket.AF_INET
+
+    def address(self, port):
+        return (self.hosts.get(port, self.host), port)
+
+
+class UnixTransport(SocketTransport):
+    family = getattr(socket, "AF_UNIX", None)
+
+    def address(self, port):
+        return os.path.join(UNIX_SOCKET_DIR, f"machine_{port}.sock")
+
+    def open(self, sender_ports):
+        # remove the socket file of an earlier run on the same port
+        os.makedirs(UNIX_SOCKET_DIR, exist_ok=True)
+        if os.path.exists(self.address(self.port)):
+            os.remove(self.address(self.port))
+        super().open(sender_ports)
+
+    def close(self):
+        super().close()
+        if os.path.exists(self.address(self.port)):
+            os.remove(self.address(self.port))
+
+
+def ring_name(recipient_port, sender_port):
+    """
+    Returns the shared memory name of the ring buffer from one machine to another.
+
+    :param recipient_port: Port number of the receiving machine
+    :param sender_port: Port number of the sending machine
+    :return: Shared memory name
+    """
+    return f"lclock_{recipient_port}_{sender_port}"
+
+# Held while attaching to shared memory without tracking it
+attach_lock = threading.Lock()
+
+
+def attach_shared_memory(name):
+    """
+    Attaches to shared memory created by another process, without letting this process's
+    resource tracker unlink it on exit.
+
+    :param name: Shared memory name
+    :return: SharedMemory
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Python < 3.13 always tracks shared memory, so skip registering it by hand (unregistering
+    # it afterwards would also drop the creator's registration if both share a tracker)
+    with attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class RingBuffer:
+    def __init__(self, shm):
+        """
+        Initializes a lock-free single-producer, single-consumer ring buffer of datagrams in
+        shared memory.
+
+        The producer only writes the write counter and the consumer only writes the read
+        counter, so neither needs a lock.
+
+        :param shm: SharedMemory holding the ring buffer
+        """
+        self.shm = shm
+        self.buffer = shm.buf
+        self.slots = (shm.size - RING_HEADER.size) // RING_SLOT_SIZE
+        self.dropped = 0  # datagrams dropped because the ring was full
+
+    @classmethod
+    def create(cls, name, slots=DEFAULT_RING_SLOTS):
+        """
+        Creates a ring buffer (called by the consumer).
+
+        :param name: Shared memory name
+        :param slots: Number of datagrams the ring can hold (default: DEFAULT_RING_SLOTS)
+        :return: RingBuffer
+        """
+        size = RING_HEADER.size + slots * RING_SLOT_SIZE
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # left over from an earlier run on the same port
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        RING_HEADER.pack_into(shm.buf, 0, 0, 0)
+        return cls(shm)
+
+    def put(self, data):
+        """
+        Adds a datagram to the ring (producer only). Datagrams are dropped if the ring is full.
+
+        :param data: Datagram bytes
+        """
+        if len(data) > RING_SLOT_SIZE - RING_LENGTH.size:
+            raise ValueError(
+                f"Datagram of {len(data)} bytes is too large for a ring buffer slot")
+        head, tail = RING_HEADER.unpack_from(self.buffer, 0)
+        if head - tail >= self.slots:
+            self.dropped += 1
+            return
+        offset = RING_HEADER.size + (head % self.slots) * RING_SLOT_SIZE
+        RING_LENGTH.pack_into(self.buffer, offset, len(data))
+        self.buffer[offset + RING_LENGTH.size:offset +
+                    RING_LENGTH.size + len(data)] = data
+        # publish the datagram only once it has been written
+        struct.pack_into("<Q", self.buffer, 0, head + 1)
+
+    def get_all(self):
+        """
+        Removes and returns every datagram in the ring (consumer only).
+
+        :return: List of datagram bytes
+        """
+        head, tail = RING_HEADER.unpack_from(self.buffer, 0)
+        datagrams = []
+        while tail < head:
+            offset = RING_HEADER.size + (tail % self.slots) * RING_SLOT_SIZE
+            length = RING_LENGTH.unpack_from(self.buffer, offset)[0]
+            datagrams.append(bytes(
+                self.buffer[offset + RING_LENGTH.size:offset + RING_LENGTH.size + length]))
+            tail += 1
+        if datagrams:
+            struct.pack_into("<Q", self.buffer, 8, tail)
+        return datagrams
+
+    def close(self):
+        self.buffer = None
+        self.shm.close()
+
+
+class RingConnection:
+    def __init__(self, ring):
+        """
+        Initializes a connection that sends datagrams through a shared-memory ring buffer.
+
+        :param ring: RingBuffer to the other machine
+        """
+        self.ring = ring
+
+    @property
+    def dropped(self):
+        # datagrams dropped because the other machine's ring was full
+        return self.ring.dropped
+
+    def sendall(self, data):
+        self.ring.put(data)
+
+    def close(self):
+        self.ring.close()
+
+
+class SharedMemoryTransport(Transport):
+    def __init__(self, host, port, hosts=None, slots=DEFAULT_RING_SLOTS):
+        """
+        Initializes a transport for machines on the same computer that passes datagrams through
+        one shared-memory ring buffer per sender and recipient.
+
+        :param host: Hostname of this machine (unused)
+        :param port: Port number of this machine
+        :param hosts: Hostname of each other machine, by port number (unused)
+        :param slots: Number of datagrams each ring buffer can hold (default: DEFAULT_RING_SLOTS)
+        """
+        super().__init__(host, port, hosts)
+        self.slots = slots
+        self.rings = []
+        self.poll_interval = RING_MIN_POLL_INTERVAL
+
+    def open(self, sender_ports):
+        # the receiver creates the ring from each machine that may send to it
+        self.rings = [RingBuffer.create(ring_name(self.port, sender_port), self.slots)
+                      for sender_port in sender_ports]
+
+    def connect(self, port):
+        return RingConnection(RingBuffer(attach_shared_memory(ring_name(port, self.port))))
+
+    def receive(self, timeout=None):
+        # poll the rings, backing off while they are empty
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.closed:
+            datagrams = []
+            for ring in self.rings:
+                datagrams += ring.get_all()
+            if datagrams:
+                self.poll_interval = RING_MIN_POLL_INTERVAL
+                return datagrams
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            time.sleep(self.poll_interval)
+            self.poll_interval = min(
+                self.poll_interval * 2, RING_MAX_POLL_INTERVAL)
+        return None
+
+    def close(self):
+        super().close()
+        time.sleep(RING_MAX_POLL_INTERVAL)  # let the receiving thread stop reading
+        for ring in self.rings:
+            shm = ring.shm
+            ring.close()
+            shm.unlink()
+        self.rings = []
+
+
+class InProcessConnection:
+    def __init__(self, inbox):
+        """
+        Initializes a connection to a machine in the same process.
+
+        :param inbox: Inbox queue of the other machine
+        """
+        self.inbox = inbox
+
+    def sendall(self, data):
+        self.inbox.put(data)
+
+    def close(self):
+        pass
+
+
+class InProcessTransport(Transport):
+    # inbox of each machine in this process, by port number
+    inboxes = {}
+    inboxes_lock = threading.Lock()
+
+    def open(self, sender_ports):
+        self.inbox = queue.SimpleQueue()
+        with self.inboxes_lock:
+            self.inboxes[self.port] = self.inbox
+
+    def connect(self, port):
+        with self.inboxes_lock:
+            return InProcessConnection(self.inboxes[port])
+
+    def receive(self, timeout=None):
+        try:
+            datagrams = [self.inbox.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                datagrams.append(self.inbox.get_nowait())
+            except queue.Empty:
+                break
+        if self.closed:
+            return None
+        return [data for data in datagrams if data is not None]
+
+    def close(self):
+        super().close()
+        with self.inboxes_lock:
+            if self.inboxes.get(self.port) is self.inbox:
+                del self.inboxes[self.port]
+        self.inbox.put(None)  # wake up the receiving thread
+
+
+TRANSPORTS = {
+    TRANSPORT_UDP: UdpTransport,
+    TRANSPORT_UNIX: UnixTransport,
+    TRANSPORT_SHM: SharedMemoryTransport,
+    TRANSPORT_INPROCESS: InProcessTransport,
+}
+
+
+def check_transport(name, clock_type=CLOCK_LAMPORT, separate_processes=False):
+    """
+    Checks that a transport can carry the messages of a run.
+
+    Vector timestamps grow with the number of machines, so their datagrams don't fit the
+    shared-memory transport's fixed-size ring slots. The in-process transport's queues are only
+    shared by machines in the same process.
+
+    :param name: Name of the transport, one of TRANSPORTS
+    :param clock_type: Type of logical clock, one of logical_clocks.CLOCK_TYPES (default: "lamport")
+    :param separate_processes: Whether each machine runs in its own process (default: False)
+    """
+    if name not in TRANSPORTS:
+        raise ValueError(
+            f"Unknown transport: {name} (expected one of {', '.join(TRANSPORTS)})")
+    if name == TRANSPORT_INPROCESS and separate_processes:
+        raise ValueError(f"The {TRANSPORT_INPROCESS} transport only connects machines in the same process; use "
+                         f"another transport for machine processes")
+    if name == TRANSPORT_SHM and clock_type == CLOCK_VECTOR:
+        raise ValueError(f"The {TRANSPORT_SHM} transport's {RING_SLOT_SIZE}-byte slots can't carry {CLOCK_VECTOR} "
+                         f"clocks; use the {TRANSPORT_UDP} or {TRANSPORT_UNIX} transport")
+
+
+def build_transport(name, host, port, hosts=None):
+    """
+    Builds the transport with the given name.
+
+    :param name: Name of the transport, one of TRANSPORTS
+    :param host: Hostname of this machine
+    :param port: Port number of this machine
+    :param hosts: Hostname of each other machine, by port number (default: every machine is on `host`)
+    :return: Transport
+    """
+    if name not in TRANSPORTS:
+        raise ValueError(
+            f"Unknown transport: {name} (expected one of {', '.join(TRANSPORTS)})")
+    return TRANSPORTS[name](host, port, hosts)
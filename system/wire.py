@@ -0,0 +1,120 @@
+import struct
+
+from logical_clocks import CLOCK_CODES, CLOCK_LAMPORT
+
+# Original message format: a single 4-byte logical clock value
+LEGACY_MESSAGE = struct.Struct("<i")
+
+# Versioned message format: a header (version, number of clocks, sender ID, sequence number)
+# followed by one 8-byte Lamport clock value per message
+WIRE_VERSION = 1
+MESSAGE_HEADER = struct.Struct("<BBHI")
+MESSAGE_CLOCK = struct.Struct("<q")
+# Format of other clock types: the same header fields and the clock type's code, followed by
+# the clock's own encoding of each message's timestamp (see logical_clocks)
+CLOCK_WIRE_VERSION = 2
+CLOCK_MESSAGE_HEADER = struct.Struct("<BBHIB")
+MAX_CLOCKS_PER_DATAGRAM = 255
+# Clock probe format: version, kind (request or reply), sender ID, probe number, then the wall clock
+# times the request was sent, the request was received and the reply was sent, in nanoseconds
+PROBE_WIRE_VERSION = 3
+PROBE_MESSAGE = struct.Struct("<BBHIqqq")
+PROBE_REQUEST = 0
+PROBE_REPLY = 1
+# Largest datagram a machine can receive, in bytes (vector timestamps grow with the number of machines)
+MAX_DATAGRAM_SIZE = 8192
+
+
+def encode_message(sender_id, sequence, clocks, logical_clock=None):
+    """
+    Packs one or more logical clock timestamps into a datagram.
+
+    :param sender_id: ID of the sending machine
+    :param sequence: Sequence number of the datagram (per sender and recipient)
+    :param clocks: Timestamps, one per message
+    :param logical_clock: Logical clock encoding the timestamps (default: Lamport clock values)
+    :return: Datagram bytes
+    """
+    if not 0 < len(clocks) <= MAX_CLOCKS_PER_DATAGRAM:
+        raise ValueError(
+            f"A datagram carries 1 to {MAX_CLOCKS_PER_DATAGRAM} clocks, not {len(clocks)}")
+    if logical_clock is None or logical_clock.type == CLOCK_LAMPORT:
+        return MESSAGE_HEADER.pack(WIRE_VERSION, len(clocks), sender_id, sequence % 2 ** 32) + \
+            struct.pack(f"<{len(clocks)}q", *clocks)
+
+    data = CLOCK_MESSAGE_HEADER.pack(CLOCK_WIRE_VERSION, len(clocks), sender_id, sequence % 2 ** 32,
+                                     CLOCK_CODES[logical_clock.type]) + logical_clock.encode(clocks)
+    if len(data) > MAX_DATAGRAM_SIZE:
+        raise ValueError(f"Datagram of {len(data)} bytes is larger than {MAX_DATAGRAM_SIZE} bytes")
+    return data
+
+
+def decode_message(data, logical_clock=None):
+    """
+    Unpacks a datagram in the versioned, clock-typed or original 4-byte format.
+
+    :param data: Datagram bytes
+    :param logical_clock: Logical clock of the receiving machine, which decodes the timestamps (default: Lamport
+        clock values)
+    :return: Tuple of (sender ID, sequence number, list of timestamps); the sender ID and sequence
+        number are None for the original format
+    """
+    clock_type = CLOCK_LAMPORT if logical_clock is None else logical_clock.type
+    if len(data) == LEGACY_MESSAGE.size and clock_type == CLOCK_LAMPORT:
+        return None, None, [LEGACY_MESSAGE.unpack(data)[0]]
+
+    if len(data) < MESSAGE_HEADER.size:
+        raise ValueError(f"Datagram too short: {len(data)} bytes")
+    version = data[0]
+    if version == CLOCK_WIRE_VERSION and len(data) >= CLOCK_MESSAGE_HEADER.size:
+        _, count, sender_id, sequence, clock_code = CLOCK_MESSAGE_HEADER.unpack_from(data)
+        if logical_clock is None or clock_code != CLOCK_CODES[clock_type]:
+            raise ValueError(f"Datagram has clock type code {clock_code}, expected {clock_type} clocks")
+        return sender_id, sequence, logical_clock.decode(data, CLOCK_MESSAGE_HEADER.size, count)
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire format version: {version}")
+    if clock_type != CLOCK_LAMPORT:
+        raise ValueError(f"Datagram has Lamport clocks, expected {clock_type} clocks")
+    _, count, sender_id, sequence = MESSAGE_HEADER.unpack_from(data)
+    if len(data) != MESSAGE_HEADER.size + count * MESSAGE_CLOCK.size:
+        raise ValueError(
+            f"Datagram has {len(data)} bytes, expected {count} clocks")
+    return sender_id, sequence, list(struct.unpack_from(f"<{count}q", data, MESSAGE_HEADER.size))
+
+
+def encode_probe(kind, sender_id, probe_number, sent_ns, received_ns=0, replied_ns=0):
+    """
+    Packs a clock probe, which measures the offset between two machines' wall clocks.
+
+    :param kind: PROBE_REQUEST or PROBE_REPLY
+    :param sender_id: ID of the sending machine
+    :param probe_number: Number of the probe (per sender), which the reply repeats
+    :param sent_ns: Time the request was sent, on the requesting machine's clock
+    :param received_ns: Time the request was received, on the replying machine's clock (replies only)
+    :param replied_ns: Time the reply was sent, on the replying machine's clock (replies only)
+    :return: Datagram bytes
+    """
+    return PROBE_MESSAGE.pack(PROBE_WIRE_VERSION, kind, sender_id, probe_number % 2 ** 32,
+                              sent_ns, received_ns, replied_ns)
+
+
+def is_probe(data):
+    """
+    Checks whether a datagram is a clock probe rather than messages.
+
+    :param data: Datagram bytes
+    :return: Whether the datagram is a clock probe
+    """
+    return len(data) == PROBE_MESSAGE.size and data[0] == PROBE_WIRE_VERSION
+
+
+def decode_probe(data):
+    """
+    Unpacks a clock probe.
+
+    :param data: Datagram bytes
+    :return: Tuple of (kind, sender ID, probe number, sent time, received time, replied time)
+    """
+    if not is_probe(data):
+        raise ValueError(f"Datagram of {len(data)} bytes is not a clock probe")
+    return PROBE_MESSAGE.unpack(data)[1:]